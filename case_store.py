@@ -0,0 +1,237 @@
+"""
+Armazenamento local de casos anonimizados com busca por casos semelhantes.
+Cada caso guarda um vetor esparso de pesos brutos (tf sublinear das palavras
+do texto, com hashing, + indicadores dos sintomas canônicos) indexado por LSH
+de hiperplanos aleatórios; a consulta busca os buckets das tabelas (com
+sondagem de vizinhos) e reordena as candidatas pela similaridade de cosseno
+exata, aplicando o IDF atual da base à consulta e aos casos. As assinaturas
+LSH usam os pesos brutos, que não mudam conforme novos casos entram na base.
+"""
+import json
+import math
+import os
+import random
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+from src.services.bounded_cache import BoundedCache
+from src.services.diagnostic_engine import DiagnosticEngine
+from src.services.fuzzy_phrase_matcher import fold_text, tokenize
+
+
+class SimilarCaseStore:
+    # Dimensão do espaço de hashing das palavras
+    HASH_DIMENSIONS = 1 << 18
+    # Peso dos indicadores de sintomas canônicos em relação às palavras do texto
+    SYMPTOM_WEIGHT = 2.0
+    # Máximo de candidatas reordenadas pela similaridade exata
+    MAX_CANDIDATES = 500
+    # Bits de projeção memorizados por característica (recalculados pela semente se descartados)
+    PROJECTION_CACHE_SIZE = 65536
+
+    def __init__(self, diagnostic_engine: DiagnosticEngine, num_tables: int = 8,
+                 bits_per_table: int = 12, seed: int = 42, storage_path: Optional[str] = None):
+        self.engine = diagnostic_engine
+        self.num_tables = num_tables
+        self.bits_per_table = bits_per_table
+        self.seed = seed
+        self.storage_path = storage_path
+        self.lock = threading.Lock()
+
+        self.cases: List[Dict] = []  # metadados por case_id
+        self.vectors: List[Dict[int, float]] = []  # pesos brutos (sem IDF) por case_id
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self.document_frequency: Dict[int, int] = {}
+        self._projections = BoundedCache(max_size=self.PROJECTION_CACHE_SIZE)  # característica -> bits de sinal
+        # IDF e normas dos casos valem para o tamanho atual da base (refeitos quando um caso entra)
+        self._idf: Dict[int, float] = {}
+        self._norms: Dict[int, float] = {}
+
+        if storage_path and os.path.exists(storage_path):
+            self._load(storage_path)
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def add_case(self, report: str, cid_code: str, metadata: Optional[Dict] = None) -> Dict:
+        """Adiciona um caso anonimizado com diagnóstico confirmado."""
+        symptoms = self.engine.extract_report_symptoms(report) or []
+        word_counts = self._word_counts(report)
+
+        vector = self._raw_vector(symptoms, word_counts)
+        signatures = self._signatures(vector)
+
+        with self.lock:
+            for feature in word_counts:
+                self.document_frequency[feature] = self.document_frequency.get(feature, 0) + 1
+            case = {
+                'case_id': len(self.cases),
+                'cid_code': cid_code.upper().strip(),
+                'symptoms': symptoms,
+                'metadata': metadata or {}
+            }
+            self._index(case, vector, signatures)
+
+            if self.storage_path:
+                with open(self.storage_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({**case, 'weights': vector, 'signatures': signatures,
+                                        'words': list(word_counts)}, ensure_ascii=False) + '\n')
+
+        return case
+
+    def find_similar(self, report: str, limit: int = 5, min_similarity: float = 0.1) -> List[Dict]:
+        """Casos mais semelhantes ao relatório, em ordem decrescente de similaridade."""
+        symptoms = self.engine.extract_report_symptoms(report) or []
+        word_counts = self._word_counts(report)
+        raw_query = self._raw_vector(symptoms, word_counts)
+        query = self._weighted(raw_query)
+        if not query:
+            return []
+
+        # Base pequena: comparação exata com todos os casos
+        if len(self.cases) <= self.MAX_CANDIDATES:
+            return self._rerank(query, range(len(self.cases)), limit, min_similarity)
+
+        signatures = self._signatures(raw_query)
+
+        # Contar em quantas tabelas cada caso colide com a consulta
+        collisions: Dict[int, int] = {}
+        for table, signature in zip(self.tables, signatures):
+            for case_id in table.get(signature, ()):
+                collisions[case_id] = collisions.get(case_id, 0) + 1
+
+        # Poucas colisões: sondar buckets vizinhos (um bit invertido)
+        if len(collisions) < limit:
+            for table, signature in zip(self.tables, signatures):
+                for bit in range(self.bits_per_table):
+                    for case_id in table.get(signature ^ (1 << bit), ()):
+                        collisions.setdefault(case_id, 0)
+
+        candidates = sorted(collisions, key=lambda case_id: -collisions[case_id])[:self.MAX_CANDIDATES]
+        return self._rerank(query, candidates, limit, min_similarity)
+
+    def _rerank(self, query: Dict[int, float], candidates: Iterable[int], limit: int,
+                min_similarity: float) -> List[Dict]:
+        """Ordena as candidatas pela similaridade de cosseno exata com a consulta (IDF atual)."""
+        # Normas antes do IDF: se um caso entrar no meio da consulta, as normas calculadas aqui são descartadas
+        norms = self._norms
+        idf = self._idf_weights()
+        scored = []
+        for case_id in candidates:
+            vector = self.vectors[case_id]
+            norm = norms.get(case_id)
+            if norm is None:
+                norm = norms[case_id] = math.sqrt(sum(
+                    (weight * idf(feature)) ** 2 for feature, weight in vector.items()
+                ))
+            if norm == 0:
+                continue
+            dot = sum(weight * vector[feature] * idf(feature)
+                      for feature, weight in query.items() if feature in vector)
+            similarity = dot / norm
+            if similarity >= min_similarity:
+                scored.append((similarity, case_id))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {**self.cases[case_id], 'similarity': round(similarity, 4)}
+            for similarity, case_id in scored[:limit]
+        ]
+
+    def _word_counts(self, report: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for word in tokenize(fold_text(report or '')):
+            if len(word) > 2:
+                feature = zlib.crc32(word.encode('utf-8')) % self.HASH_DIMENSIONS
+                counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def _raw_vector(self, symptoms: List[str], word_counts: Dict[int, int]) -> Dict[int, float]:
+        """Pesos sem IDF: tf sublinear das palavras + indicadores dos sintomas."""
+        vector = {feature: 1.0 + math.log(count) for feature, count in word_counts.items()}
+        for symptom in symptoms:
+            # Indicadores de sintomas ficam fora do espaço das palavras
+            vector[self.HASH_DIMENSIONS + zlib.crc32(symptom.encode('utf-8'))] = self.SYMPTOM_WEIGHT
+        return vector
+
+    def _idf_weights(self):
+        """Função característica -> IDF para o tamanho atual da base (indicadores de sintomas valem 1)."""
+        total_documents = len(self.cases) + 1
+        cache = self._idf
+
+        def idf(feature: int) -> float:
+            weight = cache.get(feature)
+            if weight is None:
+                if feature >= self.HASH_DIMENSIONS:
+                    weight = 1.0
+                else:
+                    weight = math.log((total_documents + 1) / (self.document_frequency.get(feature, 0) + 1)) + 1.0
+                cache[feature] = weight
+            return weight
+
+        return idf
+
+    def _weighted(self, vector: Dict[int, float]) -> Dict[int, float]:
+        """Aplica o IDF atual e normaliza o vetor."""
+        idf = self._idf_weights()
+        weighted = {feature: weight * idf(feature) for feature, weight in vector.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weighted.values()))
+        if norm == 0:
+            return {}
+        return {feature: weight / norm for feature, weight in weighted.items()}
+
+    def _projection_bits(self, feature: int) -> int:
+        """Sinais (+1/-1) da característica em todos os hiperplanos, como bits."""
+        bits = self._projections.get(feature)
+        if bits is None:
+            total_bits = self.num_tables * self.bits_per_table
+            bits = random.Random(self.seed * 1000003 + feature).getrandbits(total_bits)
+            self._projections.put(feature, bits)
+        return bits
+
+    def _signatures(self, vector: Dict[int, float]) -> List[int]:
+        """Assinatura LSH (um inteiro de bits_per_table bits) por tabela."""
+        total_bits = self.num_tables * self.bits_per_table
+        projections = [0.0] * total_bits
+        for feature, weight in vector.items():
+            bits = self._projection_bits(feature)
+            for position in range(total_bits):
+                if bits >> position & 1:
+                    projections[position] += weight
+                else:
+                    projections[position] -= weight
+
+        signatures = []
+        for table in range(self.num_tables):
+            signature = 0
+            offset = table * self.bits_per_table
+            for bit in range(self.bits_per_table):
+                if projections[offset + bit] > 0:
+                    signature |= 1 << bit
+            signatures.append(signature)
+        return signatures
+
+    def _index(self, case: Dict, vector: Dict[int, float], signatures: List[int]):
+        case_id = case['case_id']
+        self.cases.append(case)
+        self.vectors.append(vector)
+        for table, signature in zip(self.tables, signatures):
+            table.setdefault(signature, []).append(case_id)
+
+        # A base mudou: IDF e normas serão recalculados na próxima consulta
+        self._idf = {}
+        self._norms = {}
+
+    def _load(self, storage_path: str):
+        """Recarrega casos persistidos (um JSON por linha)."""
+        with open(storage_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                vector = {int(feature): weight for feature, weight in record.pop('weights').items()}
+                signatures = record.pop('signatures')
+                for feature in record.pop('words', []):
+                    self.document_frequency[feature] = self.document_frequency.get(feature, 0) + 1
+                record['case_id'] = len(self.cases)
+                self._index(record, vector, signatures)
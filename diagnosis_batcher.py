@@ -0,0 +1,113 @@
+"""
+Micro-batching opcional das requisições de diagnóstico.
+Requisições que chegam dentro de uma janela curta são pontuadas juntas pelo
+DiagnosticEngine e cada resultado é devolvido à thread que o aguarda. Se o
+lote não responder dentro do prazo, a requisição é pontuada diretamente.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Dict, List
+from src.services.diagnostic_engine import DiagnosticEngine, DiagnosticResult
+
+
+class DiagnosisBatcher:
+    def __init__(self, diagnostic_engine: DiagnosticEngine, max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0, timeout_ms: float = 1000.0):
+        self.engine = diagnostic_engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self.timeouts = 0
+
+        self._worker_lock = threading.Lock()
+        self._worker = None
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        """Inicia a thread de lotes (de novo, se a anterior tiver morrido)."""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='diagnosis-batcher', daemon=True)
+                self._worker.start()
+
+    def analyze_symptoms_report(self, report: str, scoring_mode: str = 'heuristic') -> List[DiagnosticResult]:
+        """Equivalente a DiagnosticEngine.analyze_symptoms_report, pontuado em lote."""
+        self.engine.validate_scoring_mode(scoring_mode)
+        extracted_symptoms = self.engine.extract_report_symptoms(report)
+        if extracted_symptoms is None:
+            return []
+
+        return self.submit(extracted_symptoms, 5, scoring_mode)
+
+    def submit(self, symptom_ids: List[str], limit: int = 5,
+               scoring_mode: str = 'heuristic') -> List[DiagnosticResult]:
+        """Enfileira a requisição e aguarda o resultado do lote (ou pontua direto após o prazo)."""
+        future = Future()
+        self._queue.put(((symptom_ids, limit, scoring_mode), future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Lote travado ou thread parada: a requisição não fica presa à fila
+            future.cancel()
+            with self._stats_lock:
+                self.timeouts += 1
+            self._ensure_worker()
+            return self.engine.analyze_symptom_ids(symptom_ids, limit, scoring_mode)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # Coletar o que chegar até o fim da janela ou até encher o lote
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        # Requisições que desistiram por prazo ficam fora do lote
+        batch = [(request, future) for request, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.engine.rank_diagnoses_batch([request for request, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self) -> Dict:
+        """Métricas do micro-batching."""
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'average_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'timeouts': self.timeouts,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0
+            }
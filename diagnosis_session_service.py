@@ -0,0 +1,142 @@
+"""
+Sessões incrementais de diagnóstico para a seleção objetiva de sintomas.
+Cada sessão mantém as contagens por doença; adicionar ou remover um sintoma
+atualiza apenas as doenças afetadas por ele.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from src.services.diagnostic_engine import DiagnosticEngine, DiagnosticResult
+from src.services.session_store import SessionStore
+
+
+class DiagnosisSession:
+    """Estado de pontuação de uma sessão, indexado por IDs canônicos de sintomas."""
+
+    def __init__(self):
+        self.labels: Dict[str, List[str]] = {}  # rótulo selecionado -> IDs canônicos
+        self.symptom_refs: Dict[str, int] = {}  # ID canônico -> nº de rótulos que o usam
+        self.primary_counts: Dict[int, int] = {}
+        self.secondary_counts: Dict[int, int] = {}
+        self.matching: Dict[int, List[str]] = {}
+        self.scores: Dict[int, float] = {}
+
+    @property
+    def selected_symptoms(self) -> List[str]:
+        return list(self.labels)
+
+    @property
+    def symptom_ids(self) -> List[str]:
+        return list(self.symptom_refs)
+
+
+@dataclass
+class DiagnosisSnapshot:
+    """Sintomas e ranking de uma sessão lidos juntos, sob o lock do armazenamento."""
+    selected_symptoms: List[str]
+    symptom_ids: List[str]
+    results: List[DiagnosticResult]
+
+
+class DiagnosisSessionService:
+    def __init__(self, diagnostic_engine: DiagnosticEngine, max_sessions: int = 10000,
+                 ttl_seconds: int = 1800):
+        self.engine = diagnostic_engine
+        self.store = SessionStore(max_sessions, ttl_seconds)
+
+    def create_session(self, symptoms: Optional[List[str]] = None) -> str:
+        """Cria uma sessão, opcionalmente já com sintomas selecionados."""
+        session = DiagnosisSession()
+        for label in symptoms or []:
+            self._add_label(session, label)
+        return self.store.create(session)
+
+    def get_session(self, session_id: str) -> Optional[DiagnosisSession]:
+        return self.store.get(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    def get_snapshot(self, session_id: str, limit: int = 5) -> Optional[DiagnosisSnapshot]:
+        """Estado atual da sessão; retorna None se ela não existir."""
+        with self.store.lock:
+            session = self.store.get(session_id)
+            if session is None:
+                return None
+
+            return self._snapshot(session, limit)
+
+    def update_session(self, session_id: str, add: Optional[List[str]] = None,
+                       remove: Optional[List[str]] = None, limit: int = 5) -> Optional[DiagnosisSnapshot]:
+        """Aplica os deltas de sintomas e retorna o estado resultante; None se a sessão não existir."""
+        with self.store.lock:
+            session = self.store.get(session_id)
+            if session is None:
+                return None
+
+            for label in remove or []:
+                self._remove_label(session, label)
+            for label in add or []:
+                self._add_label(session, label)
+
+            return self._snapshot(session, limit)
+
+    def _snapshot(self, session: DiagnosisSession, limit: int) -> DiagnosisSnapshot:
+        """Ranqueia as doenças já pontuadas na sessão (chamar com o lock do armazenamento)."""
+        return DiagnosisSnapshot(
+            selected_symptoms=session.selected_symptoms,
+            symptom_ids=session.symptom_ids,
+            results=self.engine.rank_scored_diseases(
+                session.scores, session.matching, len(session.symptom_refs), limit
+            )
+        )
+
+    def _add_label(self, session: DiagnosisSession, label: str):
+        if label in session.labels:
+            return
+
+        symptom_ids = self.engine.resolve_symptom_label(label)
+        session.labels[label] = symptom_ids
+
+        for symptom_id in symptom_ids:
+            refs = session.symptom_refs.get(symptom_id, 0)
+            session.symptom_refs[symptom_id] = refs + 1
+            if refs == 0:
+                self._apply_symptom(session, symptom_id, 1)
+
+    def _remove_label(self, session: DiagnosisSession, label: str):
+        symptom_ids = session.labels.pop(label, None)
+        if symptom_ids is None:
+            return
+
+        for symptom_id in symptom_ids:
+            refs = session.symptom_refs[symptom_id] - 1
+            if refs == 0:
+                del session.symptom_refs[symptom_id]
+                self._apply_symptom(session, symptom_id, -1)
+            else:
+                session.symptom_refs[symptom_id] = refs
+
+    def _apply_symptom(self, session: DiagnosisSession, symptom_id: str, delta: int):
+        """Atualiza contagens e pontuação só das doenças afetadas pelo sintoma."""
+        for disease_idx, is_primary in self.engine.get_symptom_postings(symptom_id):
+            counts = session.primary_counts if is_primary else session.secondary_counts
+            counts[disease_idx] = counts.get(disease_idx, 0) + delta
+
+            matching = session.matching.setdefault(disease_idx, [])
+            if delta > 0:
+                matching.append(symptom_id)
+            else:
+                matching.remove(symptom_id)
+
+            if matching:
+                session.scores[disease_idx] = self.engine.score_disease(
+                    disease_idx,
+                    session.primary_counts.get(disease_idx, 0),
+                    session.secondary_counts.get(disease_idx, 0)
+                )
+            else:
+                # Doença sem correspondências deixa de ser candidata
+                session.scores.pop(disease_idx, None)
+                session.matching.pop(disease_idx, None)
+                session.primary_counts.pop(disease_idx, None)
+                session.secondary_counts.pop(disease_idx, None)
@@ -0,0 +1,234 @@
+"""
+Benchmark do motor de diagnóstico por sintomas.
+Gera relatórios sintéticos em português a partir da própria base (sinônimos,
+erros de digitação, acentos ausentes e tamanhos variados), amplia a base com
+doenças sintéticas e mede cada etapa separadamente: vazão e latência
+(p50/p95/p99/máx) por tamanho de base.
+
+Uso:
+    python -m src.services.diagnostic_benchmark --reports 500 --kb-sizes 0,1000,5000
+    python -m src.services.diagnostic_benchmark --json > resultado.json
+"""
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List, Sequence
+from src.services.diagnostic_engine import DiagnosticEngine
+from src.services.fuzzy_phrase_matcher import fold_text
+
+
+class SyntheticReportGenerator:
+    """Relatórios de sintomas plausíveis gerados a partir da base do motor."""
+
+    OPENINGS = [
+        'Paciente relata {symptoms}.',
+        'Refere {symptoms} há {days} dias.',
+        'Queixa-se de {symptoms} desde a semana passada.',
+        'Procurou atendimento por {symptoms}.',
+        'Há {days} dias apresenta {symptoms}.'
+    ]
+    FOLLOW_UPS = [
+        'Também notou {symptoms}.',
+        'Nos últimos dias surgiu {symptoms}.',
+        'Acompanhante informa {symptoms}.'
+    ]
+    FILLERS = [
+        'Nega alergias medicamentosas.',
+        'Sem comorbidades conhecidas.',
+        'Faz uso de medicação contínua conforme prescrição.',
+        'Trabalha em escritório e pratica pouca atividade física.',
+        'Refere alimentação irregular e pouco sono durante a semana.',
+        'Nega viagens recentes ou contato com pessoas doentes.',
+        'Histórico familiar sem particularidades relevantes.',
+        'Chegou acompanhado pela esposa, consciente e orientado.'
+    ]
+    # Quantidade de frases de contexto por perfil de tamanho
+    LENGTH_PROFILES = {'curto': (0, 0), 'médio': (2, 5), 'longo': (20, 60)}
+
+    def __init__(self, diagnostic_engine: DiagnosticEngine, seed: int = 42, noise_rate: float = 0.15):
+        self.engine = diagnostic_engine
+        self.random = random.Random(seed)
+        self.noise_rate = noise_rate
+
+        # Expressão do sintoma -> formas equivalentes usadas nos relatórios
+        self.surface_forms: Dict[str, List[str]] = {}
+        for symptom_name, patterns in diagnostic_engine.symptom_patterns.items():
+            for phrase in [symptom_name] + patterns:
+                self.surface_forms.setdefault(phrase, [])
+                for pattern in patterns:
+                    if pattern not in self.surface_forms[phrase]:
+                        self.surface_forms[phrase].append(pattern)
+
+    def generate(self, count: int) -> List[str]:
+        return [self.generate_report() for _ in range(count)]
+
+    def generate_report(self) -> str:
+        disease_info = self.engine.symptom_database[self.random.choice(self.engine.disease_codes)]
+        primary = disease_info.get('primary_symptoms', [])
+        secondary = disease_info.get('secondary_symptoms', [])
+        chosen = self.random.sample(primary, min(len(primary), self.random.randint(1, 5)))
+        chosen += self.random.sample(secondary, min(len(secondary), self.random.randint(0, 3)))
+        phrases = [self._surface_form(symptom) for symptom in chosen]
+
+        split = self.random.randint(1, len(phrases)) if phrases else 0
+        sentences = [self.random.choice(self.OPENINGS).format(
+            symptoms=self._join(phrases[:split]) or 'mal-estar', days=self.random.randint(1, 15)
+        )]
+        if phrases[split:]:
+            sentences.append(self.random.choice(self.FOLLOW_UPS).format(symptoms=self._join(phrases[split:])))
+
+        low, high = self.LENGTH_PROFILES[self.random.choice(list(self.LENGTH_PROFILES))]
+        for _ in range(self.random.randint(low, high)):
+            sentences.insert(self.random.randint(0, len(sentences)), self.random.choice(self.FILLERS))
+
+        return ' '.join(sentences)
+
+    def _surface_form(self, symptom: str) -> str:
+        """Sinônimo do sintoma, às vezes com erro de digitação ou sem acentos."""
+        phrase = self.random.choice(self.surface_forms.get(symptom) or [symptom])
+        if self.random.random() < self.noise_rate:
+            phrase = self._typo(phrase) if self.random.random() < 0.5 else fold_text(phrase)
+        return phrase
+
+    def _typo(self, phrase: str) -> str:
+        words = phrase.split()
+        candidates = [idx for idx, word in enumerate(words) if len(word) >= 5]
+        if not candidates:
+            return phrase
+        idx = self.random.choice(candidates)
+        word = words[idx]
+        position = self.random.randint(1, len(word) - 2)
+        edit = self.random.choice(('drop', 'swap', 'double'))
+        if edit == 'drop':
+            word = word[:position] + word[position + 1:]
+        elif edit == 'swap':
+            word = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+        else:
+            word = word[:position] + word[position] + word[position:]
+        words[idx] = word
+        return ' '.join(words)
+
+    def _join(self, phrases: Sequence[str]) -> str:
+        if len(phrases) <= 1:
+            return ''.join(phrases)
+        return ', '.join(phrases[:-1]) + ' e ' + phrases[-1]
+
+
+def build_scaled_engine(extra_diseases: int, seed: int = 7) -> DiagnosticEngine:
+    """Motor com a base original ampliada por doenças sintéticas."""
+
+    class ScaledDiagnosticEngine(DiagnosticEngine):
+        def _load_symptom_database(self) -> Dict:
+            database = super()._load_symptom_database()
+            phrases = sorted({
+                symptom for info in database.values()
+                for symptom in info.get('primary_symptoms', []) + info.get('secondary_symptoms', [])
+            })
+            rng = random.Random(seed)
+            for idx in range(extra_diseases):
+                database[f'Z{idx:05d}'] = {
+                    'name': f'Doença sintética {idx}',
+                    'primary_symptoms': rng.sample(phrases, rng.randint(2, 12)),
+                    'secondary_symptoms': rng.sample(phrases, rng.randint(0, 10))
+                }
+            return database
+
+    return ScaledDiagnosticEngine()
+
+
+def measure(function: Callable, inputs: Sequence, setup: Callable = None, warmup: int = 20) -> Dict:
+    """Executa a função para cada entrada e resume vazão e latência (ms)."""
+    for item in inputs[:warmup]:
+        function(item)
+
+    timings = []
+    for item in inputs:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function(item)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    total = sum(timings)
+
+    def percentile(fraction: float) -> float:
+        return round(timings[min(len(timings) - 1, int(fraction * len(timings)))] * 1000, 4)
+
+    return {
+        'calls': len(timings),
+        'throughput_per_s': round(len(timings) / total, 1) if total else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(timings[-1] * 1000, 4) if timings else 0.0
+    }
+
+
+def run_benchmark(report_count: int = 500, kb_sizes: Sequence[int] = (0, 1000, 5000),
+                  seed: int = 42, warm_cache: bool = False) -> List[Dict]:
+    """Mede as etapas do motor para cada tamanho de base."""
+    results = []
+    for extra_diseases in kb_sizes:
+        start = time.perf_counter()
+        engine = build_scaled_engine(extra_diseases)
+        build_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        reports = SyntheticReportGenerator(engine, seed=seed).generate(report_count)
+        # Sem --warm-cache cada chamada parte do cache de resultados vazio
+        clear_cache = None if warm_cache else engine.result_cache.clear
+        diagnostics = [(engine.analyze_symptoms_report(report), report) for report in reports]
+
+        stages = {
+            '_extract_symptoms': measure(lambda report: engine._extract_symptoms(report.lower().strip()), reports),
+            'analyze_symptoms_report': measure(engine.analyze_symptoms_report, reports, clear_cache),
+            'analyze_medical_report_advanced': measure(engine.analyze_medical_report_advanced, reports, clear_cache),
+            'generate_medical_report': measure(lambda item: engine.generate_medical_report(*item), diagnostics)
+        }
+
+        results.append({
+            'diseases': len(engine.disease_codes),
+            'engine_build_ms': build_ms,
+            'average_report_length': round(sum(len(report) for report in reports) / len(reports), 1),
+            'stages': stages
+        })
+    return results
+
+
+def format_results(results: List[Dict]) -> str:
+    lines = []
+    for result in results:
+        lines.append(f"Base com {result['diseases']} doenças "
+                     f"(construção {result['engine_build_ms']} ms, "
+                     f"relatório médio {result['average_report_length']} caracteres)")
+        lines.append(f"  {'etapa':<34}{'chamadas/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+        for stage, metrics in result['stages'].items():
+            lines.append(f"  {stage:<34}{metrics['throughput_per_s']:>12}{metrics['p50_ms']:>10}"
+                         f"{metrics['p95_ms']:>10}{metrics['p99_ms']:>10}{metrics['max_ms']:>10}")
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do motor de diagnóstico por sintomas')
+    parser.add_argument('--reports', type=int, default=500, help='relatórios sintéticos por tamanho de base')
+    parser.add_argument('--kb-sizes', default='0,1000,5000',
+                        help='doenças sintéticas adicionadas à base, separadas por vírgula')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warm-cache', action='store_true',
+                        help='mantém o cache de resultados entre as chamadas')
+    parser.add_argument('--json', action='store_true', help='saída em JSON (para comparar execuções)')
+    args = parser.parse_args()
+
+    kb_sizes = [int(size) for size in args.kb_sizes.split(',') if size.strip()]
+    results = run_benchmark(args.reports, kb_sizes, args.seed, args.warm_cache)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,19 @@ Analisa relatórios de sintomas e sugere diagnósticos prováveis.
 """
 import re
 import json
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+import heapq
+import hashlib
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+from dataclasses import asdict, dataclass
 import os
+from src.services.report_renderer import ReportRenderer
+from src.services.naive_bayes_scorer import NaiveBayesScorer
+from src.services.bounded_cache import BoundedCache
+from src.services.red_flag_screener import RedFlagScreener, RedFlagScreening
+from src.services.fuzzy_phrase_matcher import FuzzyPhraseMatcher, fold_text, tokenize
+
+# Palavra no final de um bloco, possivelmente cortada pela fronteira
+_TRAILING_WORD_PATTERN = re.compile(r'\w+\Z')
 
 @dataclass
 class Symptom:
@@ -24,11 +34,94 @@ class DiagnosticResult:
     additional_info: Dict
     confidence_level: str  # 'baixa', 'média', 'alta'
 
+@dataclass
+class AnalysisContext:
+    """Resultado de uma única passagem de análise sobre um relatório.
+
+    Texto normalizado, sintomas extraídos, diagnósticos e avaliações de
+    gravidade/urgência são calculados uma vez e reaproveitados pelo resumo,
+    pelo relatório médico e pelas rotas. Na análise em blocos o texto não é
+    mantido: report e normalized_report ficam vazios e só o tamanho é guardado.
+    A triagem de sinais de alarme roda antes da pontuação e pode elevar a urgência.
+    """
+    report: str
+    normalized_report: str
+    symptoms: List[str]
+    diagnostic_results: List[DiagnosticResult]
+    severity: str = 'não determinada'
+    urgency: str = 'rotina'
+    report_length: int = 0
+    red_flags: Optional[RedFlagScreening] = None
+
 class DiagnosticEngine:
+    # Sintomas considerados na avaliação de gravidade e urgência
+    SEVERE_SYMPTOMS = (
+        'dor no peito', 'falta de ar', 'convulsões', 'sangue na urina',
+        'febre alta', 'perda de consciência'
+    )
+    EMERGENCY_SYMPTOMS = (
+        'dor no peito', 'falta de ar', 'convulsões', 'perda de consciência',
+        'sangramento', 'febre alta'
+    )
+    # Motores de pontuação selecionáveis por requisição
+    SCORING_MODES = ('heuristic', 'naive_bayes')
+    
+    # Tamanho dos blocos na extração em streaming de laudos longos
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
     def __init__(self):
         self.symptom_database = self._load_symptom_database()
         self.disease_patterns = self._load_disease_patterns()
+        self.symptom_patterns = self._load_symptom_patterns()
+        self._max_pattern_length = max(
+            (len(pattern) for patterns in self.symptom_patterns.values() for pattern in patterns),
+            default=1
+        )
+        # Segunda passada da extração: grafias com erros ou sem acento
+        self.fuzzy_matcher = FuzzyPhraseMatcher({
+            pattern: symptom_name
+            for symptom_name, patterns in self.symptom_patterns.items()
+            for pattern in patterns
+        })
         self.cid10_data = self._load_cid_data()
+        self.report_renderer = ReportRenderer()
+        
+        # Flags (grave, emergência) pré-calculadas para os sintomas canônicos
+        self._symptom_flags = {
+            symptom_name: self._compute_symptom_flags(symptom_name)
+            for symptom_name in self.symptom_patterns
+        }
+        
+        # Índice sintoma canônico -> [(posição da doença, é primário?)] usado na pontuação
+        self.disease_codes = list(self.symptom_database)
+        self._disease_totals = [
+            (len(info.get('primary_symptoms', [])), len(info.get('secondary_symptoms', [])))
+            for info in self.symptom_database.values()
+        ]
+        self.symptom_index = {
+            symptom_name: self._build_symptom_postings(symptom_name)
+            for symptom_name in self.symptom_patterns
+        }
+        
+        # Índices para a poda top-k: doenças por sintoma, sintomas por doença e limites superiores
+        self._symptom_diseases = {
+            symptom_name: frozenset(disease_idx for disease_idx, _ in postings)
+            for symptom_name, postings in self.symptom_index.items()
+        }
+        self._disease_symptoms = self._build_disease_symptoms()
+        self._bound_ranks = {}
+        self.naive_bayes = NaiveBayesScorer(self)
+        self.red_flag_screener = RedFlagScreener(self.symptom_database)
+        
+        # Cache de rankings por conjunto canônico de sintomas (independente da ordem)
+        self.knowledge_base_version = self._compute_knowledge_base_version()
+        self.result_cache = BoundedCache(max_size=4096)
+    
+    def _compute_knowledge_base_version(self) -> str:
+        """Hash da base de sintomas e padrões; muda sempre que o conhecimento muda."""
+        payload = json.dumps([self.symptom_database, self.symptom_patterns],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
     
     def _load_cid_data(self):
         """Carrega dados do CID-10."""
@@ -281,56 +374,9 @@ class DiagnosticEngine:
             }
         }
     
-    def analyze_symptoms_report(self, report: str) -> List[DiagnosticResult]:
-        """Analisa relatório de sintomas e retorna diagnósticos prováveis."""
-        if not report or len(report.strip()) < 10:
-            return []
-        
-        # Normalizar texto
-        report_lower = report.lower().strip()
-        
-        # Extrair sintomas do texto
-        extracted_symptoms = self._extract_symptoms(report_lower)
-        
-        # Calcular probabilidades para cada doença
-        diagnostic_results = []
-        
-        for cid_code, disease_info in self.symptom_database.items():
-            probability, matching_symptoms = self._calculate_disease_probability(
-                extracted_symptoms, disease_info
-            )
-            
-            if probability > 0.1:  # Threshold mínimo de 10%
-                confidence = self._determine_confidence_level(probability, len(matching_symptoms))
-                
-                result = DiagnosticResult(
-                    cid_code=cid_code,
-                    disease_name=disease_info['name'],
-                    probability=probability,
-                    matching_symptoms=matching_symptoms,
-                    confidence_level=confidence,
-                    additional_info={
-                        'total_symptoms_found': len(extracted_symptoms),
-                        'matching_symptoms_count': len(matching_symptoms),
-                        'primary_symptoms_matched': len([s for s in matching_symptoms 
-                                                       if s in disease_info.get('primary_symptoms', [])]),
-                        'recommendations': self._generate_recommendations(cid_code, probability)
-                    }
-                )
-                
-                diagnostic_results.append(result)
-        
-        # Ordenar por probabilidade
-        diagnostic_results.sort(key=lambda x: x.probability, reverse=True)
-        
-        return diagnostic_results[:5]  # Retornar top 5 diagnósticos
-    
-    def _extract_symptoms(self, text: str) -> List[str]:
-        """Extrai sintomas do texto usando padrões e palavras-chave."""
-        symptoms_found = []
-        
-        # Lista expandida de sintomas comuns
-        symptom_patterns = {
+    def _load_symptom_patterns(self) -> Dict[str, List[str]]:
+        """Carrega sintomas canônicos e as expressões que os identificam no texto."""
+        return {
             # Dor
             'dor de cabeça': ['dor de cabeça', 'cefaleia', 'dor na cabeça', 'dor craniana'],
             'dor no peito': ['dor no peito', 'dor torácica', 'aperto no peito', 'pressão no peito'],
@@ -379,15 +425,513 @@ class DiagnosticEngine:
             'visão turva': ['visão turva', 'visão embaçada', 'vista embaçada'],
             'formigamento': ['formigamento', 'dormência', 'parestesia']
         }
+    
+    def analyze_symptoms_report(self, report: str, scoring_mode: str = 'heuristic') -> List[DiagnosticResult]:
+        """Analisa relatório de sintomas e retorna diagnósticos prováveis."""
+        self.validate_scoring_mode(scoring_mode)
+        extracted_symptoms = self.extract_report_symptoms(report)
+        if extracted_symptoms is None:
+            return []
+        
+        return self._rank_diagnoses(extracted_symptoms, scoring_mode=scoring_mode)
+    
+    def extract_report_symptoms(self, report: str) -> Optional[List[str]]:
+        """Normaliza o relatório e extrai sintomas; None se o texto for curto demais."""
+        if not report or len(report.strip()) < 10:
+            return None
+        
+        return self._extract_symptoms(report.lower().strip())
+    
+    def screen_red_flags(self, report: str) -> RedFlagScreening:
+        """Triagem rápida de sinais de alarme, sem extração nem pontuação."""
+        return self.red_flag_screener.screen(report or '')
+    
+    def build_analysis_context(self, report: str, scoring_mode: str = 'heuristic',
+                               red_flags: Optional[RedFlagScreening] = None) -> AnalysisContext:
+        """Executa extração, pontuação e avaliação uma única vez para o relatório."""
+        self.validate_scoring_mode(scoring_mode)
+        normalized_report = report.lower().strip() if report else ''
+        
+        # Triagem de sinais de alarme antes da pontuação (reaproveitada se já feita)
+        if red_flags is None:
+            red_flags = self.red_flag_screener.screen(normalized_report)
+        
+        symptoms = self._extract_symptoms(normalized_report)
+        
+        # Mesmo limite mínimo de analyze_symptoms_report
+        if len(normalized_report) >= 10:
+            diagnostic_results = self._rank_diagnoses(symptoms, scoring_mode=scoring_mode)
+        else:
+            diagnostic_results = []
+        
+        return AnalysisContext(
+            report=report,
+            normalized_report=normalized_report,
+            symptoms=symptoms,
+            diagnostic_results=diagnostic_results,
+            severity=self._assess_severity(symptoms, diagnostic_results),
+            urgency=self.red_flag_screener.combine_urgency(
+                self._assess_urgency(symptoms, diagnostic_results), red_flags.urgency
+            ),
+            report_length=len(normalized_report),
+            red_flags=red_flags
+        )
+    
+    def build_analysis_context_streaming(self, chunks: Iterable[str], scoring_mode: str = 'heuristic',
+                                         red_flags: Optional[RedFlagScreening] = None) -> AnalysisContext:
+        """Como build_analysis_context, mas consumindo o texto em blocos sem mantê-lo em memória."""
+        self.validate_scoring_mode(scoring_mode)
+        
+        # Triagem de sinais de alarme nos mesmos blocos (reaproveitada se já feita)
+        if red_flags is None:
+            red_flag_scan = self.red_flag_screener.new_scan()
+            symptoms, report_length = self.extract_symptoms_streaming(chunks, red_flag_scan)
+            red_flags = self.red_flag_screener.evaluate(red_flag_scan)
+        else:
+            symptoms, report_length = self.extract_symptoms_streaming(chunks)
+        
+        if report_length >= 10:
+            diagnostic_results = self._rank_diagnoses(symptoms, scoring_mode=scoring_mode)
+        else:
+            diagnostic_results = []
+        
+        return AnalysisContext(
+            report='',
+            normalized_report='',
+            symptoms=symptoms,
+            diagnostic_results=diagnostic_results,
+            severity=self._assess_severity(symptoms, diagnostic_results),
+            urgency=self.red_flag_screener.combine_urgency(
+                self._assess_urgency(symptoms, diagnostic_results), red_flags.urgency
+            ),
+            report_length=report_length,
+            red_flags=red_flags
+        )
+    
+    def iter_text_chunks(self, text: str) -> Iterator[str]:
+        """Divide um texto já carregado em blocos de STREAM_CHUNK_SIZE caracteres."""
+        for start in range(0, len(text), self.STREAM_CHUNK_SIZE):
+            yield text[start:start + self.STREAM_CHUNK_SIZE]
+    
+    def analyze_symptom_ids(self, symptom_ids: List[str], limit: int = 5,
+                            scoring_mode: str = 'heuristic') -> List[DiagnosticResult]:
+        """Diagnostica a partir de IDs canônicos de sintomas, sem passar por texto livre."""
+        self.validate_scoring_mode(scoring_mode)
+        return self._rank_diagnoses(symptom_ids, limit, scoring_mode)
+    
+    def validate_scoring_mode(self, scoring_mode: str):
+        """Garante que o motor de pontuação solicitado existe."""
+        if scoring_mode not in self.SCORING_MODES:
+            raise ValueError(
+                f'Modo de pontuação inválido: {scoring_mode}. Use um de: {", ".join(self.SCORING_MODES)}'
+            )
+    
+    def resolve_symptom_ids(self, labels: List[str]) -> List[str]:
+        """Converte rótulos de sintomas (ex.: seleção objetiva) em IDs canônicos."""
+        symptom_ids = []
+        for label in labels:
+            for symptom_id in self.resolve_symptom_label(label):
+                if symptom_id not in symptom_ids:
+                    symptom_ids.append(symptom_id)
+        return symptom_ids
+    
+    def resolve_symptom_label(self, label: str) -> List[str]:
+        """Retorna os IDs canônicos de um rótulo; rótulos sem padrão viram o próprio ID."""
+        normalized = label.lower().strip()
+        symptom_ids = self._extract_symptoms(normalized)
+        if not symptom_ids and self.get_symptom_postings(normalized):
+            symptom_ids = [normalized]
+        return symptom_ids
+    
+    def _build_symptom_postings(self, symptom: str) -> List[Tuple[int, bool]]:
+        """Lista as doenças em que o sintoma conta como primário ou secundário."""
+        postings = []
+        for disease_idx, disease_info in enumerate(self.symptom_database.values()):
+            # Mesma precedência de _calculate_disease_probability: primário antes de secundário
+            if any(self._symptoms_match(symptom, primary)
+                   for primary in disease_info.get('primary_symptoms', [])):
+                postings.append((disease_idx, True))
+            elif any(self._symptoms_match(symptom, secondary)
+                     for secondary in disease_info.get('secondary_symptoms', [])):
+                postings.append((disease_idx, False))
+        return postings
+    
+    def get_symptom_postings(self, symptom_id: str) -> List[Tuple[int, bool]]:
+        """Retorna as doenças afetadas por um sintoma (pré-calculadas para os canônicos)."""
+        postings = self.symptom_index.get(symptom_id)
+        if postings is None:
+            postings = self._build_symptom_postings(symptom_id)
+        return postings
+    
+    def score_disease(self, disease_idx: int, primary_matches: int, secondary_matches: int) -> float:
+        """Probabilidade de uma doença a partir das contagens de correspondências."""
+        if primary_matches + secondary_matches == 0:
+            return 0.0
+        
+        # Mesmos pesos de _calculate_disease_probability
+        primary_weight = 0.8
+        secondary_weight = 0.3
+        
+        total_primary, total_secondary = self._disease_totals[disease_idx]
+        
+        if total_primary > 0:
+            primary_score = (primary_matches / total_primary) * primary_weight
+        else:
+            primary_score = 0
+        
+        if total_secondary > 0:
+            secondary_score = (secondary_matches / total_secondary) * secondary_weight
+        else:
+            secondary_score = 0
+        
+        symptom_bonus = min((primary_matches + secondary_matches) * 0.1, 0.3)
+        
+        return min(primary_score + secondary_score + symptom_bonus, 1.0)
+    
+    def _rank_diagnoses(self, extracted_symptoms: List[str], limit: int = 5,
+                        scoring_mode: str = 'heuristic') -> List[DiagnosticResult]:
+        """Calcula probabilidades para as doenças afetadas e retorna as mais prováveis."""
+        # Conjuntos repetidos de sintomas pulam a pontuação
+        cache_key = self._result_cache_key(extracted_symptoms, limit, scoring_mode)
+        ranked = self.result_cache.get(cache_key)
+        
+        if ranked is None:
+            if scoring_mode == 'heuristic' and self._can_prune(extracted_symptoms):
+                ranked = self._select_top_pruned(extracted_symptoms, limit)
+            else:
+                scores, matching = self._score_symptoms(extracted_symptoms, scoring_mode)
+                ranked = self._select_top(scores, matching, limit)
+            self.result_cache.put(cache_key, ranked)
+        else:
+            ranked = self._in_request_order(ranked, extracted_symptoms)
+        
+        return self._materialize_results(ranked, len(extracted_symptoms))
+    
+    def rank_diagnoses_batch(self, requests: List[Tuple[List[str], int, str]]) -> List[List[DiagnosticResult]]:
+        """Ranqueia vários conjuntos de sintomas (IDs, limite, modo) de uma só vez.
+
+        Conjuntos repetidos no lote são pontuados uma única vez e, no modo
+        heurístico, cada sintoma distinto tem sua lista de doenças percorrida
+        uma vez para todo o lote. O resultado de cada requisição é idêntico ao
+        de _rank_diagnoses.
+        """
+        cache_keys = [self._result_cache_key(symptom_ids, limit, scoring_mode)
+                      for symptom_ids, limit, scoring_mode in requests]
+        
+        ranked_by_key = {}
+        pending = {}
+        for cache_key, request in zip(cache_keys, requests):
+            if cache_key in ranked_by_key or cache_key in pending:
+                continue
+            ranked = self.result_cache.get(cache_key)
+            if ranked is None:
+                pending[cache_key] = request
+            else:
+                ranked_by_key[cache_key] = ranked
+        
+        heuristic_keys = [cache_key for cache_key, request in pending.items() if request[2] == 'heuristic']
+        batch_scores = self._score_heuristic_batch([pending[cache_key][0] for cache_key in heuristic_keys])
+        for cache_key, (scores, matching) in zip(heuristic_keys, batch_scores):
+            ranked_by_key[cache_key] = self._select_top(scores, matching, pending[cache_key][1])
+        
+        for cache_key, (symptom_ids, limit, scoring_mode) in pending.items():
+            if scoring_mode != 'heuristic':
+                scores, matching = self._score_symptoms(symptom_ids, scoring_mode)
+                ranked_by_key[cache_key] = self._select_top(scores, matching, limit)
+            self.result_cache.put(cache_key, ranked_by_key[cache_key])
+        
+        return [
+            self._materialize_results(self._in_request_order(ranked_by_key[cache_key], symptom_ids),
+                                      len(symptom_ids))
+            for cache_key, (symptom_ids, _, _) in zip(cache_keys, requests)
+        ]
+    
+    def _score_heuristic_batch(self, symptom_sets: List[List[str]]) -> List[Tuple[Dict[int, float], Dict[int, List[str]]]]:
+        """Pontuação heurística de um lote, percorrendo o índice sintoma a sintoma."""
+        # Sintoma -> posições no lote que o contêm (matriz esparsa sintoma × lote)
+        members = {}
+        for batch_idx, symptom_ids in enumerate(symptom_sets):
+            for symptom in symptom_ids:
+                members.setdefault(symptom, []).append(batch_idx)
+        
+        batch_counts = [{} for _ in symptom_sets]
+        for symptom, batch_indices in members.items():
+            postings = self.get_symptom_postings(symptom)
+            for batch_idx in batch_indices:
+                counts = batch_counts[batch_idx]
+                for disease_idx, is_primary in postings:
+                    entry = counts.get(disease_idx)
+                    if entry is None:
+                        entry = counts[disease_idx] = [0, 0, []]
+                    entry[0 if is_primary else 1] += 1
+                    entry[2].append(symptom)
+        
+        results = []
+        for symptom_ids, counts in zip(symptom_sets, batch_counts):
+            # Sintomas correspondentes na ordem da requisição, como em _score_symptoms
+            order = {}
+            for position, symptom in enumerate(symptom_ids):
+                order.setdefault(symptom, position)
+            
+            scores = {
+                disease_idx: self.score_disease(disease_idx, primary_matches, secondary_matches)
+                for disease_idx, (primary_matches, secondary_matches, _) in counts.items()
+            }
+            matching = {disease_idx: sorted(entry[2], key=order.get) for disease_idx, entry in counts.items()}
+            results.append((scores, matching))
+        
+        return results
+    
+    def _result_cache_key(self, symptom_ids: List[str], limit: int, scoring_mode: str) -> str:
+        """Chave do cache: hash dos IDs canônicos ordenados e da versão da base.
+
+        Repetições fazem parte da chave, pois a pontuação conta cada ocorrência.
+        """
+        payload = '\x1f'.join([self.knowledge_base_version, scoring_mode, str(limit)]
+                               + sorted(symptom_ids))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _in_request_order(ranked: List[Tuple[float, str, Tuple[str, ...]]],
+                          symptom_ids: List[str]) -> List[Tuple[float, str, Tuple[str, ...]]]:
+        """Sintomas correspondentes na ordem da requisição (o ranking em cache pode vir de outra ordem)."""
+        reordered = []
+        for probability, cid_code, matching_symptoms in ranked:
+            matched = set(matching_symptoms)
+            reordered.append((probability, cid_code, tuple(s for s in symptom_ids if s in matched)))
+        return reordered
+    
+    def _score_symptoms(self, symptom_ids: List[str],
+                        scoring_mode: str) -> Tuple[Dict[int, float], Dict[int, List[str]]]:
+        """Pontua as doenças afetadas pelos sintomas no motor selecionado."""
+        if scoring_mode == 'naive_bayes':
+            return self.naive_bayes.score(symptom_ids)
+        
+        # Acumular contagens apenas para doenças presentes no índice dos sintomas
+        counts = {}
+        for symptom in symptom_ids:
+            for disease_idx, is_primary in self.get_symptom_postings(symptom):
+                entry = counts.get(disease_idx)
+                if entry is None:
+                    entry = counts[disease_idx] = [0, 0, []]
+                entry[0 if is_primary else 1] += 1
+                entry[2].append(symptom)
+        
+        scores = {
+            disease_idx: self.score_disease(disease_idx, primary_matches, secondary_matches)
+            for disease_idx, (primary_matches, secondary_matches, _) in counts.items()
+        }
+        matching = {disease_idx: entry[2] for disease_idx, entry in counts.items()}
+        
+        return scores, matching
+    
+    def rank_scored_diseases(self, scores: Dict[int, float], matching: Dict[int, List[str]],
+                             total_symptoms_found: int, limit: int = 5) -> List[DiagnosticResult]:
+        """Seleciona as doenças de maior pontuação e materializa apenas essas."""
+        return self._materialize_results(self._select_top(scores, matching, limit), total_symptoms_found)
+    
+    def _build_disease_symptoms(self) -> List[Dict[str, bool]]:
+        """Índice invertido doença -> {sintoma canônico: é primário?}."""
+        disease_symptoms = [{} for _ in self.disease_codes]
+        for symptom_name, postings in self.symptom_index.items():
+            for disease_idx, is_primary in postings:
+                disease_symptoms[disease_idx][symptom_name] = is_primary
+        return disease_symptoms
+    
+    def _can_prune(self, symptom_ids: List[str]) -> bool:
+        """A poda exige sintomas canônicos e distintos (limites calculados sobre o índice)."""
+        return (all(symptom in self._symptom_diseases for symptom in symptom_ids)
+                and len(set(symptom_ids)) == len(symptom_ids))
+    
+    def _score_upper_bound(self, disease_idx: int, symptom_count: int) -> float:
+        """Maior pontuação que a doença pode atingir com symptom_count sintomas canônicos."""
+        disease_symptoms = self._disease_symptoms[disease_idx]
+        primary_available = sum(1 for is_primary in disease_symptoms.values() if is_primary)
+        secondary_available = len(disease_symptoms) - primary_available
+        
+        best = 0.0
+        for primary_matches in range(min(symptom_count, primary_available) + 1):
+            secondary_matches = min(symptom_count - primary_matches, secondary_available)
+            best = max(best, self.score_disease(disease_idx, primary_matches, secondary_matches))
+        return best
+    
+    def _get_bound_ranks(self, symptom_count: int) -> Tuple[List[float], List[int]]:
+        """Limites superiores e posição de cada doença na ordem decrescente (memoizados por nº de sintomas)."""
+        # Acima do maior nº de sintomas indexados por doença os limites não mudam
+        symptom_count = min(symptom_count, max((len(d) for d in self._disease_symptoms), default=0))
+        cached = self._bound_ranks.get(symptom_count)
+        if cached is None:
+            bounds = [self._score_upper_bound(disease_idx, symptom_count)
+                      for disease_idx in range(len(self.disease_codes))]
+            order = sorted(range(len(bounds)), key=lambda disease_idx: (-bounds[disease_idx], disease_idx))
+            ranks = [0] * len(bounds)
+            for position, disease_idx in enumerate(order):
+                ranks[disease_idx] = position
+            cached = self._bound_ranks[symptom_count] = (bounds, ranks)
+        return cached
+    
+    def _select_top_pruned(self, symptom_ids: List[str],
+                           limit: int) -> List[Tuple[float, str, Tuple[str, ...]]]:
+        """Mesmo resultado de _select_top(_score_symptoms(...)), pontuando as candidatas em
+        ordem decrescente de limite superior e parando quando nenhuma outra pode entrar."""
+        if limit <= 0:
+            return []
+        
+        bounds, ranks = self._get_bound_ranks(len(symptom_ids))
+        candidates = set().union(*(self._symptom_diseases[symptom] for symptom in symptom_ids))
+        
+        top = []  # heap mínimo de (probabilidade, -posição, sintomas)
+        for disease_idx in sorted(candidates, key=ranks.__getitem__):
+            bound = bounds[disease_idx]
+            # Limite estrito: empates ainda podem entrar pela ordem da base
+            if bound <= 0.1 or (len(top) == limit and top[0][0] > bound):
+                break
+            
+            disease_symptoms = self._disease_symptoms[disease_idx]
+            primary_matches = secondary_matches = 0
+            matching = []
+            for symptom in symptom_ids:
+                is_primary = disease_symptoms.get(symptom)
+                if is_primary is None:
+                    continue
+                if is_primary:
+                    primary_matches += 1
+                else:
+                    secondary_matches += 1
+                matching.append(symptom)
+            
+            probability = self.score_disease(disease_idx, primary_matches, secondary_matches)
+            if probability <= 0.1:
+                continue
+            
+            entry = (probability, -disease_idx, matching)
+            if len(top) < limit:
+                heapq.heappush(top, entry)
+            elif entry[:2] > top[0][:2]:
+                heapq.heapreplace(top, entry)
+        
+        return [(probability, self.disease_codes[-neg_idx], tuple(matching))
+                for probability, neg_idx, matching in sorted(top, reverse=True)]
+    
+    def _select_top(self, scores: Dict[int, float], matching: Dict[int, List[str]],
+                    limit: int) -> List[Tuple[float, str, Tuple[str, ...]]]:
+        """Ranqueia tuplas leves (probabilidade, código, sintomas); threshold mínimo de 10%."""
+        candidates = [(probability, disease_idx) for disease_idx, probability in scores.items()
+                      if probability > 0.1]
+        
+        # Empates mantêm a ordem da base de sintomas
+        top_candidates = heapq.nlargest(limit, candidates, key=lambda c: (c[0], -c[1]))
+        
+        return [(probability, self.disease_codes[disease_idx], tuple(matching[disease_idx]))
+                for probability, disease_idx in top_candidates]
+    
+    def _materialize_results(self, ranked: List[Tuple[float, str, Tuple[str, ...]]],
+                             total_symptoms_found: int) -> List[DiagnosticResult]:
+        """Constrói DiagnosticResult (confiança, recomendações, metadados) só para os retornados."""
+        results = []
+        for probability, cid_code, matching_symptoms in ranked:
+            disease_info = self.symptom_database[cid_code]
+            primary_symptoms = disease_info.get('primary_symptoms', [])
+            
+            results.append(DiagnosticResult(
+                cid_code=cid_code,
+                disease_name=disease_info['name'],
+                probability=probability,
+                matching_symptoms=list(matching_symptoms),
+                confidence_level=self._determine_confidence_level(probability, len(matching_symptoms)),
+                additional_info={
+                    'total_symptoms_found': total_symptoms_found,
+                    'matching_symptoms_count': len(matching_symptoms),
+                    'primary_symptoms_matched': sum(1 for s in matching_symptoms if s in primary_symptoms),
+                    'recommendations': self._generate_recommendations(cid_code, probability)
+                }
+            ))
         
-        # Buscar padrões no texto
-        for symptom_name, patterns in symptom_patterns.items():
+        return results
+    
+    def _extract_symptoms(self, text: str) -> List[str]:
+        """Extrai sintomas do texto usando padrões e palavras-chave."""
+        symptoms_found = []
+        
+        # Buscar padrões no texto (cada sintoma canônico aparece uma única vez)
+        for symptom_name, patterns in self.symptom_patterns.items():
             for pattern in patterns:
                 if pattern in text:
                     symptoms_found.append(symptom_name)
-                    break  # Evitar duplicatas
+                    break
+        
+        # Depois da busca exata, procurar com tolerância só o que ainda não foi encontrado
+        fuzzy_found = [symptom_name for symptom_name in self.fuzzy_matcher.find(text)
+                       if symptom_name not in symptoms_found]
+        if fuzzy_found:
+            found = set(symptoms_found).union(fuzzy_found)
+            symptoms_found = [symptom_name for symptom_name in self.symptom_patterns if symptom_name in found]
+        
+        return symptoms_found
+    
+    def extract_symptoms_streaming(self, chunks: Iterable[str],
+                                   red_flag_scan=None) -> Tuple[List[str], int]:
+        """Extrai sintomas de um texto recebido em blocos, com memória limitada.
+
+        A busca exata usa cada bloco junto com o final do anterior (tamanho do
+        maior padrão - 1). A busca aproximada só recebe palavras completas: a
+        palavra final de cada bloco, possivelmente cortada, passa para o bloco
+        seguinte junto com as últimas palavras (tamanho da maior frase do léxico
+        - 1). Retorna os mesmos sintomas de _extract_symptoms, na mesma ordem, e
+        o total de caracteres lidos. Se red_flag_scan for informado, a triagem de
+        sinais de alarme é feita nos mesmos blocos.
+        """
+        overlap = self._max_pattern_length - 1
+        fuzzy_overlap = self.fuzzy_matcher.max_phrase_words - 1
+        pending = dict(self.symptom_patterns)
+        found = set()
+        tail = ''
+        fuzzy_tail = ''
+        report_length = 0
         
-        return list(set(symptoms_found))  # Remover duplicatas
+        for chunk in chunks:
+            if not chunk:
+                continue
+            report_length += len(chunk)
+            lowered = chunk.lower()
+            window = tail + lowered
+            
+            # Sintomas já encontrados não são buscados de novo
+            for symptom_name, patterns in list(pending.items()):
+                if any(pattern in window for pattern in patterns):
+                    found.add(symptom_name)
+                    del pending[symptom_name]
+            
+            fuzzy_window = fuzzy_tail + fold_text(lowered)
+            partial_word = _TRAILING_WORD_PATTERN.search(fuzzy_window)
+            cut = partial_word.start() if partial_word else len(fuzzy_window)
+            fuzzy_tail = self._find_fuzzy_symptoms(fuzzy_window[:cut], pending, found, fuzzy_overlap)
+            fuzzy_tail += fuzzy_window[cut:]
+            
+            if red_flag_scan is not None:
+                self.red_flag_screener.scan_chunk(lowered, red_flag_scan)
+            
+            tail = window[-overlap:] if overlap > 0 else ''
+        
+        self._find_fuzzy_symptoms(fuzzy_tail, pending, found, 0)
+        if red_flag_scan is not None:
+            self.red_flag_screener.scan_chunk('', red_flag_scan, final=True)
+        
+        symptoms = [symptom_name for symptom_name in self.symptom_patterns if symptom_name in found]
+        return symptoms, report_length
+    
+    def _find_fuzzy_symptoms(self, text: str, pending: Dict[str, List[str]], found: Set[str],
+                             keep_words: int) -> str:
+        """Busca aproximada em um trecho de palavras completas; retorna as últimas keep_words palavras."""
+        words = tokenize(text)
+        for symptom_name in self.fuzzy_matcher.find(' '.join(words)):
+            if symptom_name in pending:
+                found.add(symptom_name)
+                del pending[symptom_name]
+        
+        if not words or keep_words <= 0:
+            return ''
+        return ' '.join(words[-keep_words:]) + ' '
     
     def _calculate_disease_probability(self, symptoms: List[str], disease_info: Dict) -> Tuple[float, List[str]]:
         """Calcula probabilidade de uma doença baseada nos sintomas."""
@@ -517,84 +1061,64 @@ class DiagnosticEngine:
         return recommendations
     
     def generate_medical_report(self, diagnostic_results: List[DiagnosticResult], 
-                              original_symptoms: str) -> str:
+                              original_symptoms: str, fmt: str = 'text') -> str:
         """Gera relatório médico baseado nos resultados do diagnóstico."""
-        if not diagnostic_results:
-            return "Não foi possível identificar um diagnóstico provável baseado nos sintomas relatados."
-        
-        report = "RELATÓRIO DE ANÁLISE DE SINTOMAS\n"
-        report += "=" * 50 + "\n\n"
-        
-        report += f"SINTOMAS RELATADOS:\n{original_symptoms}\n\n"
-        
-        report += "DIAGNÓSTICOS PROVÁVEIS:\n\n"
-        
-        for i, result in enumerate(diagnostic_results[:3], 1):
-            report += f"{i}. {result.disease_name} (CID: {result.cid_code})\n"
-            report += f"   Probabilidade: {result.probability:.1%}\n"
-            report += f"   Confiança: {result.confidence_level.title()}\n"
-            report += f"   Sintomas correspondentes: {', '.join(result.matching_symptoms)}\n"
-            
-            if result.additional_info.get('recommendations'):
-                report += f"   Recomendações:\n"
-                for rec in result.additional_info['recommendations']:
-                    report += f"   - {rec}\n"
-            
-            report += "\n"
-        
-        report += "OBSERVAÇÕES IMPORTANTES:\n"
-        report += "- Este relatório é baseado em análise automatizada de sintomas\n"
-        report += "- Não substitui consulta médica presencial\n"
-        report += "- Procure atendimento médico para diagnóstico definitivo\n"
-        report += "- Em caso de emergência, procure atendimento imediato\n"
-        
-        return report
+        return self.report_renderer.render_medical_report(diagnostic_results, original_symptoms, fmt)
+    
+    def iter_medical_report(self, diagnostic_results: List[DiagnosticResult],
+                            original_symptoms: str, fmt: str = 'text') -> Iterator[str]:
+        """Gera o relatório médico em partes, para respostas em streaming."""
+        return self.report_renderer.iter_medical_report(diagnostic_results, original_symptoms, fmt)
     
-    def analyze_medical_report_advanced(self, report: str) -> Dict:
+    def analyze_medical_report_advanced(self, report: str,
+                                        context: Optional[AnalysisContext] = None) -> Dict:
         """Análise avançada de laudo médico com extração de informações estruturadas."""
+        # Reaproveitar contexto já calculado pela rota, se houver
+        if context is None:
+            context = self.build_analysis_context(report)
+        
+        diagnostic_results = context.diagnostic_results
+        
         analysis = {
-            'symptoms_extracted': [],
-            'possible_diagnoses': [],
-            'severity_assessment': 'não determinada',
-            'urgency_level': 'rotina',
+            'symptoms_extracted': context.symptoms,
+            'possible_diagnoses': [
+                {
+                    'cid_code': result.cid_code,
+                    'disease_name': result.disease_name,
+                    'probability': result.probability,
+                    'confidence': result.confidence_level
+                }
+                for result in diagnostic_results
+            ],
+            'severity_assessment': context.severity,
+            'urgency_level': context.urgency,
+            'red_flags': [asdict(flag) for flag in context.red_flags.red_flags] if context.red_flags else [],
             'recommendations': [],
             'follow_up_needed': True
         }
         
-        # Extrair sintomas
-        symptoms = self._extract_symptoms(report.lower())
-        analysis['symptoms_extracted'] = symptoms
-        
-        # Obter diagnósticos prováveis
-        diagnostic_results = self.analyze_symptoms_report(report)
-        analysis['possible_diagnoses'] = [
-            {
-                'cid_code': result.cid_code,
-                'disease_name': result.disease_name,
-                'probability': result.probability,
-                'confidence': result.confidence_level
-            }
-            for result in diagnostic_results
-        ]
-        
-        # Avaliar gravidade e urgência
-        analysis['severity_assessment'] = self._assess_severity(symptoms, diagnostic_results)
-        analysis['urgency_level'] = self._assess_urgency(symptoms, diagnostic_results)
-        
         # Gerar recomendações
         if diagnostic_results:
             analysis['recommendations'] = diagnostic_results[0].additional_info.get('recommendations', [])
         
         return analysis
     
+    def _compute_symptom_flags(self, symptom: str) -> Tuple[bool, bool]:
+        """Indica se o sintoma conta como grave e/ou como sinal de emergência."""
+        is_severe = any(severe in symptom for severe in self.SEVERE_SYMPTOMS)
+        is_emergency = any(emergency in symptom for emergency in self.EMERGENCY_SYMPTOMS)
+        return is_severe, is_emergency
+    
+    def _get_symptom_flags(self, symptom: str) -> Tuple[bool, bool]:
+        """Retorna flags pré-calculadas, calculando apenas para sintomas não canônicos."""
+        flags = self._symptom_flags.get(symptom)
+        if flags is None:
+            flags = self._compute_symptom_flags(symptom)
+        return flags
+    
     def _assess_severity(self, symptoms: List[str], diagnostic_results: List[DiagnosticResult]) -> str:
         """Avalia gravidade baseada nos sintomas e diagnósticos."""
-        severe_symptoms = [
-            'dor no peito', 'falta de ar', 'convulsões', 'sangue na urina',
-            'febre alta', 'perda de consciência'
-        ]
-        
-        severe_count = sum(1 for symptom in symptoms if any(severe in symptom for severe in severe_symptoms))
+        severe_count = sum(1 for symptom in symptoms if self._get_symptom_flags(symptom)[0])
         
         if severe_count >= 2:
             return 'grave'
@@ -607,12 +1131,7 @@ class DiagnosticEngine:
     
     def _assess_urgency(self, symptoms: List[str], diagnostic_results: List[DiagnosticResult]) -> str:
         """Avalia urgência do atendimento."""
-        emergency_symptoms = [
-            'dor no peito', 'falta de ar', 'convulsões', 'perda de consciência',
-            'sangramento', 'febre alta'
-        ]
-        
-        emergency_count = sum(1 for symptom in symptoms if any(emergency in symptom for emergency in emergency_symptoms))
+        emergency_count = sum(1 for symptom in symptoms if self._get_symptom_flags(symptom)[1])
         
         if emergency_count >= 2:
             return 'emergência'
@@ -622,4 +1141,3 @@ class DiagnosticEngine:
             return 'prioritário'
         else:
             return 'rotina'
-
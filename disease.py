@@ -1,5 +1,6 @@
 import json
 import os
+import re
 from difflib import SequenceMatcher
 
 # Carregar dados CID-10
@@ -385,7 +386,11 @@ def generate_non_medication_therapies(disease_name):
         'gastrite': ['Dieta adequada', 'Evitar álcool e fumo', 'Controle do estresse', 'Refeições regulares', 'Evitar alimentos irritantes'],
         'depressão': ['Psicoterapia', 'Exercícios físicos', 'Atividades sociais', 'Técnicas de relaxamento', 'Suporte familiar'],
         'ansiedade': ['Terapia cognitivo-comportamental', 'Técnicas de relaxamento', 'Exercícios físicos', 'Meditação', 'Suporte psicológico'],
-        'febre': ['Repouso', 'Hidratação abundante', 'Compressas frias', 'Roupas leves', 'Ambiente ventilado']
+        'febre': ['Repouso', 'Hidratação abundante', 'Compressas frias', 'Roupas leves', 'Ambiente ventilado'],
+        # Terapias específicas para esquizofrenia e outras doenças
+        'esquizofrenia': ['Psicoterapia individual', 'Terapia familiar', 'Reabilitação psicossocial', 'Terapia ocupacional', 'Suporte comunitário', 'Grupos de apoio'],
+        'epilepsia': ['Evitar fatores desencadeantes', 'Sono adequado', 'Controle do estresse', 'Atividade física moderada', 'Dieta cetogênica (em casos específicos)'],
+        'doença renal': ['Dieta com restrição de proteína', 'Controle da pressão arterial', 'Controle do diabetes', 'Hidratação adequada', 'Exercícios físicos leves']
     }
     
     # Buscar terapias por palavras-chave no nome da doença
@@ -421,65 +426,6 @@ def generate_default_medications(disease_name):
     
     return [{'principio_ativo': 'Consultar médico', 'nomes_comerciais': ['Prescrição médica necessária'], 'dosagem_usual': 'Conforme orientação médica', 'via_administracao': 'Conforme prescrição'}]
 
-def analyze_medical_report(report):
-    """Analisa laudo médico e retorna diagnóstico provável."""
-    report_lower = report.lower()
-    
-    # Dicionário de palavras-chave para diagnósticos
-    diagnosis_keywords = {
-        'hipertensão': ['pressão alta', 'hipertensão', 'pressão arterial elevada', 'pa elevada'],
-        'diabetes': ['diabetes', 'glicemia elevada', 'hiperglicemia', 'açúcar alto'],
-        'pneumonia': ['pneumonia', 'infecção pulmonar', 'consolidação pulmonar', 'infiltrado pulmonar'],
-        'gripe': ['gripe', 'influenza', 'síndrome gripal', 'resfriado'],
-        'asma': ['asma', 'broncoespasmo', 'chiado', 'sibilos'],
-        'gastrite': ['gastrite', 'inflamação gástrica', 'dor epigástrica', 'úlcera'],
-        'depressão': ['depressão', 'transtorno depressivo', 'humor deprimido', 'tristeza'],
-        'ansiedade': ['ansiedade', 'transtorno de ansiedade', 'pânico', 'fobia'],
-        'febre': ['febre', 'temperatura elevada', 'hipertermia', 'estado febril']
-    }
-    
-    # Buscar por palavras-chave no laudo
-    for disease, keywords in diagnosis_keywords.items():
-        for keyword in keywords:
-            if keyword in report_lower:
-                # Encontrar a doença correspondente no CID-10
-                for d in cid10_data:
-                    if disease in d.get('nome', '').lower():
-                        # Enriquecer com informações completas
-                        if medication_enricher:
-                            enriched_disease = medication_enricher.enrich_disease_with_medications(d)
-                        else:
-                            enriched_disease = d
-                            enriched_disease['medications'] = generate_default_medications(d.get('nome', ''))
-                        
-                        return {
-                            'cid_code': d.get('codigo', ''),
-                            'name': d.get('nome', ''),
-                            'symptoms': generate_symptoms_for_disease(d.get('nome', '')),
-                            'medications': enriched_disease.get('medications', []),
-                            'non_medication_therapies': generate_non_medication_therapies(d.get('nome', ''))
-                        }
-    
-    return None
-
-
-    
-    # Adicionando terapias específicas para esquizofrenia e outras doenças mentais
-    therapies_map.update({
-        'esquizofrenia': ['Psicoterapia individual', 'Terapia familiar', 'Reabilitação psicossocial', 'Terapia ocupacional', 'Suporte comunitário', 'Grupos de apoio'],
-        'epilepsia': ['Evitar fatores desencadeantes', 'Sono adequado', 'Controle do estresse', 'Atividade física moderada', 'Dieta cetogênica (em casos específicos)'],
-        'doença renal': ['Dieta com restrição de proteína', 'Controle da pressão arterial', 'Controle do diabetes', 'Hidratação adequada', 'Exercícios físicos leves']
-    })
-    
-    # Buscar terapias por palavras-chave no nome da doença
-    disease_lower = disease_name.lower()
-    for key, therapies in therapies_map.items():
-        if key in disease_lower:
-            return therapies
-    
-    # Terapias genéricas se não encontrar específicas
-    return ['Consulte um médico para orientações específicas de tratamento não medicamentoso']
-
 def generate_default_medications(disease_name):
     """Gera medicamentos padrão baseados no nome da doença."""
     medications_map = {
@@ -519,27 +465,71 @@ def generate_default_medications(disease_name):
     # Medicamentos genéricos se não encontrar específicos
     return [{'principio_ativo': 'Consulte um médico', 'nomes_comerciais': ['Prescrição médica necessária']}]
 
+# Palavras-chave de diagnóstico, em ordem de prioridade (a primeira doença encontrada no laudo vence)
+DIAGNOSIS_KEYWORDS = [
+    ('I10', 'Hipertensão essencial', ['hipertensão', 'pressão alta', 'pressão arterial elevada', 'pa elevada']),
+    ('E11', 'Diabetes mellitus não-insulino-dependente', ['diabetes', 'glicemia elevada', 'hiperglicemia', 'açúcar alto']),
+    ('F20', 'Esquizofrenia', ['esquizofrenia']),
+    ('F32', 'Episódios depressivos', ['depressão', 'transtorno depressivo', 'humor deprimido', 'tristeza']),
+    ('G40', 'Epilepsia', ['epilepsia']),
+    ('J18', 'Pneumonia por organismo não especificado', ['pneumonia', 'infecção pulmonar', 'consolidação pulmonar', 'infiltrado pulmonar']),
+    ('J11', 'Influenza devida a vírus não identificado', ['gripe', 'influenza', 'síndrome gripal', 'resfriado']),
+    ('J45', 'Asma', ['asma', 'broncoespasmo', 'chiado', 'sibilos']),
+    ('K29', 'Gastrite e duodenite', ['gastrite', 'inflamação gástrica', 'dor epigástrica', 'úlcera']),
+    ('F41', 'Outros transtornos ansiosos', ['ansiedade', 'transtorno de ansiedade', 'pânico', 'fobia']),
+    ('R50', 'Febre não especificada', ['febre', 'temperatura elevada', 'hipertermia', 'estado febril'])
+]
+
+def build_diagnosis_index():
+    """Compila as palavras-chave em uma única regex e resolve os códigos no catálogo CID-10.
+
+    Retorna a regex, o mapa palavra-chave -> prioridade e os diagnósticos
+    (com sintomas e terapias já gerados) indexados por prioridade.
+    """
+    cid10_code_index = {d.get('code', '').upper(): d for d in cid10_data if d.get('code')}
+    
+    keyword_priority = {}
+    diagnoses = []
+    for priority, (codigo, default_name, keywords) in enumerate(DIAGNOSIS_KEYWORDS):
+        catalog_entry = cid10_code_index.get(codigo)
+        nome = catalog_entry.get('description', default_name) if catalog_entry else default_name
+        
+        diagnoses.append({
+            'codigo': codigo,
+            'nome': nome,
+            'symptoms': generate_symptoms_for_disease(nome),
+            'medications': generate_default_medications(nome),
+            'non_medication_therapies': generate_non_medication_therapies(nome)
+        })
+        for keyword in keywords:
+            keyword_priority.setdefault(keyword, priority)
+    
+    # Palavras-chave mais longas primeiro para a alternância preferir o termo completo
+    ordered_keywords = sorted(keyword_priority, key=len, reverse=True)
+    pattern = re.compile('|'.join(re.escape(keyword) for keyword in ordered_keywords))
+    
+    return pattern, keyword_priority, diagnoses
+
 def analyze_medical_report(report):
-    """Analisa laudo médico e retorna possível diagnóstico."""
-    # Implementação simplificada - em produção seria mais complexa
+    """Analisa laudo médico e retorna possível diagnóstico (uma única passada sobre o texto)."""
     report_lower = report.lower()
     
-    # Mapear palavras-chave para diagnósticos
-    diagnosis_keywords = {
-        'hipertensão': {'codigo': 'I10', 'nome': 'Hipertensão essencial'},
-        'diabetes': {'codigo': 'E11', 'nome': 'Diabetes mellitus não-insulino-dependente'},
-        'esquizofrenia': {'codigo': 'F20', 'nome': 'Esquizofrenia'},
-        'depressão': {'codigo': 'F32', 'nome': 'Episódios depressivos'},
-        'epilepsia': {'codigo': 'G40', 'nome': 'Epilepsia'}
-    }
+    best_priority = None
+    for match in diagnosis_pattern.finditer(report_lower):
+        priority = diagnosis_keyword_priority[match.group(0)]
+        if best_priority is None or priority < best_priority:
+            best_priority = priority
+            if priority == 0:
+                break
     
-    for keyword, diagnosis in diagnosis_keywords.items():
-        if keyword in report_lower:
-            # Enriquecer diagnóstico com sintomas e tratamentos
-            diagnosis['symptoms'] = generate_symptoms_for_disease(diagnosis['nome'])
-            diagnosis['medications'] = generate_default_medications(diagnosis['nome'])
-            diagnosis['non_medication_therapies'] = generate_non_medication_therapies(diagnosis['nome'])
-            return diagnosis
+    if best_priority is None:
+        return None
     
-    return None
+    diagnosis = dict(indexed_diagnoses[best_priority])
+    # Chaves do esquema atual, mantendo as legadas (codigo/nome)
+    diagnosis['cid_code'] = diagnosis['codigo']
+    diagnosis['name'] = diagnosis['nome']
+    return diagnosis
 
+# Índice compilado na inicialização
+diagnosis_pattern, diagnosis_keyword_priority, indexed_diagnoses = build_diagnosis_index()
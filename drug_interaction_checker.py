@@ -1,44 +1,32 @@
+"""
+Verificador de interações da API legada (/api/interactions).
+A triagem é feita pelo verificador indexado da API v2, com todos os pares do
+regime; este módulo apenas adapta o resumo ao formato antigo da resposta.
+"""
+from typing import Dict, List, Optional
+from src.services.enhanced_drug_interaction_checker import EnhancedDrugInteractionChecker, get_shared_checker
+
+
 class DrugInteractionChecker:
-    def __init__(self):
-        # Dados de exemplo para interações medicamentosas
-        self.interactions_data = {
-            ("dipirona", "paracetamol"): {
-                "severity": "Leve",
-                "description": "Aumento do risco de toxicidade hepática com uso prolongado e doses elevadas.",
-                "recommendation": "Evitar o uso concomitante. Se necessário, monitorar a função hepática."
-            },
-            ("amoxicilina", "metotrexato"): {
-                "severity": "Moderada",
-                "description": "Amoxicilina pode diminuir a excreção renal de metotrexato, aumentando sua toxicidade.",
-                "recommendation": "Monitorar níveis de metotrexato e toxicidade. Ajustar dose se necessário."
-            },
-            ("varfarina", "aspirina"): {
-                "severity": "Grave",
-                "description": "Aumento significativo do risco de sangramento.",
-                "recommendation": "Contraindicado. Se o uso for inevitável, monitorar rigorosamente o INR e sinais de sangramento."
-            },
-            ("insulina", "betabloqueador"): {
-                "severity": "Moderada",
-                "description": "Betabloqueadores podem mascarar sintomas de hipoglicemia (tremores, taquicardia).",
-                "recommendation": "Monitorar glicemia mais frequentemente. Educar o paciente sobre sintomas atípicos de hipoglicemia."
-            }
-        }
+    def __init__(self, checker: Optional[EnhancedDrugInteractionChecker] = None):
+        # Sem verificador explícito, usa a instância compartilhada com a API v2 (mesma base e recargas)
+        self._checker = checker
+
+    @property
+    def checker(self) -> EnhancedDrugInteractionChecker:
+        return self._checker or get_shared_checker()
+
+    def get_interaction_summary(self, medications: List[str]) -> List[Dict]:
+        """Uma entrada por par que interage, do mais grave ao mais leve, no formato legado."""
+        if len(medications) < 2:
+            raise ValueError('Pelo menos 2 medicamentos são necessários')
 
-    def get_interaction_summary(self, medications):
-        medications_lower = sorted([m.lower() for m in medications])
-        
-        # Verifica se há uma interação direta para o par exato
-        if tuple(medications_lower) in self.interactions_data:
-            interaction = self.interactions_data[tuple(medications_lower)]
-            return [{
-                "medication1": medications[0],
-                "medication2": medications[1],
-                "severity": interaction["severity"],
-                "description": interaction["description"],
-                "recommendation": interaction["recommendation"]
-            }]
-        
-        # Se não houver interação direta, retorna uma mensagem genérica
+        summary = self.checker.get_interaction_summary(medications)
+
+        if summary['interactions']:
+            return [self._legacy_interaction(interaction) for interaction in summary['interactions']]
+
+        # Se não houver interação, retorna uma mensagem genérica (como antes)
         return [{
             "medication1": medications[0],
             "medication2": medications[1],
@@ -47,4 +35,12 @@ class DrugInteractionChecker:
             "recommendation": "Continue monitorando e informe seu médico sobre todos os medicamentos que você usa."
         }]
 
-
+    @staticmethod
+    def _legacy_interaction(interaction: Dict) -> Dict:
+        return {
+            "medication1": interaction['drug1'],
+            "medication2": interaction['drug2'],
+            "severity": interaction['severity'],
+            "description": f"{interaction['mechanism']}. {'; '.join(interaction['clinical_effects'])}.",
+            "recommendation": interaction['management']
+        }
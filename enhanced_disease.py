@@ -1,23 +1,56 @@
 """
 Rotas aprimoradas da API com novos serviços integrados.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import codecs
 import json
+from dataclasses import asdict
 import os
+import time
 from src.services.cid_categorizer import CIDCategorizer
 from src.services.diagnostic_engine import DiagnosticEngine
-from src.services.enhanced_drug_interaction_checker import EnhancedDrugInteractionChecker
+from src.services.enhanced_drug_interaction_checker import EnhancedDrugInteractionChecker, get_shared_checker
 from src.services.disease_details_service import DiseaseDetailsService
 from src.services.symptom_selector_service import SymptomSelectorService
+from src.services.diagnosis_session_service import DiagnosisSessionService
+from src.services.regimen_session_service import RegimenSessionService
+from src.services.next_question_service import NextQuestionService
+from src.services.diagnosis_batcher import DiagnosisBatcher
+from src.services.case_store import SimilarCaseStore
 
 enhanced_disease_bp = Blueprint('enhanced_disease', __name__)
 
 # Inicializar serviços
 cid_categorizer = CIDCategorizer()
 diagnostic_engine = DiagnosticEngine()
-drug_checker = EnhancedDrugInteractionChecker()
 disease_details = DiseaseDetailsService()
 symptom_selector = SymptomSelectorService()
+diagnosis_sessions = DiagnosisSessionService(diagnostic_engine)
+next_question_service = NextQuestionService(diagnostic_engine)
+
+# Micro-batching opcional de /diagnose/symptoms (MEDIA_DIAGNOSIS_BATCHING=1)
+diagnosis_batcher = None
+if os.environ.get('MEDIA_DIAGNOSIS_BATCHING') == '1':
+    diagnosis_batcher = DiagnosisBatcher(
+        diagnostic_engine,
+        max_batch_size=int(os.environ.get('MEDIA_DIAGNOSIS_BATCH_SIZE', 64)),
+        max_wait_ms=float(os.environ.get('MEDIA_DIAGNOSIS_BATCH_WAIT_MS', 2.0)),
+        timeout_ms=float(os.environ.get('MEDIA_DIAGNOSIS_BATCH_TIMEOUT_MS', 1000.0))
+    )
+
+# Triagem em lote: limite por requisição e processos usados (MEDIA_INTERACTION_BATCH_WORKERS)
+MAX_BATCH_REGIMENS = 50000
+BATCH_SCREENING_WORKERS = int(os.environ.get('MEDIA_INTERACTION_BATCH_WORKERS', 1))
+
+# Casos anonimizados para busca de casos semelhantes (persistidos se MEDIA_CASE_STORE_PATH for definido)
+case_store = SimilarCaseStore(diagnostic_engine, storage_path=os.environ.get('MEDIA_CASE_STORE_PATH'))
+
+def get_drug_checker() -> EnhancedDrugInteractionChecker:
+    """Verificador de interações compartilhado com a API legada (criado no primeiro uso)."""
+    return get_shared_checker()
+
+# Regimes incrementais de prescrição (adicionar/remover um medicamento sem retriar o regime)
+regimen_sessions = RegimenSessionService(get_drug_checker)
 
 @enhanced_disease_bp.route('/categories', methods=['GET'])
 def get_cid_categories():
@@ -167,6 +200,8 @@ def diagnose_from_symptoms():
         data = request.get_json()
         symptoms_report = data.get('symptoms_report', '').strip()
         include_report = data.get('include_report', False)
+        include_similar_cases = data.get('include_similar_cases', False)
+        scoring_mode = data.get('scoring_mode', 'heuristic')
         
         if not symptoms_report or len(symptoms_report) < 10:
             return jsonify({
@@ -174,12 +209,19 @@ def diagnose_from_symptoms():
                 'error': 'Relatório de sintomas deve ter pelo menos 10 caracteres'
             }), 400
         
-        # Analisar sintomas
-        diagnostic_results = diagnostic_engine.analyze_symptoms_report(symptoms_report)
+        if scoring_mode not in diagnostic_engine.SCORING_MODES:
+            return _invalid_scoring_mode_response(scoring_mode)
+        
+        # Analisar sintomas (em lote com as requisições concorrentes, se habilitado)
+        if diagnosis_batcher is not None:
+            diagnostic_results = diagnosis_batcher.analyze_symptoms_report(symptoms_report, scoring_mode)
+        else:
+            diagnostic_results = diagnostic_engine.analyze_symptoms_report(symptoms_report, scoring_mode)
         
         response = {
             'success': True,
             'original_symptoms': symptoms_report,
+            'scoring_mode': scoring_mode,
             'diagnostic_results': [
                 {
                     'cid_code': result.cid_code,
@@ -199,6 +241,10 @@ def diagnose_from_symptoms():
             medical_report = diagnostic_engine.generate_medical_report(diagnostic_results, symptoms_report)
             response['medical_report'] = medical_report
         
+        # Casos confirmados semelhantes como evidência de apoio
+        if include_similar_cases:
+            response['similar_cases'] = case_store.find_similar(symptoms_report, int(data.get('similar_limit', 5)))
+        
         return jsonify(response)
     except Exception as e:
         return jsonify({
@@ -206,27 +252,197 @@ def diagnose_from_symptoms():
             'error': f'Erro no diagnóstico por sintomas: {str(e)}'
         }), 500
 
-@enhanced_disease_bp.route('/diagnose/advanced_analysis', methods=['POST'])
-def advanced_medical_analysis():
-    """Análise médica avançada de laudo com informações estruturadas."""
+def _invalid_scoring_mode_response(scoring_mode):
+    """Resposta 400 para modo de pontuação desconhecido."""
+    return jsonify({
+        'success': False,
+        'error': f'Modo de pontuação inválido: {scoring_mode}. '
+                 f'Use um de: {", ".join(diagnostic_engine.SCORING_MODES)}'
+    }), 400
+
+@enhanced_disease_bp.route('/diagnose/compare_scoring', methods=['POST'])
+def compare_scoring_modes():
+    """Compara ranking e latência dos motores de pontuação para o mesmo relatório."""
+    try:
+        data = request.get_json()
+        symptoms_report = data.get('symptoms_report', '').strip()
+        
+        if not symptoms_report or len(symptoms_report) < 10:
+            return jsonify({
+                'success': False,
+                'error': 'Relatório de sintomas deve ter pelo menos 10 caracteres'
+            }), 400
+        
+        comparison = {}
+        for scoring_mode in diagnostic_engine.SCORING_MODES:
+            started = time.perf_counter()
+            diagnostic_results = diagnostic_engine.analyze_symptoms_report(symptoms_report, scoring_mode)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            
+            comparison[scoring_mode] = {
+                'elapsed_ms': round(elapsed_ms, 3),
+                'ranking': [result.cid_code for result in diagnostic_results],
+                'diagnostic_results': [
+                    {
+                        'cid_code': result.cid_code,
+                        'disease_name': result.disease_name,
+                        'probability': round(result.probability * 100, 1),
+                        'confidence_level': result.confidence_level
+                    }
+                    for result in diagnostic_results
+                ]
+            }
+        
+        rankings = [set(mode['ranking']) for mode in comparison.values()]
+        
+        return jsonify({
+            'success': True,
+            'original_symptoms': symptoms_report,
+            'comparison': comparison,
+            'common_diagnoses': sorted(set.intersection(*rankings)) if rankings else []
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro na comparação de modos de pontuação: {str(e)}'
+        }), 500
+
+def _iter_uploaded_text(uploaded_file, chunk_size: int):
+    """Lê o arquivo enviado em blocos, decodificando UTF-8 de forma incremental."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        raw_chunk = uploaded_file.stream.read(chunk_size)
+        if not raw_chunk:
+            break
+        yield decoder.decode(raw_chunk)
+    yield decoder.decode(b'', final=True)
+
+def _serialize_red_flag_screening(screening):
+    return {
+        'urgency': screening.urgency,
+        'red_flags': [asdict(flag) for flag in screening.red_flags],
+        'elapsed_ms': screening.elapsed_ms
+    }
+
+@enhanced_disease_bp.route('/diagnose/red_flags', methods=['POST'])
+def screen_red_flags():
+    """Triagem rápida de sinais de alarme, sem calcular o diagnóstico diferencial."""
     try:
         data = request.get_json()
-        medical_report = data.get('medical_report', '').strip()
+        report = (data.get('medical_report') or data.get('symptoms_report') or '').strip()
         
-        if not medical_report or len(medical_report) < 20:
+        if not report:
             return jsonify({
                 'success': False,
-                'error': 'Laudo médico deve ter pelo menos 20 caracteres'
+                'error': 'Relatório médico é obrigatório'
             }), 400
         
-        # Análise avançada
-        analysis = diagnostic_engine.analyze_medical_report_advanced(medical_report)
+        screening = diagnostic_engine.screen_red_flags(report)
         
         return jsonify({
             'success': True,
-            'original_report': medical_report,
-            'analysis': analysis
+            **_serialize_red_flag_screening(screening)
         })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro na triagem de sinais de alarme: {str(e)}'
+        }), 500
+
+def _iter_advanced_analysis_ndjson(medical_report: str, scoring_mode: str):
+    """Emite a triagem de sinais de alarme e, depois, a análise completa (NDJSON)."""
+    try:
+        screening = diagnostic_engine.screen_red_flags(medical_report)
+        yield json.dumps({'type': 'red_flags', **_serialize_red_flag_screening(screening)},
+                         ensure_ascii=False) + '\n'
+        
+        if len(medical_report) > diagnostic_engine.STREAM_CHUNK_SIZE:
+            context = diagnostic_engine.build_analysis_context_streaming(
+                diagnostic_engine.iter_text_chunks(medical_report), scoring_mode, screening
+            )
+        else:
+            context = diagnostic_engine.build_analysis_context(medical_report, scoring_mode, screening)
+        analysis = diagnostic_engine.analyze_medical_report_advanced(medical_report, context)
+        
+        yield json.dumps({
+            'type': 'analysis',
+            'success': True,
+            'analysis': analysis,
+            'report_length': context.report_length
+        }, ensure_ascii=False) + '\n'
+    except Exception as e:
+        yield json.dumps({
+            'type': 'error',
+            'success': False,
+            'error': f'Erro na análise avançada: {str(e)}'
+        }, ensure_ascii=False) + '\n'
+
+@enhanced_disease_bp.route('/diagnose/advanced_analysis', methods=['POST'])
+def advanced_medical_analysis():
+    """Análise médica avançada de laudo com informações estruturadas.
+
+    Aceita JSON (medical_report) ou upload de arquivo de texto (campo 'file').
+    Laudos longos são processados em blocos e não são devolvidos na resposta.
+    Com "stream": true (JSON), responde em NDJSON com os sinais de alarme primeiro.
+    """
+    try:
+        uploaded_file = request.files.get('file')
+        
+        if uploaded_file is not None:
+            medical_report = None
+            scoring_mode = request.form.get('scoring_mode', 'heuristic')
+        else:
+            data = request.get_json()
+            medical_report = data.get('medical_report', '').strip()
+            scoring_mode = data.get('scoring_mode', 'heuristic')
+            
+            if not medical_report or len(medical_report) < 20:
+                return jsonify({
+                    'success': False,
+                    'error': 'Laudo médico deve ter pelo menos 20 caracteres'
+                }), 400
+        
+        if scoring_mode not in diagnostic_engine.SCORING_MODES:
+            return _invalid_scoring_mode_response(scoring_mode)
+        
+        if uploaded_file is None and data.get('stream', False):
+            return Response(
+                stream_with_context(_iter_advanced_analysis_ndjson(medical_report, scoring_mode)),
+                content_type='application/x-ndjson; charset=utf-8'
+            )
+        
+        chunk_size = diagnostic_engine.STREAM_CHUNK_SIZE
+        
+        # Análise avançada (contexto único reaproveitado pelo resumo)
+        if uploaded_file is not None:
+            context = diagnostic_engine.build_analysis_context_streaming(
+                _iter_uploaded_text(uploaded_file, chunk_size), scoring_mode
+            )
+            if context.report_length < 20:
+                return jsonify({
+                    'success': False,
+                    'error': 'Laudo médico deve ter pelo menos 20 caracteres'
+                }), 400
+        elif len(medical_report) > chunk_size:
+            context = diagnostic_engine.build_analysis_context_streaming(
+                diagnostic_engine.iter_text_chunks(medical_report), scoring_mode
+            )
+        else:
+            context = diagnostic_engine.build_analysis_context(medical_report, scoring_mode)
+        
+        analysis = diagnostic_engine.analyze_medical_report_advanced(medical_report, context)
+        
+        response = {
+            'success': True,
+            'analysis': analysis,
+            'report_length': context.report_length
+        }
+        
+        # Só laudos curtos são devolvidos na resposta
+        if medical_report is not None and len(medical_report) <= chunk_size:
+            response['original_report'] = medical_report
+        
+        return jsonify(response)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -248,7 +464,7 @@ def check_drug_interactions():
             }), 400
         
         # Verificar interações
-        interaction_summary = drug_checker.get_interaction_summary(medications)
+        interaction_summary = get_drug_checker().get_interaction_summary(medications)
         
         response = {
             'success': True,
@@ -258,7 +474,7 @@ def check_drug_interactions():
         
         # Incluir relatório detalhado se solicitado
         if include_report:
-            detailed_report = drug_checker.generate_interaction_report(medications)
+            detailed_report = get_drug_checker().generate_interaction_report(medications, interaction_summary)
             response['detailed_report'] = detailed_report
         
         return jsonify(response)
@@ -268,13 +484,188 @@ def check_drug_interactions():
             'error': f'Erro na verificação de interações: {str(e)}'
         }), 500
 
+@enhanced_disease_bp.route('/interactions/batch_check', methods=['POST'])
+def batch_check_drug_interactions():
+    """Triagem de interações de vários regimes (ex.: painel de pacientes) em uma requisição.
+
+    Aceita "regimens" como lista de listas de medicamentos ou de objetos
+    {"id": ..., "medications": [...]}; a resposta mantém a ordem e os IDs.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        regimens = data.get('regimens', [])
+        
+        if not isinstance(regimens, list) or not regimens:
+            return jsonify({
+                'success': False,
+                'error': 'Informe a lista "regimens"'
+            }), 400
+        
+        if len(regimens) > MAX_BATCH_REGIMENS:
+            return jsonify({
+                'success': False,
+                'error': f'No máximo {MAX_BATCH_REGIMENS} regimes por requisição'
+            }), 400
+        
+        regimen_ids = []
+        medication_lists = []
+        for position, regimen in enumerate(regimens):
+            if isinstance(regimen, dict):
+                regimen_ids.append(regimen.get('id', position))
+                regimen = regimen.get('medications', [])
+            else:
+                regimen_ids.append(position)
+            
+            if not isinstance(regimen, list) or not all(isinstance(med, str) for med in regimen):
+                return jsonify({
+                    'success': False,
+                    'error': f'Regime {regimen_ids[-1]}: "medications" deve ser uma lista de nomes'
+                }), 400
+            medication_lists.append(regimen)
+        
+        start = time.perf_counter()
+        summaries = get_drug_checker().screen_regimens(medication_lists, workers=BATCH_SCREENING_WORKERS)
+        
+        return jsonify({
+            'success': True,
+            'total_regimens': len(summaries),
+            'regimens_with_interactions': sum(1 for summary in summaries if summary['total_interactions']),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+            'results': [
+                {'id': regimen_id, **summary}
+                for regimen_id, summary in zip(regimen_ids, summaries)
+            ]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro na triagem em lote de interações: {str(e)}'
+        }), 500
+
+def _regimen_response(regimen_id, snapshot):
+    """Monta a resposta JSON com o resumo de um regime de prescrição."""
+    response = {
+        'success': True,
+        'regimen_id': regimen_id,
+        'medications': snapshot.medications,
+        'summary': snapshot.summary
+    }
+    
+    if snapshot.changes is not None:
+        response['changes'] = snapshot.changes
+    
+    return response
+
+def _invalid_name_list(*lists):
+    """Verdadeiro se alguma lista (de medicamentos ou sintomas) não for uma lista de strings."""
+    return any(
+        not isinstance(names, list) or not all(isinstance(name, str) for name in names)
+        for names in lists
+    )
+
+@enhanced_disease_bp.route('/interactions/regimens', methods=['POST'])
+def create_regimen():
+    """Cria regime de prescrição incremental, já triado, para alterações pontuais."""
+    try:
+        data = request.get_json(silent=True) or {}
+        medications = data.get('medications', [])
+        
+        if _invalid_name_list(medications):
+            return jsonify({
+                'success': False,
+                'error': '"medications" deve ser uma lista de nomes'
+            }), 400
+        
+        regimen_id = regimen_sessions.create_session(medications)
+        snapshot = regimen_sessions.get_snapshot(regimen_id)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'error': 'Regime não encontrado ou expirado'
+            }), 404
+        
+        return jsonify(_regimen_response(regimen_id, snapshot)), 201
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao criar regime: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/interactions/regimens/<regimen_id>', methods=['GET'])
+def get_regimen(regimen_id):
+    """Retorna o resumo de interações atual de um regime."""
+    try:
+        snapshot = regimen_sessions.get_snapshot(regimen_id)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'error': 'Regime não encontrado ou expirado'
+            }), 404
+        
+        return jsonify(_regimen_response(regimen_id, snapshot))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao buscar regime: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/interactions/regimens/<regimen_id>/medications', methods=['POST'])
+def update_regimen(regimen_id):
+    """Adiciona e/ou remove medicamentos, triando só as interações de quem entrou."""
+    try:
+        data = request.get_json(silent=True) or {}
+        add = data.get('add', [])
+        remove = data.get('remove', [])
+        
+        if _invalid_name_list(add, remove) or (not add and not remove):
+            return jsonify({
+                'success': False,
+                'error': 'Informe listas de medicamentos em "add" e/ou "remove"'
+            }), 400
+        
+        start = time.perf_counter()
+        snapshot = regimen_sessions.update_session(regimen_id, add, remove)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'error': 'Regime não encontrado ou expirado'
+            }), 404
+        
+        response = _regimen_response(regimen_id, snapshot)
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao atualizar regime: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/interactions/regimens/<regimen_id>', methods=['DELETE'])
+def delete_regimen(regimen_id):
+    """Encerra um regime de prescrição."""
+    if not regimen_sessions.delete_session(regimen_id):
+        return jsonify({
+            'success': False,
+            'error': 'Regime não encontrado ou expirado'
+        }), 404
+    
+    return jsonify({'success': True, 'regimen_id': regimen_id})
+
 @enhanced_disease_bp.route('/interactions/alternatives', methods=['POST'])
 def get_drug_alternatives():
-    """Busca alternativas medicamentosas para evitar interações."""
+    """Busca alternativas medicamentosas para evitar interações.
+
+    Com "current_medications", as alternativas são triadas contra o restante do
+    regime e ordenadas da mais segura para a menos segura.
+    """
     try:
         data = request.get_json()
         drug_name = data.get('drug_name', '').strip()
         indication = data.get('indication', '').strip()
+        current_medications = data.get('current_medications', [])
         
         if not drug_name:
             return jsonify({
@@ -282,14 +673,23 @@ def get_drug_alternatives():
                 'error': 'Nome do medicamento é obrigatório'
             }), 400
         
-        alternatives = drug_checker.search_drug_alternatives(drug_name, indication)
+        if _invalid_name_list(current_medications):
+            return jsonify({
+                'success': False,
+                'error': '"current_medications" deve ser uma lista de nomes'
+            }), 400
+        
+        ranked_alternatives = get_drug_checker().rank_drug_alternatives(drug_name, current_medications, indication)
         
         return jsonify({
             'success': True,
             'original_drug': drug_name,
             'indication': indication,
-            'alternatives': alternatives,
-            'total_alternatives': len(alternatives)
+            'current_medications': current_medications,
+            'alternatives': [alternative['drug'] for alternative in ranked_alternatives],
+            'ranked_alternatives': ranked_alternatives,
+            'safe_alternatives': sum(1 for alternative in ranked_alternatives if alternative['safe']),
+            'total_alternatives': len(ranked_alternatives)
         })
     except Exception as e:
         return jsonify({
@@ -297,6 +697,124 @@ def get_drug_alternatives():
             'error': f'Erro ao buscar alternativas: {str(e)}'
         }), 500
 
+def _report_download_response(chunks, renderer, fmt: str, filename: str) -> Response:
+    """Monta resposta em streaming para download de relatório (cabeçalhos do renderer que o gerou)."""
+    extension = renderer.get_extension(fmt)
+    return Response(
+        stream_with_context(chunks),
+        content_type=renderer.get_mimetype(fmt),
+        headers={'Content-Disposition': f'attachment; filename={filename}.{extension}'}
+    )
+
+@enhanced_disease_bp.route('/interactions/database', methods=['GET'])
+def get_interaction_database_info():
+    """Versão e tamanho da base de interações carregada."""
+    try:
+        return jsonify({
+            'success': True,
+            'database': get_drug_checker().get_database_info()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao consultar a base de interações: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/interactions/database/reload', methods=['POST'])
+def reload_interaction_database():
+    """Recarrega a base de interações do arquivo de dados sem reiniciar o serviço."""
+    try:
+        data = request.get_json(silent=True) or {}
+        user_type = data.get('user_type', 'patient')  # Em produção, viria do token de autenticação
+        
+        if user_type != 'admin':
+            return jsonify({
+                'success': False,
+                'error': 'Apenas administradores podem recarregar a base de interações'
+            }), 403
+        
+        database = get_drug_checker().reload_database()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Base de interações recarregada com sucesso',
+            'database': database
+        })
+    except (OSError, ValueError, TypeError) as e:
+        # Arquivo ausente ou inválido: a base anterior continua em uso
+        return jsonify({
+            'success': False,
+            'error': f'Base de interações inválida, versão anterior mantida: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao recarregar a base de interações: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/diagnose/report/download', methods=['POST'])
+def download_medical_report():
+    """Baixa o relatório médico em texto ou HTML, gerado em streaming."""
+    try:
+        data = request.get_json()
+        symptoms_report = data.get('symptoms_report', '').strip()
+        fmt = data.get('format', 'text')
+        
+        if not symptoms_report or len(symptoms_report) < 10:
+            return jsonify({
+                'success': False,
+                'error': 'Relatório de sintomas deve ter pelo menos 10 caracteres'
+            }), 400
+        
+        renderer = diagnostic_engine.report_renderer
+        if fmt not in renderer.FORMATS:
+            return jsonify({
+                'success': False,
+                'error': 'Formato deve ser "text" ou "html"'
+            }), 400
+        
+        diagnostic_results = diagnostic_engine.analyze_symptoms_report(symptoms_report)
+        chunks = diagnostic_engine.iter_medical_report(diagnostic_results, symptoms_report, fmt)
+        
+        return _report_download_response(chunks, renderer, fmt, 'relatorio_sintomas')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao gerar relatório: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/interactions/report/download', methods=['POST'])
+def download_interaction_report():
+    """Baixa o relatório de interações em texto ou HTML, gerado em streaming."""
+    try:
+        data = request.get_json()
+        medications = data.get('medications', [])
+        fmt = data.get('format', 'text')
+        
+        if not medications or len(medications) < 2:
+            return jsonify({
+                'success': False,
+                'error': 'Pelo menos 2 medicamentos são necessários'
+            }), 400
+        
+        drug_checker = get_drug_checker()
+        renderer = drug_checker.report_renderer
+        if fmt not in renderer.FORMATS:
+            return jsonify({
+                'success': False,
+                'error': 'Formato deve ser "text" ou "html"'
+            }), 400
+        
+        interaction_summary = drug_checker.get_interaction_summary(medications)
+        chunks = drug_checker.iter_interaction_report(medications, interaction_summary, fmt)
+        
+        return _report_download_response(chunks, renderer, fmt, 'relatorio_interacoes')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao gerar relatório: {str(e)}'
+        }), 500
+
 @enhanced_disease_bp.route('/comprehensive_analysis', methods=['POST'])
 def comprehensive_medical_analysis():
     """Análise médica abrangente combinando diagnóstico e interações."""
@@ -320,7 +838,9 @@ def comprehensive_medical_analysis():
         
         # Análise de sintomas se fornecida
         if symptoms_report and len(symptoms_report) >= 10:
-            diagnostic_results = diagnostic_engine.analyze_symptoms_report(symptoms_report)
+            # Extração, pontuação e avaliação executadas uma única vez
+            context = diagnostic_engine.build_analysis_context(symptoms_report)
+            diagnostic_results = context.diagnostic_results
             analysis_result['diagnostic_analysis'] = {
                 'symptoms_report': symptoms_report,
                 'diagnostic_results': [
@@ -332,7 +852,9 @@ def comprehensive_medical_analysis():
                         'matching_symptoms': result.matching_symptoms
                     }
                     for result in diagnostic_results
-                ]
+                ],
+                'severity_assessment': context.severity,
+                'urgency_level': context.urgency
             }
             
             if include_reports and diagnostic_results:
@@ -341,14 +863,14 @@ def comprehensive_medical_analysis():
         
         # Análise de interações se medicamentos fornecidos
         if current_medications and len(current_medications) >= 2:
-            interaction_summary = drug_checker.get_interaction_summary(current_medications)
+            interaction_summary = get_drug_checker().get_interaction_summary(current_medications)
             analysis_result['interaction_analysis'] = {
                 'medications': current_medications,
                 'summary': interaction_summary
             }
             
             if include_reports:
-                interaction_report = drug_checker.generate_interaction_report(current_medications)
+                interaction_report = get_drug_checker().generate_interaction_report(current_medications, interaction_summary)
                 analysis_result['interaction_analysis']['detailed_report'] = interaction_report
         
         # Recomendações integradas
@@ -379,6 +901,22 @@ def comprehensive_medical_analysis():
             'error': f'Erro na análise abrangente: {str(e)}'
         }), 500
 
+@enhanced_disease_bp.route('/diagnose/cache/stats', methods=['GET'])
+def get_diagnosis_cache_stats():
+    """Métricas do cache de resultados de diagnóstico."""
+    try:
+        return jsonify({
+            'success': True,
+            'knowledge_base_version': diagnostic_engine.knowledge_base_version,
+            'cache': diagnostic_engine.result_cache.stats(),
+            'batching': diagnosis_batcher.stats() if diagnosis_batcher is not None else None
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao obter métricas do cache: {str(e)}'
+        }), 500
+
 @enhanced_disease_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar se a API aprimorada está funcionando."""
@@ -537,6 +1075,20 @@ def validate_symptoms():
             'message': f'Erro ao validar sintomas: {str(e)}'
         }), 500
 
+def _serialize_diagnostic_results(diagnostic_results):
+    """Converte resultados do motor para o formato JSON das rotas de diagnóstico."""
+    return [
+        {
+            'cid_code': result.cid_code,
+            'disease_name': result.disease_name,
+            'probability': round(result.probability * 100, 1),  # Converter para porcentagem
+            'confidence_level': result.confidence_level,
+            'matching_symptoms': result.matching_symptoms,
+            'additional_info': result.additional_info
+        }
+        for result in diagnostic_results
+    ]
+
 @enhanced_disease_bp.route('/diagnose/objective_symptoms', methods=['POST'])
 def diagnose_by_objective_symptoms():
     """Diagnóstico baseado em sintomas selecionados objetivamente."""
@@ -544,6 +1096,7 @@ def diagnose_by_objective_symptoms():
         data = request.get_json()
         symptoms = data.get('symptoms', [])
         include_report = data.get('include_report', False)
+        scoring_mode = data.get('scoring_mode', 'heuristic')
         
         if not symptoms:
             return jsonify({
@@ -551,19 +1104,28 @@ def diagnose_by_objective_symptoms():
                 'message': 'Lista de sintomas é obrigatória'
             }), 400
         
-        # Converter lista de sintomas em texto para o motor de diagnóstico
-        symptoms_text = f"Paciente apresenta os seguintes sintomas: {', '.join(symptoms)}"
+        if scoring_mode not in diagnostic_engine.SCORING_MODES:
+            return _invalid_scoring_mode_response(scoring_mode)
         
-        # Usar o motor de diagnóstico existente
-        results = diagnostic_engine.analyze_symptoms(symptoms_text, include_report)
+        # Sintomas selecionados vão direto para IDs canônicos, sem passar por texto livre
+        symptom_ids = diagnostic_engine.resolve_symptom_ids(symptoms)
+        diagnostic_results = diagnostic_engine.analyze_symptom_ids(symptom_ids, scoring_mode=scoring_mode)
         
-        # Enriquecer com validação de sintomas
-        validation = symptom_selector.validate_symptom_combination(symptoms)
+        results = {
+            'success': True,
+            'scoring_mode': scoring_mode,
+            'selected_symptoms': symptoms,
+            'symptom_ids': symptom_ids,
+            'diagnostic_results': _serialize_diagnostic_results(diagnostic_results),
+            'total_diagnoses': len(diagnostic_results),
+            # Enriquecer com validação de sintomas
+            'symptom_validation': symptom_selector.validate_symptom_combination(symptoms)
+        }
         
-        # Adicionar informações de validação aos resultados
-        if results.get('success'):
-            results['symptom_validation'] = validation
-            results['selected_symptoms'] = symptoms
+        if include_report and diagnostic_results:
+            results['medical_report'] = diagnostic_engine.generate_medical_report(
+                diagnostic_results, ', '.join(symptoms)
+            )
         
         return jsonify(results)
         
@@ -573,3 +1135,219 @@ def diagnose_by_objective_symptoms():
             'message': f'Erro ao processar diagnóstico: {str(e)}'
         }), 500
 
+def _session_response(session_id, snapshot, include_report=False):
+    """Monta a resposta JSON com o estado de uma sessão de diagnóstico."""
+    diagnostic_results = snapshot.results
+    selected_symptoms = snapshot.selected_symptoms
+    
+    response = {
+        'success': True,
+        'session_id': session_id,
+        'selected_symptoms': selected_symptoms,
+        'symptom_ids': snapshot.symptom_ids,
+        'diagnostic_results': _serialize_diagnostic_results(diagnostic_results),
+        'total_diagnoses': len(diagnostic_results),
+        'symptom_validation': symptom_selector.validate_symptom_combination(selected_symptoms)
+    }
+    
+    if include_report and diagnostic_results:
+        response['medical_report'] = diagnostic_engine.generate_medical_report(
+            diagnostic_results, ', '.join(selected_symptoms)
+        )
+    
+    return response
+
+@enhanced_disease_bp.route('/diagnose/sessions', methods=['POST'])
+def create_diagnosis_session():
+    """Cria sessão incremental de diagnóstico para a seleção objetiva."""
+    try:
+        data = request.get_json(silent=True) or {}
+        symptoms = data.get('symptoms', [])
+        
+        if _invalid_name_list(symptoms):
+            return jsonify({
+                'success': False,
+                'message': '"symptoms" deve ser uma lista de sintomas'
+            }), 400
+        
+        session_id = diagnosis_sessions.create_session(symptoms)
+        snapshot = diagnosis_sessions.get_snapshot(session_id)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'message': 'Sessão de diagnóstico não encontrada ou expirada'
+            }), 404
+        
+        return jsonify(_session_response(session_id, snapshot, data.get('include_report', False))), 201
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao criar sessão de diagnóstico: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/diagnose/sessions/<session_id>', methods=['GET'])
+def get_diagnosis_session(session_id):
+    """Retorna o diagnóstico atual de uma sessão."""
+    try:
+        snapshot = diagnosis_sessions.get_snapshot(session_id)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'message': 'Sessão de diagnóstico não encontrada ou expirada'
+            }), 404
+        
+        include_report = request.args.get('include_report', 'false').lower() == 'true'
+        return jsonify(_session_response(session_id, snapshot, include_report))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao buscar sessão de diagnóstico: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/diagnose/sessions/<session_id>/symptoms', methods=['POST'])
+def update_diagnosis_session(session_id):
+    """Adiciona e/ou remove sintomas da sessão, atualizando só as doenças afetadas."""
+    try:
+        data = request.get_json(silent=True) or {}
+        add = data.get('add', [])
+        remove = data.get('remove', [])
+        
+        if _invalid_name_list(add, remove) or (not add and not remove):
+            return jsonify({
+                'success': False,
+                'message': 'Informe listas de sintomas em "add" e/ou "remove"'
+            }), 400
+        
+        snapshot = diagnosis_sessions.update_session(session_id, add, remove)
+        
+        if snapshot is None:
+            return jsonify({
+                'success': False,
+                'message': 'Sessão de diagnóstico não encontrada ou expirada'
+            }), 404
+        
+        return jsonify(_session_response(session_id, snapshot, data.get('include_report', False)))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao atualizar sessão de diagnóstico: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/diagnose/sessions/<session_id>', methods=['DELETE'])
+def delete_diagnosis_session(session_id):
+    """Encerra uma sessão de diagnóstico."""
+    if not diagnosis_sessions.delete_session(session_id):
+        return jsonify({
+            'success': False,
+            'message': 'Sessão de diagnóstico não encontrada ou expirada'
+        }), 404
+    
+    return jsonify({'success': True, 'session_id': session_id})
+
+@enhanced_disease_bp.route('/diagnose/next_question', methods=['POST'])
+def suggest_next_question():
+    """Sugere os sintomas que melhor separam as doenças candidatas atuais.
+
+    Aceita a lista de sintomas selecionados ou o ID de uma sessão de diagnóstico.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        session_id = data.get('session_id')
+        limit = int(data.get('limit', 5))
+        top_k = int(data.get('top_k', 5))
+        scoring_mode = data.get('scoring_mode', 'heuristic')
+        
+        if scoring_mode not in diagnostic_engine.SCORING_MODES:
+            return _invalid_scoring_mode_response(scoring_mode)
+        
+        if session_id:
+            snapshot = diagnosis_sessions.get_snapshot(session_id, top_k)
+            if snapshot is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'Sessão de diagnóstico não encontrada ou expirada'
+                }), 404
+            symptom_ids = snapshot.symptom_ids
+            diagnostic_results = snapshot.results
+        else:
+            symptom_ids = diagnostic_engine.resolve_symptom_ids(data.get('symptoms', []))
+            diagnostic_results = diagnostic_engine.analyze_symptom_ids(
+                symptom_ids, limit=top_k, scoring_mode=scoring_mode
+            ) if symptom_ids else []
+        
+        suggestion = next_question_service.suggest(symptom_ids, diagnostic_results, limit)
+        
+        return jsonify({
+            'success': True,
+            'symptom_ids': symptom_ids,
+            **suggestion
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao sugerir próxima pergunta: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/cases', methods=['POST'])
+def add_cases():
+    """Adiciona casos anonimizados com diagnóstico confirmado.
+
+    Aceita um caso ({"report", "cid_code", "metadata"}) ou uma lista em "cases".
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        cases = data.get('cases', [data])
+        
+        for case in cases:
+            if len(case.get('report', '').strip()) < 10 or not case.get('cid_code', '').strip():
+                return jsonify({
+                    'success': False,
+                    'error': 'Cada caso precisa de "report" (pelo menos 10 caracteres) e "cid_code"'
+                }), 400
+        
+        added = [
+            case_store.add_case(case['report'], case['cid_code'], case.get('metadata'))
+            for case in cases
+        ]
+        
+        return jsonify({
+            'success': True,
+            'cases': added,
+            'total_cases': len(case_store)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao adicionar casos: {str(e)}'
+        }), 500
+
+@enhanced_disease_bp.route('/cases/similar', methods=['POST'])
+def find_similar_cases():
+    """Busca os casos confirmados mais semelhantes a um relatório."""
+    try:
+        data = request.get_json(silent=True) or {}
+        report = data.get('report', '').strip()
+        limit = int(data.get('limit', 5))
+        
+        if len(report) < 10:
+            return jsonify({
+                'success': False,
+                'error': 'Relatório deve ter pelo menos 10 caracteres'
+            }), 400
+        
+        start = time.perf_counter()
+        similar_cases = case_store.find_similar(report, limit)
+        
+        return jsonify({
+            'success': True,
+            'similar_cases': similar_cases,
+            'total_cases': len(case_store),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro na busca de casos semelhantes: {str(e)}'
+        }), 500
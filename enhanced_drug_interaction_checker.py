@@ -1,10 +1,38 @@
 """
 Sistema aprimorado de verificação de interações medicamentosas.
 Inclui informações detalhadas sobre reações adversas e mecanismos de interação.
+A base fica em drug_interactions.json (versionado) e é compilada em um
+snapshot binário, recarregável em tempo de execução.
 """
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+import hashlib
+import json
+import os
+import pickle
 import re
+import sys
+import threading
+from src.services.report_renderer import ReportRenderer
+from src.services.bounded_cache import BoundedCache
+from src.services.fuzzy_phrase_matcher import fold_text
+
+# Dosagens e formas farmacêuticas removidas antes da busca do nome genérico
+_DOSE_PATTERN = re.compile(r'\d+\s*mg|\d+\s*g|\d+\s*ml')
+_DOSAGE_FORM_PATTERN = re.compile(r'comprimido|c[áa]psula|solu[çc][ãa]o|xarope|gotas')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def _intern(value):
+    """Interna recursivamente as strings de uma estrutura carregada do JSON."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern(item) for key, item in value.items()}
+    return value
 
 @dataclass
 class DrugInteraction:
@@ -19,388 +47,509 @@ class DrugInteraction:
     alternatives: List[str]  # Medicamentos alternativos
     onset_time: str  # Tempo para início dos efeitos
     evidence_level: str  # Nível de evidência científica
+    risk_level: str = ''  # Pré-calculado na carga da base
+    severity_rank: int = 0  # Pré-calculado na carga da base
+    class_rule: bool = False  # Regra entre classes terapêuticas (drug1/drug2 são classes)
+
+@dataclass
+class InteractionIndex:
+    """Base de interações compilada; substituída por inteiro a cada recarga."""
+    version: str
+    source_digest: str
+    drug_aliases: Dict[str, List[str]]
+    drug_classes: Dict[str, List[str]]
+    interactions_database: Dict[Tuple[str, str], DrugInteraction]  # par canônico -> interação
+    class_interactions: Dict[Tuple[str, str], DrugInteraction]  # par canônico de classes -> regra
+    drug_class_index: Dict[str, List[str]]  # genérico -> classes
+    alias_index: Dict[str, str]  # alias sem acentos -> genérico
+    drug_ids: Dict[str, int]  # genérico ou classe -> ID do nó
+    interaction_graph: List[Dict[int, DrugInteraction]]  # ID -> {ID vizinho: interação}
+    drug_node_ids: Dict[str, List[int]]  # genérico -> nós que o representam
+    substitution_candidates: Dict[str, List[Tuple[str, str]]]  # genérico -> (candidato, origem)
 
 class EnhancedDrugInteractionChecker:
-    def __init__(self):
-        self.interactions_database = self._load_interactions_database()
-        self.drug_aliases = self._load_drug_aliases()
-        
-    def _load_drug_aliases(self) -> Dict[str, List[str]]:
-        """Carrega aliases e nomes comerciais dos medicamentos."""
+    SEVERITY_RANK = {'Contraindicada': 4, 'Grave': 3, 'Moderada': 2, 'Leve': 1}
+    EVIDENCE_SCORE = {'Alto': 3, 'Moderado': 2, 'Baixo': 1}
+    
+    # Versões do formato do arquivo de dados e do snapshot compilado
+    DATA_FORMAT_VERSION = 1
+    SNAPSHOT_FORMAT_VERSION = 2
+    
+    DEFAULT_DATA_PATH = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'drug_interactions.json'
+    )
+    
+    def __init__(self, data_path: Optional[str] = None, snapshot_path: Optional[str] = None,
+                 normalization_cache_size: int = 8192, summary_cache_size: int = 4096):
+        self.data_path = data_path or self.DEFAULT_DATA_PATH
+        # Snapshot binário ao lado do arquivo de dados, recompilado quando o JSON muda
+        self.snapshot_path = snapshot_path or os.path.splitext(self.data_path)[0] + '.snapshot.pickle'
+        self.normalization_cache_size = normalization_cache_size
+        self.reload_lock = threading.Lock()
+        self.report_renderer = ReportRenderer()
+        # Triagens por regime canônico (pares já resolvidos), descartadas a cada recarga
+        self.summary_cache = BoundedCache(max_size=summary_cache_size)
+        self.loaded_from = None
+        # Processos da triagem em lote: criados no primeiro uso e mantidos entre requisições
+        self._batch_pool = None
+        self._batch_pool_key = None  # (processos, versão da base carregada neles)
+        self._batch_pool_lock = threading.Lock()
+        self._install(self._load_index())
+    
+    @property
+    def index(self) -> InteractionIndex:
+        return self._state[0]
+    
+    @property
+    def interactions_database(self) -> Dict[Tuple[str, str], DrugInteraction]:
+        return self.index.interactions_database
+    
+    @property
+    def drug_aliases(self) -> Dict[str, List[str]]:
+        return self.index.drug_aliases
+    
+    @property
+    def database_version(self) -> str:
+        return self.index.version
+    
+    def _install(self, index: InteractionIndex):
+        """Publica a base compilada junto com um memo de normalização novo (troca atômica)."""
+        normalize = lru_cache(maxsize=self.normalization_cache_size)(partial(self._normalize_uncached, index))
+        self._state = (index, normalize)
+        self.summary_cache.clear()
+    
+    def reload_database(self) -> Dict:
+        """Recarrega o arquivo de dados sem reiniciar; requisições em andamento terminam na base anterior."""
+        with self.reload_lock:
+            previous_version = self.index.version
+            self._install(self._load_index())
+        
+        # Processos da triagem em lote com a base anterior são recriados no próximo lote
+        with self._batch_pool_lock:
+            if self._batch_pool is not None and self._batch_pool_key[1] != self.index.source_digest:
+                self._batch_pool.shutdown(wait=False)
+                self._batch_pool = self._batch_pool_key = None
+        
+        return {**self.get_database_info(), 'previous_version': previous_version}
+    
+    def get_database_info(self) -> Dict:
+        index = self.index
         return {
-            'paracetamol': ['acetaminofeno', 'tylenol', 'parador', 'dôrico', 'febralgin'],
-            'dipirona': ['metamizol', 'novalgina', 'anador', 'dorflex', 'buscopan composto'],
-            'ibuprofeno': ['advil', 'alivium', 'buscofem', 'ibupril', 'motrin'],
-            'aspirina': ['ácido acetilsalicílico', 'aas', 'aspirina', 'somalgin'],
-            'amoxicilina': ['amoxil', 'flemoxon', 'hiconcil', 'amoxicilina'],
-            'azitromicina': ['zitromax', 'azimix', 'azitromicina'],
-            'omeprazol': ['losec', 'peprazol', 'omeprazol'],
-            'sinvastatina': ['zocor', 'sinvastatina', 'vaslip'],
-            'metformina': ['glifage', 'glucoformin', 'metformina'],
-            'losartana': ['cozaar', 'losartec', 'aradois'],
-            'enalapril': ['renitec', 'vasopril', 'enalapril'],
-            'propranolol': ['inderal', 'propranolol'],
-            'varfarina': ['marevan', 'varfarina', 'coumadin'],
-            'digoxina': ['digoxina', 'lanoxin'],
-            'fenitoína': ['hidantal', 'fenitoína', 'epelin'],
-            'carbamazepina': ['tegretol', 'carbamazepina'],
-            'lítio': ['carbolitium', 'lítio'],
-            'fluoxetina': ['prozac', 'daforin', 'fluoxetina'],
-            'sertralina': ['zoloft', 'assert', 'sertralina'],
-            'diazepam': ['valium', 'diazepam', 'compaz'],
-            'clonazepam': ['rivotril', 'clonazepam'],
-            'insulina': ['humulin', 'novolin', 'lantus', 'insulina'],
-            'prednisona': ['meticorten', 'prednisona'],
-            'levotiroxina': ['puran', 'synthroid', 'levotiroxina']
+            'version': index.version,
+            'source_digest': index.source_digest,
+            'loaded_from': self.loaded_from,
+            'interactions': len(index.interactions_database),
+            'class_interactions': len(index.class_interactions),
+            'drug_classes': len(index.drug_classes),
+            'drugs_with_alternatives': len(index.substitution_candidates),
+            'drugs': len(index.alias_index),
+            'summary_cache': self.summary_cache.stats()
         }
     
-    def _load_interactions_database(self) -> Dict[Tuple[str, str], DrugInteraction]:
-        """Carrega base de dados completa de interações medicamentosas."""
-        interactions = {}
-        
-        # Interações Cardiovasculares
-        interactions[('varfarina', 'aspirina')] = DrugInteraction(
-            drug1='varfarina',
-            drug2='aspirina',
-            severity='Contraindicada',
-            mechanism='Sinergismo anticoagulante - inibição da agregação plaquetária e da coagulação',
-            clinical_effects=[
-                'Aumento significativo do risco de sangramento',
-                'Prolongamento excessivo do tempo de coagulação',
-                'Risco de hemorragias graves'
-            ],
-            adverse_reactions=[
-                'Sangramento gastrointestinal',
-                'Hematomas espontâneos',
-                'Sangramento intracraniano',
-                'Epistaxe',
-                'Hematúria',
-                'Melena'
-            ],
-            management='Contraindicação absoluta. Se anticoagulação necessária, usar apenas varfarina com monitoramento rigoroso do INR',
-            monitoring=['INR diário', 'Hemograma completo', 'Sinais de sangramento'],
-            alternatives=['Clopidogrel (com cautela)', 'Anticoagulantes diretos'],
-            onset_time='2-7 dias',
-            evidence_level='Alto - estudos clínicos controlados'
-        )
-        
-        interactions[('enalapril', 'losartana')] = DrugInteraction(
-            drug1='enalapril',
-            drug2='losartana',
-            severity='Moderada',
-            mechanism='Duplo bloqueio do sistema renina-angiotensina-aldosterona',
-            clinical_effects=[
-                'Hipotensão excessiva',
-                'Hipercalemia',
-                'Deterioração da função renal'
-            ],
-            adverse_reactions=[
-                'Tontura severa',
-                'Síncope',
-                'Arritmias por hipercalemia',
-                'Insuficiência renal aguda'
-            ],
-            management='Evitar combinação. Se necessário, iniciar com doses baixas e monitorar rigorosamente',
-            monitoring=['Pressão arterial', 'Função renal', 'Potássio sérico'],
-            alternatives=['Usar apenas um dos medicamentos', 'Adicionar diurético'],
-            onset_time='1-3 dias',
-            evidence_level='Moderado - estudos observacionais'
-        )
-        
-        # Interações com Antibióticos
-        interactions[('amoxicilina', 'varfarina')] = DrugInteraction(
-            drug1='amoxicilina',
-            drug2='varfarina',
-            severity='Moderada',
-            mechanism='Alteração da flora intestinal reduz síntese de vitamina K',
-            clinical_effects=[
-                'Potencialização do efeito anticoagulante',
-                'Aumento do INR'
-            ],
-            adverse_reactions=[
-                'Sangramento aumentado',
-                'Equimoses',
-                'Sangramento gengival'
-            ],
-            management='Monitorar INR mais frequentemente durante e após o tratamento antibiótico',
-            monitoring=['INR a cada 2-3 dias', 'Sinais de sangramento'],
-            alternatives=['Cefalexina', 'Clindamicina'],
-            onset_time='3-5 dias',
-            evidence_level='Moderado'
-        )
-        
-        interactions[('azitromicina', 'digoxina')] = DrugInteraction(
-            drug1='azitromicina',
-            drug2='digoxina',
-            severity='Grave',
-            mechanism='Inibição do metabolismo da digoxina por bactérias intestinais',
-            clinical_effects=[
-                'Aumento dos níveis séricos de digoxina',
-                'Toxicidade digitálica'
-            ],
-            adverse_reactions=[
-                'Náuseas e vômitos',
-                'Arritmias cardíacas',
-                'Distúrbios visuais (visão amarelada)',
-                'Confusão mental',
-                'Bradicardia'
-            ],
-            management='Reduzir dose de digoxina em 50% ou suspender temporariamente',
-            monitoring=['Níveis séricos de digoxina', 'ECG', 'Sinais de toxicidade'],
-            alternatives=['Claritromicina', 'Doxiciclina'],
-            onset_time='2-4 dias',
-            evidence_level='Alto'
-        )
-        
-        # Interações com Anti-inflamatórios
-        interactions[('ibuprofeno', 'enalapril')] = DrugInteraction(
-            drug1='ibuprofeno',
-            drug2='enalapril',
-            severity='Moderada',
-            mechanism='AINEs reduzem síntese de prostaglandinas vasodilatadoras',
-            clinical_effects=[
-                'Redução do efeito anti-hipertensivo',
-                'Deterioração da função renal',
-                'Retenção de sódio e água'
-            ],
-            adverse_reactions=[
-                'Aumento da pressão arterial',
-                'Edema',
-                'Insuficiência renal',
-                'Hipercalemia'
-            ],
-            management='Evitar uso prolongado. Se necessário, monitorar função renal e pressão arterial',
-            monitoring=['Pressão arterial', 'Creatinina', 'Potássio', 'Peso corporal'],
-            alternatives=['Paracetamol', 'Corticoides tópicos'],
-            onset_time='1-2 semanas',
-            evidence_level='Alto'
-        )
-        
-        interactions[('aspirina', 'ibuprofeno')] = DrugInteraction(
-            drug1='aspirina',
-            drug2='ibuprofeno',
-            severity='Moderada',
-            mechanism='Competição pelo sítio de ligação da COX-1 plaquetária',
-            clinical_effects=[
-                'Redução do efeito antiagregante da aspirina',
-                'Aumento do risco cardiovascular'
-            ],
-            adverse_reactions=[
-                'Perda da proteção cardiovascular',
-                'Aumento do risco de infarto',
-                'Irritação gastrointestinal'
-            ],
-            management='Tomar aspirina pelo menos 2 horas antes do ibuprofeno',
-            monitoring=['Sinais de eventos cardiovasculares', 'Sintomas gastrointestinais'],
-            alternatives=['Paracetamol', 'Celecoxibe'],
-            onset_time='Imediato',
-            evidence_level='Alto'
-        )
-        
-        # Interações com Antidepressivos
-        interactions[('fluoxetina', 'varfarina')] = DrugInteraction(
-            drug1='fluoxetina',
-            drug2='varfarina',
-            severity='Moderada',
-            mechanism='Inibição do CYP2C9 e deslocamento da ligação proteica',
-            clinical_effects=[
-                'Aumento dos níveis de varfarina',
-                'Potencialização do efeito anticoagulante'
-            ],
-            adverse_reactions=[
-                'Sangramento aumentado',
-                'Hematomas',
-                'Sangramento gastrointestinal'
-            ],
-            management='Monitorar INR mais frequentemente e ajustar dose de varfarina',
-            monitoring=['INR semanal', 'Sinais de sangramento'],
-            alternatives=['Sertralina', 'Citalopram'],
-            onset_time='1-2 semanas',
-            evidence_level='Moderado'
-        )
-        
-        interactions[('sertralina', 'tramadol')] = DrugInteraction(
-            drug1='sertralina',
-            drug2='tramadol',
-            severity='Grave',
-            mechanism='Aumento do risco de síndrome serotoninérgica',
-            clinical_effects=[
-                'Excesso de serotonina no SNC',
-                'Síndrome serotoninérgica'
-            ],
-            adverse_reactions=[
-                'Agitação e confusão',
-                'Tremores e rigidez muscular',
-                'Hipertermia',
-                'Taquicardia',
-                'Diaforese',
-                'Convulsões'
-            ],
-            management='Evitar combinação. Se necessário, usar doses baixas e monitorar rigorosamente',
-            monitoring=['Sinais neurológicos', 'Temperatura corporal', 'Frequência cardíaca'],
-            alternatives=['Paracetamol', 'Codeína'],
-            onset_time='Horas a dias',
-            evidence_level='Alto'
-        )
-        
-        # Interações com Diabetes
-        interactions[('metformina', 'propranolol')] = DrugInteraction(
-            drug1='metformina',
-            drug2='propranolol',
-            severity='Leve',
-            mechanism='Mascaramento dos sintomas de hipoglicemia',
-            clinical_effects=[
-                'Redução dos sinais autonômicos de hipoglicemia',
-                'Dificuldade de reconhecer hipoglicemia'
-            ],
-            adverse_reactions=[
-                'Hipoglicemia não reconhecida',
-                'Sudorese como único sintoma',
-                'Risco de hipoglicemia grave'
-            ],
-            management='Educar paciente sobre sintomas atípicos de hipoglicemia',
-            monitoring=['Glicemia capilar mais frequente', 'Sintomas neuroglicopênicos'],
-            alternatives=['Metoprolol', 'Carvedilol'],
-            onset_time='Imediato',
-            evidence_level='Moderado'
-        )
-        
-        # Interações com Anticonvulsivantes
-        interactions[('fenitoína', 'varfarina')] = DrugInteraction(
-            drug1='fenitoína',
-            drug2='varfarina',
-            severity='Moderada',
-            mechanism='Indução enzimática do CYP2C9 e deslocamento proteico',
-            clinical_effects=[
-                'Efeito bifásico: inicial aumento, depois redução do efeito anticoagulante',
-                'Instabilidade do INR'
-            ],
-            adverse_reactions=[
-                'Sangramento inicial',
-                'Posterior risco trombótico',
-                'Dificuldade de controle do INR'
-            ],
-            management='Monitorar INR muito frequentemente e ajustar doses conforme necessário',
-            monitoring=['INR 2-3x por semana', 'Sinais de sangramento e trombose'],
-            alternatives=['Levetiracetam', 'Lamotrigina'],
-            onset_time='1-2 semanas',
-            evidence_level='Alto'
-        )
-        
-        # Interações com Gastroprotetores
-        interactions[('omeprazol', 'clopidogrel')] = DrugInteraction(
-            drug1='omeprazol',
-            drug2='clopidogrel',
-            severity='Moderada',
-            mechanism='Inibição do CYP2C19 reduz ativação do clopidogrel',
-            clinical_effects=[
-                'Redução do efeito antiagregante',
-                'Aumento do risco cardiovascular'
-            ],
-            adverse_reactions=[
-                'Perda da proteção antitrombótica',
-                'Aumento do risco de infarto',
-                'Trombose de stent'
-            ],
-            management='Preferir pantoprazol ou usar com intervalo de 12 horas',
-            monitoring=['Eventos cardiovasculares', 'Função plaquetária se disponível'],
-            alternatives=['Pantoprazol', 'Ranitidina'],
-            onset_time='3-7 dias',
-            evidence_level='Alto'
-        )
-        
-        # Adicionar interações reversas (drug2, drug1)
-        reverse_interactions = {}
-        for (drug1, drug2), interaction in interactions.items():
-            reverse_interactions[(drug2, drug1)] = DrugInteraction(
-                drug1=drug2,
-                drug2=drug1,
-                severity=interaction.severity,
-                mechanism=interaction.mechanism,
-                clinical_effects=interaction.clinical_effects,
-                adverse_reactions=interaction.adverse_reactions,
-                management=interaction.management,
-                monitoring=interaction.monitoring,
-                alternatives=interaction.alternatives,
-                onset_time=interaction.onset_time,
-                evidence_level=interaction.evidence_level
+    def _load_index(self) -> InteractionIndex:
+        """Carrega o snapshot compilado se corresponder ao arquivo de dados; senão compila o JSON."""
+        with open(self.data_path, 'rb') as f:
+            raw_data = f.read()
+        source_digest = hashlib.sha1(raw_data).hexdigest()
+        
+        index = self._read_snapshot(source_digest)
+        if index is not None:
+            self.loaded_from = 'snapshot'
+            return index
+        
+        index = self.compile_index(json.loads(raw_data.decode('utf-8')), source_digest)
+        self._write_snapshot(index)
+        self.loaded_from = 'json'
+        return index
+    
+    def _read_snapshot(self, source_digest: str) -> Optional[InteractionIndex]:
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None
+        
+        if (snapshot.get('format_version') != self.SNAPSHOT_FORMAT_VERSION
+                or snapshot.get('source_digest') != source_digest):
+            return None
+        return snapshot['index']
+    
+    def _write_snapshot(self, index: InteractionIndex):
+        """Grava o snapshot de forma atômica; em disco somente leitura segue só com o JSON."""
+        temporary_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'wb') as f:
+                pickle.dump({
+                    'format_version': self.SNAPSHOT_FORMAT_VERSION,
+                    'source_digest': index.source_digest,
+                    'index': index
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self.snapshot_path)
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+    
+    def compile_index(self, data: Dict, source_digest: str = '') -> InteractionIndex:
+        """Compila o conteúdo do arquivo de dados nas estruturas usadas pela triagem."""
+        if data.get('format_version') != self.DATA_FORMAT_VERSION:
+            raise ValueError(f"Formato da base de interações não suportado: {data.get('format_version')}")
+        
+        # Strings internadas: nomes e textos repetidos ocupam um único objeto (também no snapshot)
+        data = _intern(data)
+        drug_aliases = data.get('drug_aliases', {})
+        drug_classes = data.get('drug_classes', {})
+        interactions_database = self._compile_interactions(data.get('interactions', []))
+        class_interactions = self._compile_interactions(data.get('class_interactions', []), class_rule=True)
+        
+        unknown_classes = {
+            class_name for pair in class_interactions for class_name in pair
+        } - set(drug_classes)
+        if unknown_classes:
+            raise ValueError(f"Regras referenciam classes inexistentes: {', '.join(sorted(unknown_classes))}")
+        
+        drug_class_index: Dict[str, List[str]] = {}
+        for class_name, members in drug_classes.items():
+            for member in members:
+                drug_class_index.setdefault(member, []).append(class_name)
+        
+        drug_ids, interaction_graph = self._build_interaction_graph(interactions_database, class_interactions)
+        
+        return InteractionIndex(
+            version=data.get('version', ''),
+            source_digest=source_digest,
+            drug_aliases=drug_aliases,
+            drug_classes=drug_classes,
+            interactions_database=interactions_database,
+            class_interactions=class_interactions,
+            drug_class_index=drug_class_index,
+            alias_index=self._build_alias_index(drug_aliases, drug_class_index),
+            drug_ids=drug_ids,
+            interaction_graph=interaction_graph,
+            drug_node_ids=self._build_drug_node_ids(interactions_database, drug_class_index, drug_ids),
+            substitution_candidates=self._build_substitution_candidates(
+                data.get('drug_alternatives', {}), drug_classes, drug_class_index
             )
-        
-        interactions.update(reverse_interactions)
+        )
+    
+    def _compile_interactions(self, records: List[Dict],
+                              class_rule: bool = False) -> Dict[Tuple[str, str], DrugInteraction]:
+        """Cada interação é armazenada uma única vez, sob o par em ordem canônica."""
+        interactions = {}
+        for record in records:
+            interaction = DrugInteraction(**record, class_rule=class_rule)
+            if interaction.severity not in self.SEVERITY_RANK:
+                raise ValueError(
+                    f'Gravidade desconhecida para {interaction.drug1} + {interaction.drug2}: {interaction.severity}'
+                )
+            interaction.risk_level = self._calculate_risk_level(interaction)
+            interaction.severity_rank = self.SEVERITY_RANK[interaction.severity]
+            interactions[self._pair_key(interaction.drug1, interaction.drug2)] = interaction
         return interactions
     
+    @staticmethod
+    def _pair_key(drug1: str, drug2: str) -> Tuple[str, str]:
+        return (drug1, drug2) if drug1 <= drug2 else (drug2, drug1)
+    
+    @staticmethod
+    def _class_node(class_name: str) -> str:
+        return f'classe:{class_name}'
+    
+    def _build_interaction_graph(self, interactions_database: Dict[Tuple[str, str], DrugInteraction],
+                                 class_interactions: Dict[Tuple[str, str], DrugInteraction]
+                                 ) -> Tuple[Dict[str, int], List[Dict[int, DrugInteraction]]]:
+        """Lista de adjacência por ID inteiro dos genéricos e classes que têm alguma interação.
+        
+        Regras de classe ligam os nós das classes, sem expandir os pares de membros.
+        """
+        drug_ids: Dict[str, int] = {}
+        graph: List[Dict[int, DrugInteraction]] = []
+        edges = list(interactions_database.items()) + [
+            ((self._class_node(class1), self._class_node(class2)), interaction)
+            for (class1, class2), interaction in class_interactions.items()
+        ]
+        for pair, interaction in edges:
+            for node in pair:
+                if node not in drug_ids:
+                    drug_ids[node] = len(graph)
+                    graph.append({})
+            id1, id2 = drug_ids[pair[0]], drug_ids[pair[1]]
+            graph[id1][id2] = interaction
+            graph[id2][id1] = interaction
+        return drug_ids, graph
+    
+    def _build_drug_node_ids(self, interactions_database: Dict[Tuple[str, str], DrugInteraction],
+                             drug_class_index: Dict[str, List[str]],
+                             drug_ids: Dict[str, int]) -> Dict[str, List[int]]:
+        """Genérico -> IDs dos nós do grafo que o representam (o próprio e suas classes)."""
+        drug_node_ids: Dict[str, List[int]] = {}
+        for drug in set(drug_class_index) | {node for pair in interactions_database for node in pair}:
+            nodes = [drug_ids[drug]] if drug in drug_ids else []
+            nodes += [
+                drug_ids[self._class_node(class_name)]
+                for class_name in drug_class_index.get(drug, [])
+                if self._class_node(class_name) in drug_ids
+            ]
+            if nodes:
+                drug_node_ids[drug] = nodes
+        return drug_node_ids
+    
+    @staticmethod
+    def _build_substitution_candidates(drug_alternatives: Dict[str, List[str]],
+                                       drug_classes: Dict[str, List[str]],
+                                       drug_class_index: Dict[str, List[str]]
+                                       ) -> Dict[str, List[Tuple[str, str]]]:
+        """Genérico -> candidatos a substituto: alternativas cadastradas e depois os demais membros das suas classes."""
+        candidates: Dict[str, List[Tuple[str, str]]] = {}
+        for drug in set(drug_alternatives) | set(drug_class_index):
+            seen = {drug}
+            drug_candidates = []
+            sources = [(alternative, 'alternative_list') for alternative in drug_alternatives.get(drug, [])]
+            sources += [
+                (member, f'same_class:{class_name}')
+                for class_name in drug_class_index.get(drug, [])
+                for member in drug_classes[class_name]
+            ]
+            for candidate, source in sources:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    drug_candidates.append((candidate, source))
+            if drug_candidates:
+                candidates[drug] = drug_candidates
+        return candidates
+    
+    def get_interaction(self, drug1: str, drug2: str) -> Optional[DrugInteraction]:
+        """Interação entre dois genéricos, independente da ordem.
+        
+        O par específico tem precedência; senão vale a regra de classe mais grave.
+        """
+        index = self.index
+        interaction = index.interactions_database.get(self._pair_key(drug1, drug2))
+        if interaction is not None or drug1 == drug2:
+            return interaction
+        
+        best = None
+        for class1 in index.drug_class_index.get(drug1, []):
+            for class2 in index.drug_class_index.get(drug2, []):
+                candidate = index.class_interactions.get(self._pair_key(class1, class2))
+                if candidate is not None and (best is None or self._takes_precedence(candidate, best)):
+                    best = candidate
+        return best
+    
+    def _build_alias_index(self, drug_aliases: Dict[str, List[str]],
+                           drug_class_index: Dict[str, List[str]]) -> Dict[str, str]:
+        """Índice reverso alias -> genérico (o primeiro genérico a declarar o alias prevalece)."""
+        alias_index = {}
+        for generic_name, aliases in drug_aliases.items():
+            for name in [generic_name] + aliases:
+                alias_index.setdefault(self._alias_key(name), generic_name)
+        # Genéricos conhecidos só pelas classes também aceitam grafia sem acentos
+        for generic_name in drug_class_index:
+            alias_index.setdefault(self._alias_key(generic_name), generic_name)
+        return alias_index
+    
+    @staticmethod
+    def _alias_key(name: str) -> str:
+        return _WHITESPACE_PATTERN.sub(' ', fold_text(name)).strip()
+    
     def normalize_drug_name(self, drug_name: str) -> str:
         """Normaliza nome do medicamento para busca."""
+        return self._state[1](drug_name)
+    
+    def _normalize_uncached(self, index: InteractionIndex, drug_name: str) -> str:
         drug_name = drug_name.lower().strip()
         
         # Remover dosagens e formas farmacêuticas
-        drug_name = re.sub(r'\d+\s*mg|\d+\s*g|\d+\s*ml', '', drug_name)
-        drug_name = re.sub(r'comprimido|cápsula|solução|xarope|gotas', '', drug_name)
+        drug_name = _DOSE_PATTERN.sub('', drug_name)
+        drug_name = _DOSAGE_FORM_PATTERN.sub('', drug_name)
         drug_name = drug_name.strip()
         
-        # Buscar nome genérico através dos aliases
-        for generic_name, aliases in self.drug_aliases.items():
-            if drug_name in aliases or drug_name == generic_name:
-                return generic_name
-        
-        return drug_name
+        # Buscar nome genérico através dos aliases (com ou sem acentos)
+        return index.alias_index.get(self._alias_key(drug_name), drug_name)
     
     def check_interactions(self, medications: List[str]) -> List[Dict]:
         """Verifica interações entre uma lista de medicamentos."""
         if len(medications) < 2:
             return []
         
+        # Base e normalizador lidos juntos: uma recarga concorrente não mistura versões
+        index, normalize = self._state
+        
         # Normalizar nomes dos medicamentos
-        normalized_meds = [self.normalize_drug_name(med) for med in medications]
-        
-        interactions_found = []
-        
-        # Verificar todas as combinações possíveis
-        for i in range(len(normalized_meds)):
-            for j in range(i + 1, len(normalized_meds)):
-                drug1 = normalized_meds[i]
-                drug2 = normalized_meds[j]
-                
-                interaction = self.interactions_database.get((drug1, drug2))
-                
-                if interaction:
-                    interactions_found.append({
-                        'drug1': medications[i],
-                        'drug2': medications[j],
-                        'drug1_generic': drug1,
-                        'drug2_generic': drug2,
-                        'severity': interaction.severity,
-                        'mechanism': interaction.mechanism,
-                        'clinical_effects': interaction.clinical_effects,
-                        'adverse_reactions': interaction.adverse_reactions,
-                        'management': interaction.management,
-                        'monitoring': interaction.monitoring,
-                        'alternatives': interaction.alternatives,
-                        'onset_time': interaction.onset_time,
-                        'evidence_level': interaction.evidence_level,
-                        'risk_level': self._calculate_risk_level(interaction)
-                    })
-        
-        # Ordenar por gravidade
-        severity_order = {'Contraindicada': 4, 'Grave': 3, 'Moderada': 2, 'Leve': 1}
-        interactions_found.sort(key=lambda x: severity_order.get(x['severity'], 0), reverse=True)
-        
-        return interactions_found
+        normalized_meds = [normalize(med) for med in medications]
+        
+        return [
+            self._format_interaction(medications[i], medications[j], normalized_meds[i], normalized_meds[j], interaction)
+            for i, j, interaction in self._screen_pairs(index, normalized_meds)
+        ]
+    
+    def _screen_pairs(self, index: InteractionIndex,
+                      normalized_meds: List[str]) -> List[Tuple[int, int, DrugInteraction]]:
+        """Pares (i, j) do regime que interagem, do mais grave ao mais leve e, em cada gravidade, na ordem do regime."""
+        # Posições de cada nó do grafo (genérico ou classe) presente no regime
+        positions: Dict[int, List[int]] = {}
+        for position, drug in enumerate(normalized_meds):
+            for node_id in index.drug_node_ids.get(drug, ()):
+                positions.setdefault(node_id, []).append(position)
+        
+        # Interações agrupadas por gravidade, cada grupo na ordem dos pares do regime
+        buckets: Dict[int, List[Tuple[int, int, DrugInteraction]]] = {}
+        
+        for i, drug in enumerate(normalized_meds):
+            best = self._best_partners(index, drug, positions, normalized_meds, after=i)
+            for j in sorted(best):
+                interaction = best[j]
+                buckets.setdefault(interaction.severity_rank, []).append((i, j, interaction))
+        
+        return [pair for rank in sorted(buckets, reverse=True) for pair in buckets[rank]]
+    
+    def _best_partners(self, index: InteractionIndex, drug: str, positions: Dict[int, List[int]],
+                       normalized_meds: Union[List[str], Dict[int, str]],
+                       after: int = -1) -> Dict[int, DrugInteraction]:
+        """Melhor interação do genérico com cada posição do regime (só posições > after).
+
+        positions mapeia nó do grafo -> posições do regime que o contêm e
+        normalized_meds, posição -> genérico; o custo depende do grau do genérico
+        no grafo, não do tamanho do regime.
+        """
+        # Melhor interação por posição j: par específico antes de regra de classe, depois a mais grave
+        best: Dict[int, DrugInteraction] = {}
+        
+        for node_id in index.drug_node_ids.get(drug, ()):
+            # Vizinhos do nó presentes no regime (percorre o menor dos dois conjuntos)
+            neighbours = index.interaction_graph[node_id]
+            if len(neighbours) <= len(positions):
+                matches = [(other_id, interaction) for other_id, interaction in neighbours.items()
+                           if other_id in positions]
+            else:
+                matches = [(other_id, neighbours[other_id]) for other_id in positions
+                           if other_id in neighbours]
+            
+            for other_id, interaction in matches:
+                for j in positions[other_id]:
+                    if j <= after or normalized_meds[j] == drug:
+                        continue
+                    current = best.get(j)
+                    if current is None or self._takes_precedence(interaction, current):
+                        best[j] = interaction
+        
+        return best
+    
+    def screen_regimens(self, regimens: List[List[str]], workers: int = 1,
+                        chunk_size: int = 2000) -> List[Dict]:
+        """Triagem em lote de vários regimes, com resumos compactos na mesma ordem.
+
+        Cada nome distinto do lote é normalizado uma única vez. Com workers > 1,
+        lotes maiores que chunk_size são divididos entre processos, que carregam
+        a base pelo snapshot compilado uma vez e são reaproveitados pelas
+        requisições seguintes (recriados quando a base é recarregada). Um bloco
+        triado por processo com outra versão da base é refeito no próprio processo.
+        """
+        index, normalize = self._state
+        
+        normalized_names: Dict[str, str] = {}
+        for regimen in regimens:
+            for name in regimen:
+                if name not in normalized_names:
+                    normalized_names[name] = normalize(name)
+        
+        jobs = [(regimen, [normalized_names[name] for name in regimen]) for regimen in regimens]
+        
+        if workers <= 1 or len(jobs) <= chunk_size:
+            return [self._compact_summary(index, medications, normalized) for medications, normalized in jobs]
+        
+        chunks = [jobs[start:start + chunk_size] for start in range(0, len(jobs), chunk_size)]
+        executor = self._get_batch_pool(workers, index.source_digest)
+        results = executor.map(_screen_batch_chunk, [(index.source_digest, chunk) for chunk in chunks])
+        
+        summaries = []
+        for chunk, chunk_summaries in zip(chunks, results):
+            if chunk_summaries is None:
+                chunk_summaries = [self._compact_summary(index, medications, normalized)
+                                   for medications, normalized in chunk]
+            summaries.extend(chunk_summaries)
+        return summaries
+    
+    def _get_batch_pool(self, workers: int, source_digest: str) -> ProcessPoolExecutor:
+        """Pool de processos da triagem em lote, recriado se mudar o nº de processos ou a base."""
+        with self._batch_pool_lock:
+            if self._batch_pool is None or self._batch_pool_key != (workers, source_digest):
+                if self._batch_pool is not None:
+                    # Lotes em andamento no pool anterior terminam normalmente
+                    self._batch_pool.shutdown(wait=False)
+                self._batch_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                                       initargs=(self.data_path, self.snapshot_path))
+                self._batch_pool_key = (workers, source_digest)
+            return self._batch_pool
+    
+    def shutdown_batch_pool(self):
+        """Encerra os processos da triagem em lote, se existirem."""
+        with self._batch_pool_lock:
+            if self._batch_pool is not None:
+                self._batch_pool.shutdown()
+                self._batch_pool = self._batch_pool_key = None
+    
+    def _compact_summary(self, index: InteractionIndex, medications: List[str],
+                         normalized_meds: List[str]) -> Dict:
+        """Resumo enxuto de um regime para a triagem em lote."""
+        pairs = self._screen_pairs(index, normalized_meds) if len(medications) >= 2 else []
+        
+        severity_breakdown = {severity: 0 for severity in self.SEVERITY_RANK}
+        for _, _, interaction in pairs:
+            severity_breakdown[interaction.severity] += 1
+        
+        return {
+            'total_medications': len(medications),
+            'total_interactions': len(pairs),
+            'severity_breakdown': severity_breakdown,
+            'highest_severity': pairs[0][2].severity if pairs else 'Nenhuma',
+            'requires_immediate_attention': severity_breakdown['Contraindicada'] + severity_breakdown['Grave'] > 0,
+            'interactions': [
+                {
+                    'drug1': medications[i],
+                    'drug2': medications[j],
+                    'severity': interaction.severity,
+                    'risk_level': interaction.risk_level,
+                    'matched_by': 'class_rule' if interaction.class_rule else 'drug_pair'
+                }
+                for i, j, interaction in pairs
+            ]
+        }
+    
+    @staticmethod
+    def _precedence(interaction: DrugInteraction) -> Tuple[bool, int, str, str]:
+        """Par específico antes de regra de classe, depois a mais grave; o par de nomes desempata."""
+        return (not interaction.class_rule, interaction.severity_rank, interaction.drug1, interaction.drug2)
+    
+    def _takes_precedence(self, candidate: DrugInteraction, current: DrugInteraction) -> bool:
+        return self._precedence(candidate) > self._precedence(current)
+    
+    def _format_interaction(self, drug1: str, drug2: str, drug1_generic: str, drug2_generic: str,
+                            interaction: DrugInteraction) -> Dict:
+        return {
+            'drug1': drug1,
+            'drug2': drug2,
+            'drug1_generic': drug1_generic,
+            'drug2_generic': drug2_generic,
+            'severity': interaction.severity,
+            'mechanism': interaction.mechanism,
+            'clinical_effects': interaction.clinical_effects,
+            'adverse_reactions': interaction.adverse_reactions,
+            'management': interaction.management,
+            'monitoring': interaction.monitoring,
+            'alternatives': interaction.alternatives,
+            'onset_time': interaction.onset_time,
+            'evidence_level': interaction.evidence_level,
+            'risk_level': interaction.risk_level,
+            'matched_by': 'class_rule' if interaction.class_rule else 'drug_pair',
+            'drug_classes': [interaction.drug1, interaction.drug2] if interaction.class_rule else []
+        }
     
     def _calculate_risk_level(self, interaction: DrugInteraction) -> str:
-        """Calcula nível de risco baseado na gravidade e evidência."""
-        severity_score = {
-            'Contraindicada': 4,
-            'Grave': 3,
-            'Moderada': 2,
-            'Leve': 1
-        }.get(interaction.severity, 0)
-        
-        evidence_score = {
-            'Alto': 3,
-            'Moderado': 2,
-            'Baixo': 1
-        }.get(interaction.evidence_level.split(' - ')[0], 1)
+        """Calcula nível de risco baseado na gravidade e evidência (uma vez, na carga da base)."""
+        severity_score = self.SEVERITY_RANK.get(interaction.severity, 0)
+        evidence_score = self.EVIDENCE_SCORE.get(interaction.evidence_level.split(' - ')[0], 1)
         
         total_score = severity_score * evidence_score
         
@@ -414,8 +563,39 @@ class EnhancedDrugInteractionChecker:
             return 'Baixo'
     
     def get_interaction_summary(self, medications: List[str]) -> Dict:
-        """Retorna resumo completo das interações encontradas."""
-        interactions = self.check_interactions(medications)
+        """Retorna resumo completo das interações encontradas.
+
+        A triagem é memorizada pelo regime normalizado e ordenado (mais a versão
+        da base): o mesmo regime em outra ordem ou grafia reaproveita o resultado,
+        que é apenas reposicionado para a ordem e os nomes desta requisição.
+        """
+        index, normalize = self._state
+        normalized_meds = [normalize(med) for med in medications]
+        
+        # Posição no regime canônico (ordenado) -> posição na requisição
+        order = sorted(range(len(normalized_meds)), key=lambda position: (normalized_meds[position], position))
+        cache_key = (index.source_digest, tuple(normalized_meds[position] for position in order))
+        
+        canonical_pairs = self.summary_cache.get(cache_key)
+        if canonical_pairs is None:
+            canonical_pairs = self._screen_pairs(index, list(cache_key[1])) if len(medications) >= 2 else []
+            self.summary_cache.put(cache_key, canonical_pairs)
+        
+        pairs = [
+            (min(order[i], order[j]), max(order[i], order[j]), interaction)
+            for i, j, interaction in canonical_pairs
+        ]
+        return self.build_summary(medications, normalized_meds, pairs)
+    
+    def build_summary(self, medications: List[str], normalized_meds: List[str],
+                      pairs: List[Tuple[int, int, DrugInteraction]]) -> Dict:
+        """Monta o resumo a partir dos pares (i, j) do regime que interagem, em qualquer ordem."""
+        interactions = [
+            self._format_interaction(medications[i], medications[j], normalized_meds[i], normalized_meds[j], interaction)
+            for _, i, j, interaction in sorted(
+                (-interaction.severity_rank, i, j, interaction) for i, j, interaction in pairs
+            )
+        ]
         
         summary = {
             'total_medications': len(medications),
@@ -485,70 +665,118 @@ class EnhancedDrugInteractionChecker:
         
         return recommendations
     
-    def search_drug_alternatives(self, drug_name: str, indication: str = "") -> List[str]:
-        """Busca alternativas medicamentosas para evitar interações."""
-        normalized_drug = self.normalize_drug_name(drug_name)
-        
-        # Base de dados simplificada de alternativas
-        alternatives_db = {
-            'aspirina': ['clopidogrel', 'ticagrelor', 'prasugrel'],
-            'varfarina': ['rivaroxabana', 'apixabana', 'dabigatrana'],
-            'omeprazol': ['pantoprazol', 'lansoprazol', 'ranitidina'],
-            'ibuprofeno': ['paracetamol', 'celecoxibe', 'naproxeno'],
-            'fluoxetina': ['sertralina', 'citalopram', 'escitalopram'],
-            'propranolol': ['metoprolol', 'atenolol', 'carvedilol'],
-            'fenitoína': ['levetiracetam', 'lamotrigina', 'carbamazepina']
-        }
-        
-        return alternatives_db.get(normalized_drug, [])
+    def search_drug_alternatives(self, drug_name: str, indication: str = "",
+                                 current_medications: Optional[List[str]] = None) -> List[str]:
+        """Busca alternativas medicamentosas para evitar interações (as mais seguras para o regime primeiro)."""
+        return [
+            alternative['drug']
+            for alternative in self.rank_drug_alternatives(drug_name, current_medications or [], indication)
+        ]
     
-    def generate_interaction_report(self, medications: List[str]) -> str:
-        """Gera relatório detalhado de interações medicamentosas."""
-        summary = self.get_interaction_summary(medications)
-        
-        report = "RELATÓRIO DE INTERAÇÕES MEDICAMENTOSAS\n"
-        report += "=" * 50 + "\n\n"
-        
-        report += f"MEDICAMENTOS ANALISADOS ({summary['total_medications']}):\n"
-        for i, med in enumerate(medications, 1):
-            report += f"{i}. {med}\n"
-        report += "\n"
-        
-        report += f"TOTAL DE INTERAÇÕES ENCONTRADAS: {summary['total_interactions']}\n\n"
-        
-        if summary['total_interactions'] > 0:
-            report += "RESUMO POR GRAVIDADE:\n"
-            for severity, count in summary['severity_breakdown'].items():
-                if count > 0:
-                    report += f"- {severity}: {count} interação(ões)\n"
-            report += "\n"
-            
-            report += "DETALHES DAS INTERAÇÕES:\n\n"
-            for i, interaction in enumerate(summary['interactions'], 1):
-                report += f"{i}. {interaction['drug1']} + {interaction['drug2']}\n"
-                report += f"   Gravidade: {interaction['severity']}\n"
-                report += f"   Mecanismo: {interaction['mechanism']}\n"
-                report += f"   Efeitos Clínicos:\n"
-                for effect in interaction['clinical_effects']:
-                    report += f"   - {effect}\n"
-                report += f"   Reações Adversas Possíveis:\n"
-                for reaction in interaction['adverse_reactions']:
-                    report += f"   - {reaction}\n"
-                report += f"   Conduta: {interaction['management']}\n"
-                report += f"   Monitoramento: {', '.join(interaction['monitoring'])}\n"
-                report += f"   Tempo de Início: {interaction['onset_time']}\n"
-                report += f"   Nível de Evidência: {interaction['evidence_level']}\n\n"
+    def rank_drug_alternatives(self, drug_name: str, current_medications: List[str],
+                               indication: str = "") -> List[Dict]:
+        """Candidatos a substituto do medicamento, triados contra o restante do regime.
+
+        Os candidatos vêm pré-calculados da base (alternativas cadastradas e
+        membros das mesmas classes); cada um é comparado só com os seus vizinhos
+        no grafo presentes no regime. A ordem é: sem interações primeiro, depois
+        pela maior gravidade e pelo número de interações, mantendo a ordem da base
+        nos empates. Candidatos que já fazem parte do regime são omitidos.
+        """
+        index, normalize = self._state
+        drug = normalize(drug_name)
+        
+        # Regime sem o medicamento a ser substituído
+        remaining = []
+        remaining_normalized = []
+        for med in current_medications:
+            normalized = normalize(med)
+            if normalized != drug:
+                remaining.append(med)
+                remaining_normalized.append(normalized)
+        
+        positions: Dict[int, List[int]] = {}
+        for position, normalized in enumerate(remaining_normalized):
+            for node_id in index.drug_node_ids.get(normalized, ()):
+                positions.setdefault(node_id, []).append(position)
+        
+        in_regimen = set(remaining_normalized)
+        ranked = []
+        for order, (candidate, source) in enumerate(index.substitution_candidates.get(drug, [])):
+            if candidate in in_regimen:
+                continue
             
-            report += "RECOMENDAÇÕES GERAIS:\n"
-            for rec in summary['general_recommendations']:
-                report += f"- {rec}\n"
-        else:
-            report += "✅ Nenhuma interação medicamentosa conhecida foi encontrada.\n"
-            report += "Continue seguindo as orientações médicas e farmacêuticas.\n"
+            best = self._best_partners(index, candidate, positions, remaining_normalized)
+            interactions = sorted(
+                (-interaction.severity_rank, j, interaction) for j, interaction in best.items()
+            )
+            ranked.append((
+                -interactions[0][0] if interactions else 0, len(interactions), order,
+                {
+                    'drug': candidate,
+                    'source': source,
+                    'safe': not interactions,
+                    'highest_severity': interactions[0][2].severity if interactions else 'Nenhuma',
+                    'total_interactions': len(interactions),
+                    'interactions': [
+                        {
+                            'drug': remaining[j],
+                            'severity': interaction.severity,
+                            'risk_level': interaction.risk_level,
+                            'matched_by': 'class_rule' if interaction.class_rule else 'drug_pair'
+                        }
+                        for _, j, interaction in interactions
+                    ]
+                }
+            ))
+        
+        ranked.sort(key=lambda item: item[:3])
+        return [alternative for _, _, _, alternative in ranked]
+    
+    def generate_interaction_report(self, medications: List[str], summary: Optional[Dict] = None,
+                                    fmt: str = 'text') -> str:
+        """Gera relatório detalhado de interações medicamentosas."""
+        # Reaproveitar o resumo já calculado pelo chamador, se houver
+        if summary is None:
+            summary = self.get_interaction_summary(medications)
         
-        report += "\n" + "=" * 50 + "\n"
-        report += "IMPORTANTE: Este relatório é baseado em dados científicos disponíveis.\n"
-        report += "Sempre consulte seu médico ou farmacêutico para orientações personalizadas.\n"
+        return self.report_renderer.render_interaction_report(medications, summary, fmt)
+    
+    def iter_interaction_report(self, medications: List[str], summary: Optional[Dict] = None,
+                                fmt: str = 'text') -> Iterator[str]:
+        """Gera o relatório de interações em partes, para respostas em streaming."""
+        if summary is None:
+            summary = self.get_interaction_summary(medications)
         
-        return report
+        return self.report_renderer.iter_interaction_report(medications, summary, fmt)
+
+
+# Verificador compartilhado pela API v2 e pela API legada, criado no primeiro uso
+_shared_checker = None
+_shared_checker_lock = threading.Lock()
+
+def get_shared_checker() -> EnhancedDrugInteractionChecker:
+    """Instancia o verificador de interações no primeiro uso, não na importação do módulo."""
+    global _shared_checker
+    if _shared_checker is None:
+        with _shared_checker_lock:
+            if _shared_checker is None:
+                _shared_checker = EnhancedDrugInteractionChecker(
+                    data_path=os.environ.get('MEDIA_DRUG_INTERACTIONS_PATH')
+                )
+    return _shared_checker
+
+
+# Triagem em lote em processos separados: cada processo carrega a base uma vez
+_batch_checker = None
+
+def _init_batch_worker(data_path: str, snapshot_path: str):
+    global _batch_checker
+    _batch_checker = EnhancedDrugInteractionChecker(data_path=data_path, snapshot_path=snapshot_path)
 
+def _screen_batch_chunk(task: Tuple[str, List[Tuple[List[str], List[str]]]]) -> Optional[List[Dict]]:
+    source_digest, jobs = task
+    index = _batch_checker.index
+    if index.source_digest != source_digest:
+        return None  # arquivo de dados mudou desde a carga do processo principal
+    return [_batch_checker._compact_summary(index, medications, normalized) for medications, normalized in jobs]
@@ -0,0 +1,172 @@
+"""
+Casamento aproximado de frases do léxico de sintomas.
+Tolera acentos ausentes e erros de digitação ("dor de cabesa", "nausea",
+"vomitu") usando tabelas de vizinhança por deleção (estilo SymSpell)
+pré-calculadas sobre as palavras do léxico: cada palavra do texto é
+resolvida por consultas a dicionário, sem comparar com todas as frases.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Náusea" -> "nausea")."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_PATTERN.findall(text)
+
+
+class FuzzyPhraseMatcher:
+    # Palavras do léxico menores que isso só casam sem erros (após remover acentos)
+    MIN_FUZZY_LENGTH = 5
+    # A partir deste tamanho a palavra aceita até 2 edições
+    LONG_WORD_LENGTH = 8
+    # Frases de uma palavra só casam com erro se a palavra for longa o bastante
+    MIN_SINGLE_WORD_FUZZY_LENGTH = 6
+
+    def __init__(self, phrases: Dict[str, str], cache_size: int = 16384):
+        """phrases: frase do léxico -> valor retornado quando ela é encontrada."""
+        self.phrases: List[Tuple[Tuple[str, ...], str]] = []
+        self.first_word_index: Dict[str, List[int]] = {}
+        self.word_phrases: Dict[str, Set[int]] = {}
+
+        for phrase, value in phrases.items():
+            words = tuple(tokenize(fold_text(phrase)))
+            if not words:
+                continue
+            phrase_idx = len(self.phrases)
+            self.phrases.append((words, value))
+            self.first_word_index.setdefault(words[0], []).append(phrase_idx)
+            for word in words:
+                self.word_phrases.setdefault(word, set()).add(phrase_idx)
+
+        self.vocabulary = set(self.word_phrases)
+        # Maior frase do léxico, em palavras
+        self.max_phrase_words = max((len(words) for words, _ in self.phrases), default=1)
+
+        # Variante por deleção -> palavras do léxico que a geram
+        self.deletes: Dict[str, Set[str]] = {}
+        for word in self.vocabulary:
+            for variant in self._delete_variants(word, self._max_distance(word)):
+                self.deletes.setdefault(variant, set()).add(word)
+
+        self._lookup = lru_cache(maxsize=cache_size)(self._lookup_word)
+
+    def _max_distance(self, word: str) -> int:
+        """Edições toleradas para uma palavra do léxico."""
+        if len(word) < self.MIN_FUZZY_LENGTH:
+            return 0
+        return 2 if len(word) >= self.LONG_WORD_LENGTH else 1
+
+    @staticmethod
+    def _delete_variants(word: str, max_distance: int) -> Set[str]:
+        variants = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            frontier = {
+                candidate[:position] + candidate[position + 1:]
+                for candidate in frontier if len(candidate) > 1
+                for position in range(len(candidate))
+            }
+            variants |= frontier
+        return variants
+
+    def _lookup_word(self, token: str) -> Tuple[Tuple[str, int], ...]:
+        """Palavras do léxico compatíveis com o token e suas distâncias de edição."""
+        if token in self.vocabulary:
+            return ((token, 0),)
+        if len(token) < self.MIN_FUZZY_LENGTH - 1:
+            return ()
+
+        token_distance = 2 if len(token) >= self.LONG_WORD_LENGTH - 2 else 1
+        candidates = set()
+        for variant in self._delete_variants(token, token_distance):
+            candidates |= self.deletes.get(variant, set())
+
+        # Confirmar apenas os poucos candidatos vindos das tabelas
+        matches = []
+        for word in candidates:
+            distance = self._edit_distance(token, word, self._max_distance(word))
+            if 0 < distance <= self._max_distance(word):
+                matches.append((word, distance))
+        return tuple(sorted(matches, key=lambda match: (match[1], match[0])))
+
+    @staticmethod
+    def _edit_distance(source: str, target: str, limit: int) -> int:
+        """Distância de Damerau-Levenshtein (transposições adjacentes), limitada a limit + 1."""
+        if abs(len(source) - len(target)) > limit:
+            return limit + 1
+
+        previous_previous = None
+        previous = list(range(len(target) + 1))
+        for i in range(1, len(source) + 1):
+            current = [i] + [0] * len(target)
+            for j in range(1, len(target) + 1):
+                cost = 0 if source[i - 1] == target[j - 1] else 1
+                current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if (previous_previous is not None and i > 1 and j > 1
+                        and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                    current[j] = min(current[j], previous_previous[j - 2] + 1)
+            if min(current) > limit:
+                return limit + 1
+            previous_previous, previous = previous, current
+
+        return previous[-1]
+
+    def _phrase_matches_at(self, words: Tuple[str, ...],
+                           token_candidates: List[Dict[str, int]], start: int) -> bool:
+        if start + len(words) > len(token_candidates):
+            return False
+
+        for offset, word in enumerate(words):
+            distance = token_candidates[start + offset].get(word)
+            if distance is None:
+                return False
+            if len(words) == 1 and distance > 0 and len(word) < self.MIN_SINGLE_WORD_FUZZY_LENGTH:
+                return False
+        return True
+
+    def find(self, text: str) -> List[str]:
+        """Valores das frases do léxico presentes no texto, tolerando erros e acentos."""
+        token_candidates = [dict(self._lookup(token)) for token in tokenize(fold_text(text))]
+
+        found = []
+        seen = set()
+        for start, candidates in enumerate(token_candidates):
+            for word in candidates:
+                for phrase_idx in self.first_word_index.get(word, ()):
+                    words, value = self.phrases[phrase_idx]
+                    if value not in seen and self._phrase_matches_at(words, token_candidates, start):
+                        seen.add(value)
+                        found.append(value)
+        return found
+
+    def search(self, query: str) -> List[str]:
+        """Valores das frases que contêm todas as palavras da consulta (com tolerância)."""
+        phrase_ids = None
+        for token in tokenize(fold_text(query)):
+            candidates = self._lookup(token)
+            if not candidates and len(token) < self.MIN_FUZZY_LENGTH - 1:
+                continue  # palavras curtas desconhecidas ("de", "a") não restringem a busca
+
+            token_phrases = set()
+            for word, _ in candidates:
+                token_phrases |= self.word_phrases[word]
+            phrase_ids = token_phrases if phrase_ids is None else phrase_ids & token_phrases
+
+        if not phrase_ids:
+            return []
+
+        values = []
+        for phrase_idx in sorted(phrase_ids):
+            value = self.phrases[phrase_idx][1]
+            if value not in values:
+                values.append(value)
+        return values
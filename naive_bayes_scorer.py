@@ -0,0 +1,93 @@
+"""
+Motor de pontuação Naive Bayes (multinomial) sobre sintomas canônicos.
+As tabelas de log-verossimilhança por doença são pré-calculadas a partir do
+índice de sintomas do DiagnosticEngine; pontuar um relatório é somar as
+linhas dos sintomas presentes.
+"""
+import math
+from operator import add
+from typing import Dict, List, Optional, Tuple
+
+
+class NaiveBayesScorer:
+    # Pseudo-contagens: sintoma primário pesa mais que secundário
+    PRIMARY_WEIGHT = 2.0
+    SECONDARY_WEIGHT = 1.0
+
+    def __init__(self, diagnostic_engine, alpha: float = 0.5,
+                 priors: Optional[Dict[str, float]] = None):
+        self.engine = diagnostic_engine
+        self.alpha = alpha
+        self.disease_count = len(diagnostic_engine.disease_codes)
+        self.vocabulary_size = len(diagnostic_engine.symptom_index)
+
+        self.log_priors = self._build_log_priors(priors or {})
+        self._denominators = self._build_denominators()
+        self.log_likelihood = {
+            symptom_id: self._build_row(postings)
+            for symptom_id, postings in diagnostic_engine.symptom_index.items()
+        }
+
+    def _build_log_priors(self, priors: Dict[str, float]) -> List[float]:
+        """Priors por doença: 'prior' da base, valor informado ou uniforme."""
+        raw = []
+        for cid_code in self.engine.disease_codes:
+            disease_info = self.engine.symptom_database[cid_code]
+            raw.append(priors.get(cid_code, disease_info.get('prior', 1.0)))
+
+        total = sum(raw)
+        return [math.log(value / total) for value in raw]
+
+    def _build_denominators(self) -> List[float]:
+        """Soma das pseudo-contagens de cada doença mais a suavização de Laplace."""
+        totals = [0.0] * self.disease_count
+        for postings in self.engine.symptom_index.values():
+            for disease_idx, is_primary in postings:
+                totals[disease_idx] += self.PRIMARY_WEIGHT if is_primary else self.SECONDARY_WEIGHT
+
+        return [total + self.alpha * self.vocabulary_size for total in totals]
+
+    def _build_row(self, postings: List[Tuple[int, bool]]) -> List[float]:
+        """Linha log P(sintoma | doença) para todas as doenças."""
+        counts = [0.0] * self.disease_count
+        for disease_idx, is_primary in postings:
+            counts[disease_idx] = self.PRIMARY_WEIGHT if is_primary else self.SECONDARY_WEIGHT
+
+        return [
+            math.log((count + self.alpha) / denominator)
+            for count, denominator in zip(counts, self._denominators)
+        ]
+
+    def get_row(self, symptom_id: str) -> List[float]:
+        """Linha pré-calculada; sintomas fora do vocabulário são calculados na hora."""
+        row = self.log_likelihood.get(symptom_id)
+        if row is None:
+            row = self._build_row(self.engine.get_symptom_postings(symptom_id))
+        return row
+
+    def score(self, symptom_ids: List[str]) -> Tuple[Dict[int, float], Dict[int, List[str]]]:
+        """Retorna probabilidades a posteriori e sintomas correspondentes por doença.
+
+        Apenas doenças com ao menos um sintoma correspondente são candidatas.
+        """
+        log_scores = self.log_priors
+        matching: Dict[int, List[str]] = {}
+
+        # Soma em ordem canônica: a mesma pontuação para qualquer ordem dos sintomas
+        for symptom_id in sorted(symptom_ids):
+            log_scores = list(map(add, log_scores, self.get_row(symptom_id)))
+
+        for symptom_id in symptom_ids:
+            for disease_idx, _ in self.engine.get_symptom_postings(symptom_id):
+                matching.setdefault(disease_idx, []).append(symptom_id)
+
+        if not matching:
+            return {}, {}
+
+        # Normalização (softmax) sobre todas as doenças da base
+        max_score = max(log_scores)
+        exp_scores = [math.exp(value - max_score) for value in log_scores]
+        total = sum(exp_scores)
+
+        posteriors = {disease_idx: exp_scores[disease_idx] / total for disease_idx in matching}
+        return posteriors, matching
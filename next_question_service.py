@@ -0,0 +1,123 @@
+"""
+Sugestão da próxima pergunta na triagem por sintomas.
+Usa uma matriz doença × sintoma pré-calculada a partir da base de sintomas e
+ordena os sintomas ainda não perguntados pelo ganho de informação esperado
+sobre as doenças mais prováveis.
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+from src.services.diagnostic_engine import DiagnosticEngine, DiagnosticResult
+
+
+class NextQuestionService:
+    # P(sintoma presente | doença) por tipo de correspondência
+    PRIMARY_PRESENCE = 0.8
+    SECONDARY_PRESENCE = 0.3
+    ABSENT_PRESENCE = 0.02
+
+    def __init__(self, diagnostic_engine: DiagnosticEngine):
+        self.engine = diagnostic_engine
+        self.symptom_ids = list(diagnostic_engine.symptom_index)
+        self.disease_positions = {code: idx for idx, code in enumerate(diagnostic_engine.disease_codes)}
+
+        # Matriz armazenada por coluna: para cada doença, P(presente) de cada sintoma do vocabulário
+        self.columns = self._build_columns()
+
+    def _build_columns(self) -> List[List[float]]:
+        disease_count = len(self.engine.disease_codes)
+        columns = [[self.ABSENT_PRESENCE] * len(self.symptom_ids) for _ in range(disease_count)]
+
+        for symptom_idx, symptom_id in enumerate(self.symptom_ids):
+            for disease_idx, is_primary in self.engine.symptom_index[symptom_id]:
+                columns[disease_idx][symptom_idx] = (
+                    self.PRIMARY_PRESENCE if is_primary else self.SECONDARY_PRESENCE
+                )
+
+        return columns
+
+    def suggest(self, symptom_ids: Sequence[str], diagnostic_results: List[DiagnosticResult],
+                limit: int = 5) -> Dict:
+        """Ordena os sintomas não perguntados pelo ganho de informação sobre os candidatos.
+
+        Sem diagnósticos (nenhum sintoma ainda), todas as doenças entram com
+        probabilidade uniforme.
+        """
+        candidates = self._candidate_distribution(diagnostic_results)
+        disease_indices = [disease_idx for disease_idx, _ in candidates]
+        priors = [prior for _, prior in candidates]
+        prior_entropy = self._entropy(priors)
+
+        asked = set(symptom_ids)
+        scored = []
+
+        # Uma passada sobre as colunas das doenças candidatas (sintoma a sintoma)
+        selected_columns = [self.columns[disease_idx] for disease_idx in disease_indices]
+        for symptom_idx, presence in enumerate(zip(*selected_columns)):
+            symptom_id = self.symptom_ids[symptom_idx]
+            if symptom_id in asked:
+                continue
+
+            gain, probability_present = self._information_gain(priors, presence, prior_entropy)
+            if gain > 1e-9:
+                scored.append((gain, -symptom_idx, symptom_id, probability_present, presence))
+
+        scored.sort(reverse=True)
+
+        questions = []
+        for gain, _, symptom_id, probability_present, presence in scored[:limit]:
+            questions.append({
+                'symptom': symptom_id,
+                'information_gain': round(gain, 4),
+                'probability_present': round(probability_present, 4),
+                # Candidatos que ficam mais prováveis se a resposta for "sim"
+                'supports': [
+                    self.engine.disease_codes[disease_idx]
+                    for disease_idx, p_present in zip(disease_indices, presence)
+                    if p_present > self.ABSENT_PRESENCE
+                ]
+            })
+
+        return {
+            'candidate_diseases': [
+                {
+                    'cid_code': self.engine.disease_codes[disease_idx],
+                    'disease_name': self.engine.symptom_database[self.engine.disease_codes[disease_idx]]['name'],
+                    'probability': round(prior, 4)
+                }
+                for disease_idx, prior in candidates
+            ],
+            'entropy': round(prior_entropy, 4),
+            'questions': questions
+        }
+
+    def _candidate_distribution(self, diagnostic_results: List[DiagnosticResult]) -> List[Tuple[int, float]]:
+        """Distribuição normalizada sobre as doenças candidatas."""
+        if not diagnostic_results:
+            disease_count = len(self.engine.disease_codes)
+            return [(disease_idx, 1.0 / disease_count) for disease_idx in range(disease_count)]
+
+        total = sum(result.probability for result in diagnostic_results)
+        return [
+            (self.disease_positions[result.cid_code], result.probability / total)
+            for result in diagnostic_results
+        ]
+
+    def _information_gain(self, priors: List[float], presence: Sequence[float],
+                          prior_entropy: float) -> Tuple[float, float]:
+        """Ganho de informação esperado (bits) de perguntar por um sintoma."""
+        joint_yes = [prior * p_present for prior, p_present in zip(priors, presence)]
+        joint_no = [prior - yes for prior, yes in zip(priors, joint_yes)]
+        probability_yes = sum(joint_yes)
+        probability_no = 1.0 - probability_yes
+
+        expected_entropy = 0.0
+        if probability_yes > 0:
+            expected_entropy += probability_yes * self._entropy([yes / probability_yes for yes in joint_yes])
+        if probability_no > 0:
+            expected_entropy += probability_no * self._entropy([no / probability_no for no in joint_no])
+
+        return prior_entropy - expected_entropy, probability_yes
+
+    @staticmethod
+    def _entropy(distribution: Sequence[float]) -> float:
+        return -sum(p * math.log2(p) for p in distribution if p > 0)
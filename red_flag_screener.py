@@ -0,0 +1,233 @@
+"""
+Triagem rápida de sinais de alarme em relatórios médicos.
+Os indicadores de emergência, sinais de alerta e indicadores de gravidade da
+base de sintomas são compilados em uma única expressão regular, junto com
+regras de combinação e limiares numéricos (pressão arterial, temperatura),
+para que a urgência seja conhecida antes da pontuação completa.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+
+@dataclass
+class RedFlag:
+    flag_id: str
+    description: str
+    cid_code: str
+    level: str  # 'emergência', 'urgente'
+    source: str  # 'emergency_indicators', 'warning_signs', 'severity_indicators', 'combination'
+    evidence: List[str]
+
+
+@dataclass
+class RedFlagScreening:
+    urgency: str  # 'emergência', 'urgente', 'rotina'
+    red_flags: List[RedFlag]
+    elapsed_ms: float = 0.0
+
+
+@dataclass
+class RedFlagScan:
+    """Estado acumulado da varredura, permitindo processar o texto em blocos."""
+    hits: Dict[Tuple[str, str], Set[str]] = field(default_factory=dict)
+    measurements: Dict[str, float] = field(default_factory=dict)
+    carry: str = ''  # trecho ainda não varrido (com 1 caractere de contexto à esquerda, se houver)
+    carry_offset: int = 0  # início da busca dentro de carry
+
+
+class RedFlagScreener:
+    # Nível de urgência por tipo de indicador da base
+    INDICATOR_LEVELS = {
+        'emergency_indicators': 'emergência',
+        'warning_signs': 'urgente',
+        'severity_indicators': 'urgente'
+    }
+
+    URGENCY_RANK = {'rotina': 0, 'prioritário': 1, 'urgente': 2, 'emergência': 3}
+
+    # Grupos de termos usados pelas regras de combinação
+    TERM_GROUPS = {
+        'dor_toracica': ['dor no peito', 'dor torácica', 'aperto no peito', 'pressão no peito'],
+        'sudorese': ['sudorese', 'suor frio'],
+        'dispneia': ['falta de ar', 'dispneia', 'dificuldade para respirar'],
+        'febre': ['febre', 'febre alta', 'hipertermia']
+    }
+
+    # (id, descrição, CID, nível, grupos exigidos); 'warning_signs:<CID>' usa os sinais da base
+    COMBINATION_RULES = [
+        ('dor_toracica_sudorese', 'Dor torácica com sudorese', 'I21', 'emergência',
+         ('dor_toracica', 'sudorese')),
+        ('dor_toracica_dispneia', 'Dor torácica com falta de ar', 'I21', 'emergência',
+         ('dor_toracica', 'dispneia')),
+        ('dengue_sinal_alarme', 'Febre com sinal de alarme de dengue', 'A90', 'emergência',
+         ('febre', 'warning_signs:A90'))
+    ]
+
+    # Rótulos dos indicadores numéricos ("pressão sistólica > 180") -> medida extraída do texto
+    MEASUREMENT_LABELS = {
+        'pressão sistólica': 'systolic',
+        'pressão diastólica': 'diastolic',
+        'febre': 'temperature',
+        'temperatura': 'temperature'
+    }
+
+    # Faixas plausíveis para descartar números que não são medidas
+    MEASUREMENT_RANGES = {
+        'systolic': (60, 300),
+        'diastolic': (30, 200),
+        'temperature': (34, 45)
+    }
+
+    # Maior trecho que uma medida pode ocupar (rótulo + separadores + valores)
+    MEASUREMENT_SPAN = 48
+
+    _THRESHOLD_PATTERN = re.compile(r'^(?P<label>.+?)\s*>\s*(?P<value>\d+(?:[.,]\d+)?)')
+
+    def __init__(self, symptom_database: Dict):
+        self.indicators: List[Tuple[str, str, str]] = []  # (CID, tipo, texto)
+        self.threshold_rules: List[Tuple[str, str, str, str, float]] = []  # (CID, tipo, texto, medida, limite)
+        term_tokens: Dict[str, Set[Tuple[str, str]]] = {}
+
+        for cid_code, disease_info in symptom_database.items():
+            for source in self.INDICATOR_LEVELS:
+                for indicator in disease_info.get(source, []):
+                    self._register_indicator(cid_code, source, indicator, term_tokens)
+
+        for group, terms in self.TERM_GROUPS.items():
+            for term in terms:
+                term_tokens.setdefault(term, set()).add(('group', group))
+
+        # Um termo também sinaliza os termos contidos nele ("dor torácica intensa" -> "dor torácica")
+        self.term_tokens = {
+            term: set().union(*(tokens for other, tokens in term_tokens.items() if other in term))
+            for term in term_tokens
+        }
+
+        self.max_span = max([len(term) for term in self.term_tokens] + [self.MEASUREMENT_SPAN])
+        self.pattern = self._compile_pattern()
+
+    def _register_indicator(self, cid_code: str, source: str, indicator: str,
+                            term_tokens: Dict[str, Set[Tuple[str, str]]]):
+        """Classifica o indicador como limiar numérico ou frase buscada no texto."""
+        threshold = self._THRESHOLD_PATTERN.match(indicator.lower())
+        if threshold:
+            measurement = self.MEASUREMENT_LABELS.get(threshold.group('label').strip())
+            if measurement:
+                limit = float(threshold.group('value').replace(',', '.'))
+                self.threshold_rules.append((cid_code, source, indicator, measurement, limit))
+                return
+
+        self.indicators.append((cid_code, source, indicator))
+        term = indicator.lower()
+        term_tokens.setdefault(term, set()).update({
+            ('indicator', f'{source}:{cid_code}:{indicator}'),
+            ('group', f'{source}:{cid_code}')
+        })
+
+    def _compile_pattern(self):
+        """Uma única regex: medidas (via lookahead, sem consumir o texto) e termos."""
+        terms = sorted(self.term_tokens, key=len, reverse=True)
+        return re.compile(
+            r'(?P<bp_label>\bpa\b|press[ãa]o arterial|press[ãa]o)'
+            r'(?=[^\d\n]{0,15}?(?P<systolic>\d{2,3})\s*(?:x|/|por)\s*(?P<diastolic>\d{2,3}))'
+            r'|(?P<temp_label>febre|temperatura|\btax\b|\btemp\b)'
+            r'(?=[^\d\n]{0,12}?(?P<temperature>\d{2}(?:[.,]\d+)?))'
+            r'|(?P<term>' + '|'.join(re.escape(term) for term in terms) + ')'
+        )
+
+    def new_scan(self) -> RedFlagScan:
+        return RedFlagScan()
+
+    def scan(self, text: str, state: RedFlagScan):
+        """Varre um trecho (já em minúsculas) acumulando termos e medidas no estado."""
+        for match in self.pattern.finditer(text):
+            self._record_match(match, state)
+
+    def scan_chunk(self, chunk: str, state: RedFlagScan, final: bool = False):
+        """Varre o próximo bloco do texto (já em minúsculas) com o mesmo resultado de scan no texto inteiro.
+
+        Só são aceitas ocorrências com max_span caracteres à frente (ou no último
+        bloco); o restante fica em state.carry e a busca recomeça ali no bloco
+        seguinte, então nada é contado duas vezes nem truncado na fronteira.
+        """
+        text = state.carry + chunk
+        position = state.carry_offset
+        pending_start = len(text)
+
+        for match in self.pattern.finditer(text, position):
+            if not final and match.start() + self.max_span > len(text):
+                pending_start = match.start()
+                break
+            self._record_match(match, state)
+            position = match.end()
+
+        if final:
+            state.carry, state.carry_offset = '', 0
+            return
+
+        resume = max(position, min(pending_start, len(text) - self.max_span))
+        context = 1 if resume > 0 else 0
+        state.carry, state.carry_offset = text[resume - context:], context
+
+    def _record_match(self, match, state: RedFlagScan):
+        term = match.group('term') or match.group('temp_label')
+        for token in self.term_tokens.get(term, ()):
+            state.hits.setdefault(token, set()).add(term)
+
+        for measurement in ('systolic', 'diastolic', 'temperature'):
+            raw_value = match.group(measurement)
+            if raw_value is None:
+                continue
+            value = float(raw_value.replace(',', '.'))
+            low, high = self.MEASUREMENT_RANGES[measurement]
+            if low <= value <= high and value > state.measurements.get(measurement, float('-inf')):
+                state.measurements[measurement] = value
+
+    def evaluate(self, state: RedFlagScan, elapsed_ms: float = 0.0) -> RedFlagScreening:
+        """Converte o estado da varredura em sinais de alarme e veredito de urgência."""
+        red_flags = []
+
+        for cid_code, source, indicator in self.indicators:
+            evidence = state.hits.get(('indicator', f'{source}:{cid_code}:{indicator}'))
+            if evidence:
+                red_flags.append(RedFlag(
+                    flag_id=indicator, description=indicator.capitalize(), cid_code=cid_code,
+                    level=self.INDICATOR_LEVELS[source], source=source, evidence=sorted(evidence)
+                ))
+
+        for cid_code, source, indicator, measurement, limit in self.threshold_rules:
+            value = state.measurements.get(measurement)
+            if value is not None and value > limit:
+                red_flags.append(RedFlag(
+                    flag_id=indicator, description=indicator.capitalize(), cid_code=cid_code,
+                    level=self.INDICATOR_LEVELS[source], source=source,
+                    evidence=[f'{measurement} = {value:g}']
+                ))
+
+        for rule_id, description, cid_code, level, groups in self.COMBINATION_RULES:
+            group_hits = [state.hits.get(('group', group)) for group in groups]
+            if all(group_hits):
+                red_flags.append(RedFlag(
+                    flag_id=rule_id, description=description, cid_code=cid_code,
+                    level=level, source='combination',
+                    evidence=sorted(set().union(*group_hits))
+                ))
+
+        # Sinais de emergência primeiro
+        red_flags.sort(key=lambda flag: -self.URGENCY_RANK[flag.level])
+        urgency = red_flags[0].level if red_flags else 'rotina'
+
+        return RedFlagScreening(urgency=urgency, red_flags=red_flags, elapsed_ms=elapsed_ms)
+
+    def screen(self, text: str) -> RedFlagScreening:
+        """Triagem completa de um texto em uma única passada."""
+        start = time.perf_counter()
+        state = self.new_scan()
+        self.scan(text.lower(), state)
+        return self.evaluate(state, round((time.perf_counter() - start) * 1000, 3))
+
+    def combine_urgency(self, *levels: str) -> str:
+        """Retorna o nível mais urgente entre os informados."""
+        return max(levels, key=lambda level: self.URGENCY_RANK.get(level, 0))
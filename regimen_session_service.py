@@ -0,0 +1,174 @@
+"""
+Regimes de prescrição incrementais para a verificação de interações.
+Cada regime guarda os pares que interagem; um medicamento adicionado é
+comparado só com os seus vizinhos no grafo de interações (custo pelo grau do
+genérico, não pelo tamanho do regime), e a remoção descarta só os seus pares.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from src.services.enhanced_drug_interaction_checker import (
+    DrugInteraction, EnhancedDrugInteractionChecker, InteractionIndex
+)
+from src.services.session_store import SessionStore
+
+
+class RegimenSession:
+    """Estado de um regime, indexado por IDs estáveis das entradas (ordem de inclusão)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, source_digest: str = ''):
+        self.source_digest = source_digest  # versão da base usada na triagem
+        self.next_entry_id = 0
+        self.entries: Dict[int, str] = {}  # ID da entrada -> nome informado
+        self.normalized: Dict[int, str] = {}  # ID da entrada -> genérico
+        self.positions: Dict[int, List[int]] = {}  # nó do grafo -> IDs das entradas
+        self.pairs: Dict[Tuple[int, int], DrugInteraction] = {}  # (ID menor, ID maior) -> interação
+        self.partners: Dict[int, List[int]] = {}  # ID da entrada -> entradas com que interage
+        self.added_pairs: List[Tuple[int, int]] = []  # pares da última atualização
+        self.removed_interactions = 0
+
+    @property
+    def medications(self) -> List[str]:
+        return list(self.entries.values())
+
+
+@dataclass
+class RegimenSnapshot:
+    """Medicamentos, resumo e últimas mudanças de um regime, lidos sob o lock do armazenamento."""
+    medications: List[str]
+    summary: Dict
+    changes: Optional[Dict] = None
+
+
+class RegimenSessionService:
+    def __init__(self, checker_provider: Callable[[], EnhancedDrugInteractionChecker],
+                 max_sessions: int = 10000, ttl_seconds: int = 1800):
+        # O verificador é obtido a cada uso (ver get_drug_checker), não na criação do serviço
+        self.checker_provider = checker_provider
+        self.store = SessionStore(max_sessions, ttl_seconds)
+
+    def create_session(self, medications: Optional[List[str]] = None) -> str:
+        """Cria um regime, opcionalmente já com medicamentos."""
+        session = RegimenSession()
+        self._apply(session, self.checker_provider(), medications or [], [])
+        return self.store.create(session)
+
+    def get_session(self, session_id: str) -> Optional[RegimenSession]:
+        return self.store.get(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    def get_snapshot(self, session_id: str) -> Optional[RegimenSnapshot]:
+        """Resumo atual do regime; retorna None se ele não existir."""
+        with self.store.lock:
+            session = self.store.get(session_id)
+            if session is None:
+                return None
+
+            checker = self.checker_provider()
+            if session.source_digest != checker.index.source_digest:
+                self._apply(session, checker, [], [])
+            return RegimenSnapshot(session.medications, self._summary(session, checker))
+
+    def update_session(self, session_id: str, add: Optional[List[str]] = None,
+                       remove: Optional[List[str]] = None) -> Optional[RegimenSnapshot]:
+        """Aplica os deltas de medicamentos e retorna o estado resultante; None se o regime não existir."""
+        with self.store.lock:
+            session = self.store.get(session_id)
+            if session is None:
+                return None
+
+            checker = self.checker_provider()
+            self._apply(session, checker, add or [], remove or [])
+            return RegimenSnapshot(
+                session.medications, self._summary(session, checker), self._changes(session, checker)
+            )
+
+    @staticmethod
+    def _summary(session: RegimenSession, checker: EnhancedDrugInteractionChecker) -> Dict:
+        """Resumo do regime no mesmo formato de get_interaction_summary."""
+        position_of = {entry_id: position for position, entry_id in enumerate(session.entries)}
+        pairs = [
+            (position_of[entry1], position_of[entry2], interaction)
+            for (entry1, entry2), interaction in session.pairs.items()
+        ]
+        return checker.build_summary(session.medications, list(session.normalized.values()), pairs)
+
+    @staticmethod
+    def _changes(session: RegimenSession, checker: EnhancedDrugInteractionChecker) -> Dict:
+        """Interações incluídas e quantidade de removidas na última atualização."""
+        return {
+            'added_interactions': [
+                checker._format_interaction(
+                    session.entries[entry1], session.entries[entry2],
+                    session.normalized[entry1], session.normalized[entry2], session.pairs[entry1, entry2]
+                )
+                for entry1, entry2 in session.added_pairs
+            ],
+            'removed_interactions': session.removed_interactions
+        }
+
+    def _apply(self, session: RegimenSession, checker: EnhancedDrugInteractionChecker,
+               add: List[str], remove: List[str]):
+        # Base e normalizador lidos juntos: uma recarga concorrente não mistura versões
+        index, normalize = checker._state
+
+        if session.source_digest != index.source_digest:
+            # Base recarregada (ou regime novo): refazer a triagem com a versão atual
+            medications = session.medications
+            session.reset(index.source_digest)
+            for name in medications:
+                self._add_medication(session, checker, index, name, normalize(name))
+
+        session.added_pairs = []
+        session.removed_interactions = 0
+        for name in remove:
+            self._remove_medication(session, index, name, normalize(name))
+        for name in add:
+            self._add_medication(session, checker, index, name, normalize(name))
+
+    def _add_medication(self, session: RegimenSession, checker: EnhancedDrugInteractionChecker,
+                        index: InteractionIndex, name: str, drug: str):
+        entry_id = session.next_entry_id
+        session.next_entry_id += 1
+
+        # Só os vizinhos do genérico no grafo que já estão no regime
+        best = checker._best_partners(index, drug, session.positions, session.normalized)
+
+        session.entries[entry_id] = name
+        session.normalized[entry_id] = drug
+        session.partners[entry_id] = []
+        for node_id in index.drug_node_ids.get(drug, ()):
+            session.positions.setdefault(node_id, []).append(entry_id)
+
+        for other_id, interaction in best.items():
+            session.pairs[other_id, entry_id] = interaction
+            session.partners[other_id].append(entry_id)
+            session.partners[entry_id].append(other_id)
+            session.added_pairs.append((other_id, entry_id))
+
+    def _remove_medication(self, session: RegimenSession, index: InteractionIndex, name: str, drug: str):
+        """Remove a última entrada com o nome informado (ou, senão, com o mesmo genérico)."""
+        matches = [entry_id for entry_id, entry_name in session.entries.items() if entry_name == name]
+        if not matches:
+            matches = [entry_id for entry_id, generic in session.normalized.items() if generic == drug]
+        if not matches:
+            return
+
+        entry_id = matches[-1]
+        for other_id in session.partners.pop(entry_id):
+            session.pairs.pop((min(entry_id, other_id), max(entry_id, other_id)))
+            session.partners[other_id].remove(entry_id)
+            session.removed_interactions += 1
+
+        for node_id in index.drug_node_ids.get(session.normalized[entry_id], ()):
+            entry_ids = session.positions[node_id]
+            entry_ids.remove(entry_id)
+            if not entry_ids:
+                del session.positions[node_id]
+
+        del session.entries[entry_id]
+        del session.normalized[entry_id]
@@ -0,0 +1,266 @@
+"""
+Camada de renderização de relatórios médicos e de interações medicamentosas.
+Usa templates pré-definidos e gera o relatório em partes (streaming), em texto
+simples ou HTML, a partir de resultados já calculados.
+"""
+import io
+from html import escape
+from typing import Callable, Dict, Iterator, List
+
+SEPARATOR = "=" * 50
+
+# Templates em texto simples (métodos .format ligados uma única vez)
+TEXT_TEMPLATES = {
+    'medical_header': (
+        "RELATÓRIO DE ANÁLISE DE SINTOMAS\n" + SEPARATOR + "\n\n"
+        "SINTOMAS RELATADOS:\n{symptoms}\n\n"
+        "DIAGNÓSTICOS PROVÁVEIS:\n\n"
+    ).format,
+    'diagnosis': (
+        "{index}. {disease_name} (CID: {cid_code})\n"
+        "   Probabilidade: {probability:.1%}\n"
+        "   Confiança: {confidence}\n"
+        "   Sintomas correspondentes: {matching_symptoms}\n"
+    ).format,
+    'recommendations_header': "   Recomendações:\n".format,
+    'indented_item': "   - {text}\n".format,
+    'diagnosis_end': "\n".format,
+    'medical_footer': (
+        "OBSERVAÇÕES IMPORTANTES:\n"
+        "- Este relatório é baseado em análise automatizada de sintomas\n"
+        "- Não substitui consulta médica presencial\n"
+        "- Procure atendimento médico para diagnóstico definitivo\n"
+        "- Em caso de emergência, procure atendimento imediato\n"
+    ).format,
+    'no_diagnosis': "Não foi possível identificar um diagnóstico provável baseado nos sintomas relatados.".format,
+    'interaction_header': (
+        "RELATÓRIO DE INTERAÇÕES MEDICAMENTOSAS\n" + SEPARATOR + "\n\n"
+        "MEDICAMENTOS ANALISADOS ({total}):\n"
+    ).format,
+    'medication': "{index}. {name}\n".format,
+    'interaction_total': "\nTOTAL DE INTERAÇÕES ENCONTRADAS: {total}\n\n".format,
+    'severity_header': "RESUMO POR GRAVIDADE:\n".format,
+    'severity_count': "- {severity}: {count} interação(ões)\n".format,
+    'details_header': "\nDETALHES DAS INTERAÇÕES:\n\n".format,
+    'interaction': (
+        "{index}. {drug1} + {drug2}\n"
+        "   Gravidade: {severity}\n"
+        "   Mecanismo: {mechanism}\n"
+    ).format,
+    'effects_header': "   Efeitos Clínicos:\n".format,
+    'reactions_header': "   Reações Adversas Possíveis:\n".format,
+    'interaction_end': (
+        "   Conduta: {management}\n"
+        "   Monitoramento: {monitoring}\n"
+        "   Tempo de Início: {onset_time}\n"
+        "   Nível de Evidência: {evidence_level}\n\n"
+    ).format,
+    'general_header': "RECOMENDAÇÕES GERAIS:\n".format,
+    'item': "- {text}\n".format,
+    'no_interactions': (
+        "✅ Nenhuma interação medicamentosa conhecida foi encontrada.\n"
+        "Continue seguindo as orientações médicas e farmacêuticas.\n"
+    ).format,
+    'interaction_footer': (
+        "\n" + SEPARATOR + "\n"
+        "IMPORTANTE: Este relatório é baseado em dados científicos disponíveis.\n"
+        "Sempre consulte seu médico ou farmacêutico para orientações personalizadas.\n"
+    ).format,
+}
+
+# Templates HTML equivalentes (valores são escapados antes da formatação)
+HTML_TEMPLATES = {
+    'medical_header': (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\">\n<head><meta charset=\"utf-8\">"
+        "<title>Relatório de Análise de Sintomas</title></head>\n<body>\n"
+        "<h1>Relatório de Análise de Sintomas</h1>\n"
+        "<h2>Sintomas relatados</h2>\n<p>{symptoms}</p>\n"
+        "<h2>Diagnósticos prováveis</h2>\n<ol>\n"
+    ).format,
+    'diagnosis': (
+        "<li><strong>{disease_name}</strong> (CID: {cid_code})<br>\n"
+        "Probabilidade: {probability:.1%}<br>\n"
+        "Confiança: {confidence}<br>\n"
+        "Sintomas correspondentes: {matching_symptoms}\n"
+    ).format,
+    'recommendations_header': "<p>Recomendações:</p>\n<ul>\n".format,
+    'indented_item': "<li>{text}</li>\n".format,
+    'recommendations_end': "</ul>\n".format,
+    'diagnosis_end': "</li>\n".format,
+    'medical_footer': (
+        "</ol>\n<h2>Observações importantes</h2>\n<ul>\n"
+        "<li>Este relatório é baseado em análise automatizada de sintomas</li>\n"
+        "<li>Não substitui consulta médica presencial</li>\n"
+        "<li>Procure atendimento médico para diagnóstico definitivo</li>\n"
+        "<li>Em caso de emergência, procure atendimento imediato</li>\n"
+        "</ul>\n</body>\n</html>\n"
+    ).format,
+    'no_diagnosis': (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\">\n<head><meta charset=\"utf-8\">"
+        "<title>Relatório de Análise de Sintomas</title></head>\n<body>\n"
+        "<p>Não foi possível identificar um diagnóstico provável baseado nos sintomas relatados.</p>\n"
+        "</body>\n</html>\n"
+    ).format,
+    'interaction_header': (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\">\n<head><meta charset=\"utf-8\">"
+        "<title>Relatório de Interações Medicamentosas</title></head>\n<body>\n"
+        "<h1>Relatório de Interações Medicamentosas</h1>\n"
+        "<h2>Medicamentos analisados ({total})</h2>\n<ol>\n"
+    ).format,
+    'medication': "<li>{name}</li>\n".format,
+    'interaction_total': "</ol>\n<p>Total de interações encontradas: {total}</p>\n".format,
+    'severity_header': "<h2>Resumo por gravidade</h2>\n<ul>\n".format,
+    'severity_count': "<li>{severity}: {count} interação(ões)</li>\n".format,
+    'details_header': "</ul>\n<h2>Detalhes das interações</h2>\n<ol>\n".format,
+    'interaction': (
+        "<li><strong>{drug1} + {drug2}</strong><br>\n"
+        "Gravidade: {severity}<br>\n"
+        "Mecanismo: {mechanism}\n"
+    ).format,
+    'effects_header': "<p>Efeitos clínicos:</p>\n<ul>\n".format,
+    'reactions_header': "<p>Reações adversas possíveis:</p>\n<ul>\n".format,
+    'list_end': "</ul>\n".format,
+    'interaction_end': (
+        "<p>Conduta: {management}<br>\n"
+        "Monitoramento: {monitoring}<br>\n"
+        "Tempo de início: {onset_time}<br>\n"
+        "Nível de evidência: {evidence_level}</p>\n</li>\n"
+    ).format,
+    'general_header': "</ol>\n<h2>Recomendações gerais</h2>\n<ul>\n".format,
+    'item': "<li>{text}</li>\n".format,
+    'no_interactions': (
+        "<p>✅ Nenhuma interação medicamentosa conhecida foi encontrada.<br>\n"
+        "Continue seguindo as orientações médicas e farmacêuticas.</p>\n"
+    ).format,
+    'interaction_footer': (
+        "<p><strong>IMPORTANTE:</strong> Este relatório é baseado em dados científicos disponíveis.<br>\n"
+        "Sempre consulte seu médico ou farmacêutico para orientações personalizadas.</p>\n"
+        "</body>\n</html>\n"
+    ).format,
+}
+
+
+def _identity(value: str) -> str:
+    return value
+
+
+class ReportRenderer:
+    """Renderiza relatórios em partes a partir de resultados já calculados."""
+
+    FORMATS = {
+        'text': (TEXT_TEMPLATES, _identity, 'text/plain; charset=utf-8', 'txt'),
+        'html': (HTML_TEMPLATES, escape, 'text/html; charset=utf-8', 'html'),
+    }
+
+    def _get_format(self, fmt: str):
+        if fmt not in self.FORMATS:
+            raise ValueError(f'Formato de relatório inválido: {fmt}. Use "text" ou "html"')
+        return self.FORMATS[fmt]
+
+    def get_mimetype(self, fmt: str) -> str:
+        """Retorna o mimetype do formato para downloads."""
+        return self._get_format(fmt)[2]
+
+    def get_extension(self, fmt: str) -> str:
+        """Retorna a extensão de arquivo do formato para downloads."""
+        return self._get_format(fmt)[3]
+
+    def iter_medical_report(self, diagnostic_results: List, original_symptoms: str,
+                            fmt: str = 'text') -> Iterator[str]:
+        """Gera o relatório médico em partes, sem concatenar strings."""
+        templates, esc, _, _ = self._get_format(fmt)
+
+        if not diagnostic_results:
+            yield templates['no_diagnosis']()
+            return
+
+        yield templates['medical_header'](symptoms=esc(original_symptoms))
+
+        for i, result in enumerate(diagnostic_results[:3], 1):
+            yield templates['diagnosis'](
+                index=i,
+                disease_name=esc(result.disease_name),
+                cid_code=esc(result.cid_code),
+                probability=result.probability,
+                confidence=esc(result.confidence_level.title()),
+                matching_symptoms=esc(', '.join(result.matching_symptoms))
+            )
+
+            recommendations = result.additional_info.get('recommendations')
+            if recommendations:
+                yield templates['recommendations_header']()
+                for rec in recommendations:
+                    yield templates['indented_item'](text=esc(rec))
+                if 'recommendations_end' in templates:
+                    yield templates['recommendations_end']()
+
+            yield templates['diagnosis_end']()
+
+        yield templates['medical_footer']()
+
+    def iter_interaction_report(self, medications: List[str], summary: Dict,
+                                fmt: str = 'text') -> Iterator[str]:
+        """Gera o relatório de interações em partes a partir de um resumo já calculado."""
+        templates, esc, _, _ = self._get_format(fmt)
+        list_end: Callable[[], str] = templates.get('list_end', str)
+
+        yield templates['interaction_header'](total=summary['total_medications'])
+        for i, med in enumerate(medications, 1):
+            yield templates['medication'](index=i, name=esc(med))
+
+        yield templates['interaction_total'](total=summary['total_interactions'])
+
+        if summary['total_interactions'] > 0:
+            yield templates['severity_header']()
+            for severity, count in summary['severity_breakdown'].items():
+                if count > 0:
+                    yield templates['severity_count'](severity=esc(severity), count=count)
+
+            yield templates['details_header']()
+            for i, interaction in enumerate(summary['interactions'], 1):
+                yield templates['interaction'](
+                    index=i,
+                    drug1=esc(interaction['drug1']),
+                    drug2=esc(interaction['drug2']),
+                    severity=esc(interaction['severity']),
+                    mechanism=esc(interaction['mechanism'])
+                )
+                yield templates['effects_header']()
+                for effect in interaction['clinical_effects']:
+                    yield templates['indented_item'](text=esc(effect))
+                yield list_end()
+                yield templates['reactions_header']()
+                for reaction in interaction['adverse_reactions']:
+                    yield templates['indented_item'](text=esc(reaction))
+                yield list_end()
+                yield templates['interaction_end'](
+                    management=esc(interaction['management']),
+                    monitoring=esc(', '.join(interaction['monitoring'])),
+                    onset_time=esc(interaction['onset_time']),
+                    evidence_level=esc(interaction['evidence_level'])
+                )
+
+            yield templates['general_header']()
+            for rec in summary['general_recommendations']:
+                yield templates['item'](text=esc(rec))
+            yield list_end()
+        else:
+            yield templates['no_interactions']()
+
+        yield templates['interaction_footer']()
+
+    def render_medical_report(self, diagnostic_results: List, original_symptoms: str,
+                              fmt: str = 'text') -> str:
+        """Renderiza o relatório médico completo em um buffer."""
+        buffer = io.StringIO()
+        for chunk in self.iter_medical_report(diagnostic_results, original_symptoms, fmt):
+            buffer.write(chunk)
+        return buffer.getvalue()
+
+    def render_interaction_report(self, medications: List[str], summary: Dict,
+                                  fmt: str = 'text') -> str:
+        """Renderiza o relatório de interações completo em um buffer."""
+        buffer = io.StringIO()
+        for chunk in self.iter_interaction_report(medications, summary, fmt):
+            buffer.write(chunk)
+        return buffer.getvalue()
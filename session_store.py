@@ -0,0 +1,61 @@
+"""
+Armazenamento em memória de sessões com limite de tamanho e expiração.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class SessionStore:
+    """Guarda objetos de sessão por ID, descartando os mais antigos e os expirados."""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: int = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.RLock()
+        self._sessions = OrderedDict()  # session_id -> (último acesso, sessão)
+
+    def create(self, session: Any) -> str:
+        """Registra uma nova sessão e retorna seu ID."""
+        session_id = uuid.uuid4().hex
+        with self.lock:
+            self._evict_expired()
+            self._sessions[session_id] = (time.monotonic(), session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Retorna a sessão (renovando sua validade) ou None se não existir/expirou."""
+        with self.lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+
+            now = time.monotonic()
+            if now - entry[0] > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a sessão; retorna False se ela não existia."""
+        with self.lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_expired(self):
+        """Remove sessões expiradas a partir das mais antigas."""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
@@ -1,10 +1,17 @@
 """
 Serviço para seleção objetiva de sintomas com opções pré-definidas.
 """
+from src.services.fuzzy_phrase_matcher import FuzzyPhraseMatcher
 
 class SymptomSelectorService:
     def __init__(self):
         self.symptom_categories = self._load_symptom_categories()
+        # Busca tolerante a erros de digitação e acentos ausentes
+        self.fuzzy_matcher = FuzzyPhraseMatcher({
+            symptom: symptom
+            for symptoms in self.symptom_categories.values()
+            for symptom in symptoms
+        })
     
     def _load_symptom_categories(self):
         """Carrega categorias de sintomas organizadas por sistema"""
@@ -64,8 +71,11 @@ class SymptomSelectorService:
         results = []
         query_lower = query.lower()
         
+        # Depois da busca exata por substring, completar com a busca aproximada
+        fuzzy_matches = set(self.fuzzy_matcher.search(query))
+        
         for category, symptoms in self.symptom_categories.items():
-            matching_symptoms = [s for s in symptoms if query_lower in s.lower()]
+            matching_symptoms = [s for s in symptoms if query_lower in s.lower() or s in fuzzy_matches]
             if matching_symptoms:
                 results.append({
                     'category': category,
@@ -0,0 +1,79 @@
+"""
+Busca de casos semelhantes: similaridade exata com o IDF atual, independente da ordem de inserção.
+"""
+import math
+import random
+import pytest
+from src.services.case_store import SimilarCaseStore
+from src.services.diagnostic_benchmark import SyntheticReportGenerator
+from src.services.diagnostic_engine import DiagnosticEngine
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DiagnosticEngine()
+
+
+@pytest.fixture(scope='module')
+def reports(engine):
+    return SyntheticReportGenerator(engine, seed=3).generate(120)
+
+
+def _build_store(engine, reports, order):
+    store = SimilarCaseStore(engine)
+    for idx in order:
+        store.add_case(reports[idx], 'R00', {'report_idx': idx})
+    return store
+
+
+def _reference_similarity(store, query_report, case_report):
+    """Cosseno recalculado do zero com o IDF da base atual."""
+    def vector(report):
+        raw = store._raw_vector(store.engine.extract_report_symptoms(report) or [], store._word_counts(report))
+        total_documents = len(store.cases) + 1
+        weighted = {}
+        for feature, weight in raw.items():
+            idf = 1.0
+            if feature < store.HASH_DIMENSIONS:
+                idf = math.log((total_documents + 1) / (store.document_frequency.get(feature, 0) + 1)) + 1.0
+            weighted[feature] = weight * idf
+        norm = math.sqrt(sum(weight * weight for weight in weighted.values()))
+        return {feature: weight / norm for feature, weight in weighted.items()}
+
+    query, case = vector(query_report), vector(case_report)
+    return sum(weight * case.get(feature, 0.0) for feature, weight in query.items())
+
+
+def test_similarity_uses_current_idf(engine, reports):
+    store = _build_store(engine, reports, range(len(reports)))
+    for query in reports[:20]:
+        for result in store.find_similar(query, limit=10, min_similarity=0.0):
+            expected = _reference_similarity(store, query, reports[result['metadata']['report_idx']])
+            assert result['similarity'] == pytest.approx(round(expected, 4), abs=1e-4)
+
+
+def test_similarity_independent_of_insertion_order(engine, reports):
+    forward = _build_store(engine, reports, range(len(reports)))
+    backward = _build_store(engine, reports, reversed(range(len(reports))))
+    for query in reports[:20]:
+        first = {r['metadata']['report_idx']: r['similarity'] for r in forward.find_similar(query, 10, 0.0)}
+        second = {r['metadata']['report_idx']: r['similarity'] for r in backward.find_similar(query, 10, 0.0)}
+        assert first == second
+
+
+def test_lsh_search_finds_stored_case(engine):
+    reports = SyntheticReportGenerator(engine, seed=9).generate(SimilarCaseStore.MAX_CANDIDATES + 300)
+    store = SimilarCaseStore(engine)
+    for idx, report in enumerate(reports):
+        store.add_case(report, 'R00', {'report_idx': idx})
+    for idx in random.Random(1).sample(range(len(reports)), 50):
+        results = store.find_similar(reports[idx], limit=5)
+        assert results and results[0]['similarity'] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_projection_cache_is_bounded(engine, reports):
+    store = SimilarCaseStore(engine)
+    store._projections.max_size = 50
+    for report in reports:
+        store.add_case(report, 'R00')
+    assert len(store._projections) <= 50
@@ -0,0 +1,85 @@
+"""
+Cache de rankings, poda top-k e lote devem reproduzir a pontuação direta.
+"""
+import random
+import threading
+import pytest
+from src.services.diagnosis_batcher import DiagnosisBatcher
+from src.services.diagnostic_engine import DiagnosticEngine
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DiagnosticEngine()
+
+
+@pytest.fixture(scope='module')
+def symptom_sets(engine):
+    rng = random.Random(11)
+    symptoms = list(engine.symptom_patterns)
+    sets = []
+    for _ in range(300):
+        chosen = rng.sample(symptoms, rng.randint(1, 8))
+        if rng.random() < 0.3:
+            chosen.append(rng.choice(chosen))  # sintoma repetido
+        sets.append(chosen)
+    return sets
+
+
+def _reference(engine, symptom_ids, limit, scoring_mode):
+    scores, matching = engine._score_symptoms(symptom_ids, scoring_mode)
+    return engine._materialize_results(engine._select_top(scores, matching, limit), len(symptom_ids))
+
+
+@pytest.mark.parametrize('scoring_mode', DiagnosticEngine.SCORING_MODES)
+def test_cached_ranking_matches_direct_scoring(engine, symptom_sets, scoring_mode):
+    engine.result_cache.clear()
+    rng = random.Random(5)
+    for symptom_ids in symptom_sets:
+        for variant in (symptom_ids, rng.sample(symptom_ids, len(symptom_ids)), sorted(set(symptom_ids))):
+            results = engine.analyze_symptom_ids(variant, 5, scoring_mode)
+            expected = _reference(engine, variant, 5, scoring_mode)
+            assert [r.cid_code for r in results] == [r.cid_code for r in expected], variant
+            assert [r.probability for r in results] == pytest.approx([r.probability for r in expected])
+            assert [r.matching_symptoms for r in results] == [r.matching_symptoms for r in expected]
+
+
+def test_repeated_symptoms_do_not_share_cache_entry(engine):
+    engine.result_cache.clear()
+    symptom = next(iter(engine.symptom_patterns))
+    other = list(engine.symptom_patterns)[1]
+    with_repeat = engine.analyze_symptom_ids([symptom, symptom, other])
+    without_repeat = engine.analyze_symptom_ids([symptom, other])
+    assert with_repeat == _reference(engine, [symptom, symptom, other], 5, 'heuristic')
+    assert without_repeat == _reference(engine, [symptom, other], 5, 'heuristic')
+
+
+def test_pruned_top_k_matches_full_scoring(engine, symptom_sets):
+    for symptom_ids in symptom_sets:
+        if not engine._can_prune(symptom_ids):
+            continue
+        for limit in (1, 3, 5, 10):
+            scores, matching = engine._score_symptoms(symptom_ids, 'heuristic')
+            assert engine._select_top_pruned(symptom_ids, limit) == engine._select_top(scores, matching, limit)
+
+
+def test_batch_matches_individual_ranking(engine, symptom_sets):
+    requests = [(symptom_ids, 5, mode) for symptom_ids in symptom_sets[:100] for mode in DiagnosticEngine.SCORING_MODES]
+    engine.result_cache.clear()
+    batch = engine.rank_diagnoses_batch(requests)
+    for (symptom_ids, limit, mode), results in zip(requests, batch):
+        assert results == _reference(engine, symptom_ids, limit, mode)
+
+
+def test_batcher_falls_back_when_batch_stalls(engine, symptom_sets, monkeypatch):
+    batcher = DiagnosisBatcher(engine, timeout_ms=50)
+    release = threading.Event()
+    rank_batch = engine.rank_diagnoses_batch
+    monkeypatch.setattr(engine, 'rank_diagnoses_batch', lambda requests: release.wait() and rank_batch(requests))
+
+    symptom_ids = symptom_sets[0]
+    try:
+        assert batcher.submit(symptom_ids) == _reference(engine, symptom_ids, 5, 'heuristic')
+        assert batcher.stats()['timeouts'] == 1
+    finally:
+        release.set()
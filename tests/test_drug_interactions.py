@@ -0,0 +1,102 @@
+"""
+Triagem de interações: o lote (no processo e em processos separados), o regime incremental
+e o adaptador legado equivalem à triagem completa.
+"""
+import random
+import pytest
+from src.services.drug_interaction_checker import DrugInteractionChecker
+from src.services.enhanced_drug_interaction_checker import EnhancedDrugInteractionChecker, get_shared_checker
+from src.services.regimen_session_service import RegimenSessionService
+
+COMPACT_KEYS = ['total_medications', 'total_interactions', 'severity_breakdown',
+                'highest_severity', 'requires_immediate_attention']
+
+
+@pytest.fixture(scope='module')
+def checker(tmp_path_factory):
+    snapshot_path = str(tmp_path_factory.mktemp('interactions') / 'drug_interactions.snapshot.pickle')
+    checker = EnhancedDrugInteractionChecker(snapshot_path=snapshot_path)
+    yield checker
+    checker.shutdown_batch_pool()
+
+
+@pytest.fixture(scope='module')
+def drug_names(checker):
+    index = checker.index
+    names = set(index.drug_class_index) | {drug for pair in index.interactions_database for drug in pair}
+    names |= {alias for aliases in index.drug_aliases.values() for alias in aliases}
+    return sorted(names) + ['medicamento desconhecido', 'Naproxeno 500mg']
+
+
+@pytest.fixture(scope='module')
+def regimens(drug_names):
+    rng = random.Random(5)
+    return [rng.sample(drug_names, rng.randint(0, 12)) for _ in range(600)]
+
+
+def _compact(summary):
+    return (
+        {key: summary[key] for key in COMPACT_KEYS},
+        [(i['drug1'], i['drug2'], i['severity'], i['risk_level'], i['matched_by']) for i in summary['interactions']]
+    )
+
+
+def test_batch_matches_full_summary(checker, regimens):
+    for regimen, summary in zip(regimens, checker.screen_regimens(regimens)):
+        assert _compact(summary) == _compact(checker.get_interaction_summary(regimen))
+
+
+def test_batch_process_pool_is_reused(checker, regimens):
+    in_process = checker.screen_regimens(regimens)
+    assert checker.screen_regimens(regimens, workers=2, chunk_size=100) == in_process
+    pool = checker._batch_pool
+    assert pool is not None
+    assert checker.screen_regimens(regimens, workers=2, chunk_size=100) == in_process
+    assert checker._batch_pool is pool
+
+
+def test_summary_matches_pairwise_lookup(checker, regimens):
+    for regimen in regimens:
+        summary = checker.get_interaction_summary(regimen)
+        normalized = [checker.normalize_drug_name(med) for med in regimen]
+        expected = set()
+        for i in range(len(regimen)):
+            for j in range(i + 1, len(regimen)):
+                if normalized[i] != normalized[j]:
+                    interaction = checker.get_interaction(normalized[i], normalized[j])
+                    if interaction is not None:
+                        expected.add((regimen[i], regimen[j], interaction.severity))
+        assert {(i['drug1'], i['drug2'], i['severity']) for i in summary['interactions']} == expected
+
+
+def test_incremental_regimen_matches_full_summary(checker, drug_names):
+    service = RegimenSessionService(lambda: checker)
+    rng = random.Random(3)
+    for _ in range(100):
+        medications = rng.sample(drug_names, rng.randint(0, 5))
+        session_id = service.create_session(medications)
+        for _ in range(8):
+            add = [rng.choice(drug_names) for _ in range(rng.randint(0, 2))]
+            remove = [rng.choice(medications)] if medications and rng.random() < 0.5 else []
+            snapshot = service.update_session(session_id, add, remove)
+            medications = snapshot.medications
+            assert snapshot.summary == checker.get_interaction_summary(medications)
+            assert service.get_snapshot(session_id).summary == snapshot.summary
+
+
+def test_legacy_adapter_reports_every_pair(checker):
+    legacy = DrugInteractionChecker(checker)
+    regimen = ['varfarina', 'aspirina', 'ibuprofeno', 'omeprazol']
+    result = legacy.get_interaction_summary(regimen)
+    pairs = {(entry['medication1'], entry['medication2']) for entry in result}
+    expected = {(i['drug1'], i['drug2']) for i in checker.get_interaction_summary(regimen)['interactions']}
+    assert len(expected) > 1 and pairs == expected
+    assert set(result[0]) == {'medication1', 'medication2', 'severity', 'description', 'recommendation'}
+
+    assert legacy.get_interaction_summary(['medicamento a', 'medicamento b'])[0]['severity'] == 'Nenhuma'
+    with pytest.raises(ValueError):
+        legacy.get_interaction_summary(['varfarina'])
+
+
+def test_legacy_adapter_defaults_to_shared_checker():
+    assert DrugInteractionChecker().checker is get_shared_checker()
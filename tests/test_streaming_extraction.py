@@ -0,0 +1,57 @@
+"""
+A extração em streaming deve produzir o mesmo resultado da extração no texto inteiro.
+"""
+import random
+import pytest
+from src.services.diagnostic_engine import DiagnosticEngine
+from src.services.diagnostic_benchmark import SyntheticReportGenerator
+
+CHUNK_SIZES = [1, 7, 13, 50, 200, 1000]
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DiagnosticEngine()
+
+
+@pytest.fixture(scope='module')
+def reports(engine):
+    generated = SyntheticReportGenerator(engine, seed=7, noise_rate=0.4).generate(150)
+    return generated + [
+        'Paciente com fadiga, ansioso, tensão muscular e insônia há semanas.',
+        'Refere dor no peito com sudorese e falta de ar. PA 190x120, febre 39,5.',
+        'Dor torácica intensa irradiando para o braço esquerdo, suor frio.'
+    ]
+
+
+def _chunked(engine, monkeypatch, text, size):
+    monkeypatch.setattr(engine, 'STREAM_CHUNK_SIZE', size)
+    return engine.iter_text_chunks(text)
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_streaming_symptoms_match_full_text(engine, reports, monkeypatch, size):
+    for text in reports:
+        symptoms, length = engine.extract_symptoms_streaming(_chunked(engine, monkeypatch, text, size))
+        assert symptoms == engine._extract_symptoms(text.lower().strip()), text
+        assert length == len(text)
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_streaming_red_flags_match_full_text(engine, reports, monkeypatch, size):
+    for text in reports:
+        scan = engine.red_flag_screener.new_scan()
+        engine.extract_symptoms_streaming(_chunked(engine, monkeypatch, text, size), scan)
+        streamed = engine.red_flag_screener.evaluate(scan)
+        expected = engine.red_flag_screener.screen(text)
+        assert streamed.urgency == expected.urgency, text
+        assert streamed.red_flags == expected.red_flags, text
+
+
+def test_streaming_random_chunk_boundaries(engine, reports):
+    rng = random.Random(3)
+    for text in reports:
+        boundaries = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, 12)))
+        chunks = [text[start:end] for start, end in zip([0] + boundaries, boundaries + [len(text)])]
+        symptoms, _ = engine.extract_symptoms_streaming(chunks)
+        assert symptoms == engine._extract_symptoms(text.lower().strip()), text